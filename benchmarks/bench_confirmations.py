@@ -0,0 +1,79 @@
+'''
+Measure waiting for many transactions to be confirmed, against a local stand-in node with a
+configurable RPC latency.
+
+All transactions in blocks 1 to [blocks] are tracked, and the chain grows one block at a time,
+until the last of them is confident. "poll" looks up each unconfirmed transaction after every
+block, like a loop over `eth.getTransactionReceipt()` would, and "tracker" uses a
+ConfirmationTracker on the monitor's confident blocks. Both count HTTP requests per tracked
+transaction, and confirmed transactions per second.
+
+Run from the repository root:
+python -m benchmarks.bench_confirmations [blocks] [txs/block] [latency_ms]
+'''
+
+from collections import OrderedDict
+import sys
+import time
+
+from web3 import HTTPProvider
+
+from web3utils import eth, web3
+from web3utils.confirmations import ConfirmationTracker
+from web3utils.monitors import TransactionMonitor
+
+from tests.standin import StandInChain, StandInNode
+
+from benchmarks.common import report
+
+CONFIDENT_DEPTH = 3
+
+
+def poll(chain, txids):
+    unconfirmed = set(txids)
+    while unconfirmed:
+        chain.mine()
+        solid_height = chain.height - CONFIDENT_DEPTH
+        for txid in list(unconfirmed):
+            tx = eth.getTransaction(txid)
+            if tx and tx['blockNumber'] is not None and tx['blockNumber'] <= solid_height:
+                unconfirmed.remove(txid)
+
+
+def track(chain, txids):
+    monitor = TransactionMonitor(confident_depth=CONFIDENT_DEPTH)
+    try:
+        tracker = ConfirmationTracker(monitor)
+        futures = tracker.track_many(txids)
+        while not futures[-1].done():
+            chain.mine()
+            monitor._solid_monitor(chain.height)
+        assert all(future.done() for future in futures)
+    finally:
+        monitor.stop()
+
+
+def measure(blocks=10, txs_per_block=100, latency_ms=1):
+    results = OrderedDict()
+    for name, wait in (('poll', poll), ('tracker', track)):
+        chain = StandInChain(height=0, txs_per_block=txs_per_block)
+        txids = [
+            chain.tx_hash(number, index)
+            for number in range(1, blocks + 1) for index in range(txs_per_block)
+        ]
+        with StandInNode(chain.handlers(), latency=latency_ms / 1000) as node:
+            web3.setProvider(HTTPProvider(node.uri))
+            start = time.perf_counter()
+            wait(chain, txids)
+            elapsed = time.perf_counter() - start
+            results[name + '_requests'] = (node.http_requests / len(txids), 'requests/tx')
+            results[name] = (len(txids) / elapsed, 'txs/s')
+    return results
+
+
+def main(blocks=10, txs_per_block=100, latency_ms=1):
+    report(measure(blocks, txs_per_block, latency_ms))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
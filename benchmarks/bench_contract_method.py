@@ -0,0 +1,75 @@
+'''
+Measure the Python-side overhead of a sugared contract call, excluding the RPC itself.
+
+"uncached" builds a fresh ContractMethod per call, whose empty cache makes it build a web3.py
+caller with `contract.call()` every time, which is what ContractSugar used to do.
+"cached" goes through ContractSugar, which reuses the method and its prepared web3.py caller.
+Both read the default account on each call, which web3.py copies into the caller.
+
+Run from the repository root: python -m benchmarks.bench_contract_method [calls]
+'''
+
+from collections import OrderedDict
+import functools
+import sys
+import timeit
+
+from web3.utils.empty import empty
+
+from web3utils.contracts import ContractMethod, ContractSugar
+
+from benchmarks.common import report
+
+
+def _fake_rpc(function_name, transaction, *args):
+    return '0x01'
+
+
+class FakeEth:
+    defaultAccount = empty
+    coinbase = '0x' + '22' * 20
+
+
+class FakeWeb3:
+    eth = FakeEth()
+
+
+class FakeContract:
+    'mimics the caller construction in web3.py Contract.call(), with a free RPC'
+
+    address = '0x' + '11' * 20
+    web3 = FakeWeb3()
+
+    def call(self, transaction=None):
+        call_transaction = dict(**(transaction or {}))
+        call_transaction.setdefault('to', self.address)
+        if self.web3.eth.defaultAccount is not empty:
+            call_transaction.setdefault('from', self.web3.eth.defaultAccount)
+
+        class Caller:
+            def __getattr__(self, function_name):
+                return functools.partial(_fake_rpc, function_name, call_transaction)
+
+        return Caller()
+
+
+def measure(calls=100000):
+    contract = FakeContract()
+    sugar = ContractSugar(contract)
+    scenarios = (
+        ('uncached', lambda: ContractMethod(contract, 'balanceOf')('carver')),
+        ('cached', lambda: sugar.balanceOf('carver')),
+    )
+    results = OrderedDict()
+    for name, scenario in scenarios:
+        seconds = min(timeit.repeat(scenario, number=calls, repeat=3))
+        results[name] = (seconds / calls * 1e6, 'us/call')
+    return results
+
+
+def main(calls=100000):
+    report(measure(calls))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,59 @@
+'''
+Compare per-item and bulk conversion of 32-byte hex values, like hashes or log topics.
+
+"hex2bytes" and "is_empty_hex" are the per-item functions, looped over in Python.
+"hex2packed" and "hex2bytes_many" convert all the values in one call, and
+"hex2array" builds a NumPy array, if NumPy is installed.
+
+Run from the repository root: python -m benchmarks.bench_encodings [values]
+'''
+
+from collections import OrderedDict
+import sys
+import timeit
+
+from web3utils.encodings import (
+    array2hex,
+    hex2array,
+    hex2bytes,
+    hex2bytes_many,
+    hex2packed,
+    is_empty_hex,
+    packed2hex,
+)
+
+from benchmarks.common import report
+
+
+def measure(values=100000):
+    hex_strs = ['0x%064x' % (n * 7919) for n in range(values)]
+    packed = hex2packed(hex_strs)
+    scenarios = [
+        ('hex2bytes', lambda: [hex2bytes(hex_str) for hex_str in hex_strs]),
+        ('hex2bytes_many', lambda: hex2bytes_many(hex_strs)),
+        ('hex2packed', lambda: hex2packed(hex_strs)),
+        ('packed2hex', lambda: packed2hex(packed)),
+        ('is_empty_hex', lambda: [is_empty_hex(hex_str) for hex_str in hex_strs]),
+    ]
+    try:
+        array = hex2array(hex_strs)
+    except ImportError:
+        print('NumPy is not installed, skipping hex2array', file=sys.stderr)
+    else:
+        scenarios += [
+            ('hex2array', lambda: hex2array(hex_strs)),
+            ('array2hex', lambda: array2hex(array)),
+        ]
+    results = OrderedDict()
+    for name, scenario in scenarios:
+        seconds = min(timeit.repeat(scenario, number=1, repeat=3))
+        results[name] = (seconds / values * 1e6, 'us/value')
+    return results
+
+
+def main(values=100000):
+    report(measure(values))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,58 @@
+'''
+Measure the throughput of concurrent ContractMethod reads against a local stand-in node,
+through web3.py's HTTPProvider and through PooledHTTPProvider.
+
+Also counts the TCP connections each one opened: web3.py's provider opens a new connection
+whenever its small pool is busy, and closes it afterwards, leaving it in TIME_WAIT.
+
+Run from the repository root: python -m benchmarks.bench_http_pool [threads] [calls]
+'''
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import time
+
+from web3 import Web3, HTTPProvider
+
+from web3utils.contracts import ContractSugar
+from web3utils.providers import PooledHTTPProvider
+
+from tests.standin import StandInNode, TOKEN_ABI, TOKEN_ADDRESS, address, token_handlers
+
+from benchmarks.common import report
+
+
+def run(provider, threads, calls):
+    web3 = Web3(provider)
+    web3.eth.defaultAccount = '0x' + '22' * 20
+    token = ContractSugar(web3.eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
+    holders = [address(100 + n) for n in range(calls)]
+    with ThreadPoolExecutor(threads) as executor:
+        # warm up, so that both providers start with open connections
+        list(executor.map(token.balanceOf, holders[:threads]))
+        start = time.perf_counter()
+        list(executor.map(token.balanceOf, holders))
+        return time.perf_counter() - start
+
+
+def measure(threads=16, calls=2000):
+    scenarios = (
+        ('web3.py', HTTPProvider),
+        ('pooled', lambda uri: PooledHTTPProvider(uri, pool_size=threads)),
+    )
+    results = OrderedDict()
+    for name, make_provider in scenarios:
+        with StandInNode(token_handlers()) as node:
+            seconds = run(make_provider(node.uri), threads, calls)
+            results[name] = (calls / seconds, 'calls/s')
+            results[name + '_connections'] = (node.connections, 'connections')
+    return results
+
+
+def main(threads=16, calls=2000):
+    report(measure(threads, calls))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
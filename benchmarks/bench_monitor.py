@@ -0,0 +1,80 @@
+'''
+Measure TransactionMonitor throughput against a local stand-in node, with a configurable
+RPC latency.
+
+"per_tx" fetches a block and then one getTransaction per transaction hash, the approach the
+monitor used to take, for comparison with "full_block", which fetches both in one request.
+"new_block" is the monitor handling each new block for a block watcher and a confident block
+watcher, and "pending_tx" is it handling newly announced transactions for a pending watcher.
+
+Run from the repository root:
+python -m benchmarks.bench_monitor [blocks] [txs/block] [latency_ms]
+'''
+
+from collections import OrderedDict
+import sys
+import time
+
+from web3 import HTTPProvider
+
+from web3utils import eth, web3
+from web3utils.monitors import TransactionMonitor
+
+from tests.standin import StandInChain, StandInNode
+
+from benchmarks.common import report
+
+
+def per_tx(monitor, block_num):
+    block = eth.getBlock(block_num)
+    return block, [eth.getTransaction(txid) for txid in block['transactions']]
+
+
+def full_block(monitor, block_num):
+    return monitor.cache.get_block_with_txs(block_num)
+
+
+def new_block(monitor, block_num):
+    monitor._new_block(monitor.chain.block_hash(block_num))
+
+
+def timed(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return time.perf_counter() - start
+
+
+def fresh_monitor(chain):
+    monitor = TransactionMonitor()
+    monitor.chain = chain
+    monitor.block_watchers.append(lambda block: None)
+    monitor.solid_watchers.append(lambda block, txs: None)
+    monitor.pending_tx_watchers.append(lambda tx: None)
+    return monitor
+
+
+def measure(blocks=50, txs_per_block=100, latency_ms=1):
+    chain = StandInChain(height=blocks, txs_per_block=txs_per_block)
+    results = OrderedDict()
+    with StandInNode(chain.handlers(), latency=latency_ms / 1000) as node:
+        web3.setProvider(HTTPProvider(node.uri))
+        scenarios = (('per_tx', per_tx), ('full_block', full_block), ('new_block', new_block))
+        for name, fetch in scenarios:
+            monitor = fresh_monitor(chain)
+            elapsed = timed(lambda block_num: fetch(monitor, block_num), range(1, blocks + 1))
+            results[name] = (blocks / elapsed, 'blocks/s')
+
+        monitor = fresh_monitor(chain)
+        txids = [chain.tx_hash(blocks, index) for index in range(txs_per_block)]
+        elapsed = timed(monitor._new_pending_tx, txids)
+        results['pending_tx'] = (len(txids) / elapsed, 'txs/s')
+    return results
+
+
+def main(blocks=50, txs_per_block=100, latency_ms=1):
+    report(measure(blocks, txs_per_block, latency_ms))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,44 @@
+'''
+Measure the cost of reaching web3.py through web3utils' proxies, without any RPC.
+
+"direct" reads `eth.getBalance` from a plain Web3, "web3" through DefaultedWeb3, and
+"eth" through ProxyEth, which goes through DefaultedWeb3 too.
+
+Run from the repository root: python -m benchmarks.bench_proxy [accesses]
+'''
+
+from collections import OrderedDict
+import sys
+import timeit
+
+from web3 import Web3, HTTPProvider
+
+from web3utils.web3proxies import DefaultedWeb3, ProxyEth
+
+from benchmarks.common import report
+
+
+def measure(accesses=1000000):
+    provider = HTTPProvider('http://127.0.0.1:8545/')
+    direct = Web3(provider)
+    web3 = DefaultedWeb3()
+    web3.setProvider(provider)
+    eth = ProxyEth(web3)
+    scenarios = (
+        ('direct', lambda: direct.eth.getBalance),
+        ('web3', lambda: web3.eth.getBalance),
+        ('eth', lambda: eth.getBalance),
+    )
+    results = OrderedDict()
+    for name, scenario in scenarios:
+        seconds = min(timeit.repeat(scenario, number=accesses, repeat=3))
+        results[name] = (seconds / accesses * 1e9, 'ns/access')
+    return results
+
+
+def main(accesses=1000000):
+    report(measure(accesses))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
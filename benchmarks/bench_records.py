@@ -0,0 +1,64 @@
+'''
+Measure the memory and time a ChainCache spends on confident blocks, with web3.py's dicts
+("dicts") and with compact records of a few fields ("records").
+
+Memory is what the cache holds per transaction, after the blocks were fetched from a local
+stand-in node. Fetching is timed separately, without tracing memory, and includes the RPC.
+
+Run from the repository root: python -m benchmarks.bench_records [blocks] [txs/block]
+'''
+
+from collections import OrderedDict
+import gc
+import sys
+import time
+import tracemalloc
+
+from web3 import Web3, HTTPProvider
+
+from web3utils.chaincache import ChainCache
+
+from tests.standin import StandInChain, StandInNode
+
+from benchmarks.common import report
+
+SCENARIOS = (
+    ('dicts', {}),
+    ('records', {'block_fields': ('timestamp', ), 'tx_fields': ('from', 'to', 'value')}),
+)
+
+
+def measure(blocks=20, txs_per_block=500):
+    chain = StandInChain(height=blocks, txs_per_block=txs_per_block)
+    results = OrderedDict()
+    with StandInNode(chain.handlers()) as node:
+        eth = Web3(HTTPProvider(node.uri)).eth
+        for name, fields in SCENARIOS:
+            gc.collect()
+            tracemalloc.start()
+            cache = fill_cache(eth, blocks, txs_per_block, fields)
+            gc.collect()
+            held, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del cache
+            results[name + '_memory'] = (held / (blocks * txs_per_block), 'bytes/tx')
+
+            start = time.perf_counter()
+            fill_cache(eth, blocks, txs_per_block, fields)
+            results[name + '_fetch'] = (blocks / (time.perf_counter() - start), 'blocks/s')
+    return results
+
+
+def fill_cache(eth, blocks, txs_per_block, fields):
+    cache = ChainCache(eth, max_blocks=blocks, max_txs=blocks * txs_per_block, **fields)
+    for number in range(1, blocks + 1):
+        cache.get_block_with_txs(number)
+    return cache
+
+
+def main(blocks=20, txs_per_block=500):
+    report(measure(blocks, txs_per_block))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
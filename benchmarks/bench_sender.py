@@ -0,0 +1,73 @@
+'''
+Measure how fast transactions are sent from one account, to a local stand-in node that signs
+them, with a configurable RPC latency.
+
+"web3" sends each transfer with web3.py, which estimates gas and reads the block gas limit
+before every send. "sender" sends each through a TransactionSender, with a local nonce and a
+cached gas estimate, and "sender_batch" queues them all up to send in JSON-RPC batches.
+
+Run from the repository root: python -m benchmarks.bench_sender [transactions] [latency_ms]
+'''
+
+from collections import OrderedDict
+from concurrent.futures import Future
+import sys
+import time
+
+from web3 import Web3
+
+from web3utils.providers import PooledHTTPProvider
+from web3utils.sender import TransactionSender
+
+from tests.standin import StandInAccounts, StandInNode, TOKEN_ABI, TOKEN_ADDRESS, address
+
+from benchmarks.common import report
+
+SENDER = address(0xa)
+
+
+def with_web3(contract, transactions):
+    for num in range(transactions):
+        contract.transact({'from': SENDER}).transfer(address(num), num)
+
+
+def with_sender(contract, transactions):
+    sender = TransactionSender(contract.web3)
+    for num in range(transactions):
+        sender.send(sender.transaction(contract, 'transfer', (address(num), num), {'from': SENDER}))
+
+
+def with_sender_batch(contract, transactions):
+    sender = TransactionSender(contract.web3)
+    queued = [
+        (sender.transaction(contract, 'transfer', (address(num), num), {'from': SENDER}), Future())
+        for num in range(transactions)
+    ]
+    sender.send_many(queued)
+    for _, future in queued:
+        future.result()
+
+
+def measure(transactions=200, latency_ms=1):
+    results = OrderedDict()
+    scenarios = (('web3', with_web3), ('sender', with_sender), ('sender_batch', with_sender_batch))
+    for name, send in scenarios:
+        accounts = StandInAccounts()
+        with StandInNode(accounts.handlers(), latency=latency_ms / 1000) as node:
+            provider = PooledHTTPProvider(node.uri)
+            contract = Web3(provider).eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS)
+            start = time.perf_counter()
+            send(contract, transactions)
+            elapsed = time.perf_counter() - start
+            provider.close()
+        assert len(accounts.mined(SENDER)) == transactions
+        results[name] = (transactions / elapsed, 'txs/s')
+    return results
+
+
+def main(transactions=200, latency_ms=1):
+    report(measure(transactions, latency_ms))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,62 @@
+'''
+Measure hashing many 64-byte storage keys with DefaultedWeb3.
+
+"node" is the old path: web3_sha3 on a local stand-in node, then decoding the hex result.
+"local" hashes each key with web3.sha3(), and "many" with web3.sha3_many().
+"memo" hashes keys that repeat 10 times each, with sha3_many and an LRUCache memo.
+
+Run from the repository root: python -m benchmarks.bench_sha3 [keys]
+'''
+
+from collections import OrderedDict
+import codecs
+import sys
+import timeit
+
+from web3 import HTTPProvider
+
+from web3utils.caching import LRUCache
+from web3utils.hashing import keccak
+from web3utils.web3proxies import DefaultedWeb3
+
+from tests.standin import StandInNode
+
+from benchmarks.common import report
+
+
+def web3_sha3(hex_value):
+    return '0x' + keccak(codecs.decode(hex_value[2:], 'hex')).hex()
+
+
+def measure(keys=100000):
+    results = OrderedDict()
+    values = [n.to_bytes(64, 'big') for n in range(keys)]
+    repeated = values[:keys // 10] * 10
+    web3 = DefaultedWeb3()
+    with StandInNode({'web3_sha3': web3_sha3}) as node:
+        node_web3 = DefaultedWeb3()
+        node_web3.setProvider(HTTPProvider(node.uri))
+        node_keys = values[:min(keys, 1000)]
+        seconds = timeit.timeit(lambda: [
+            codecs.decode(node_web3._proxyto.sha3(value, encoding='bytes')[2:], 'hex')
+            for value in node_keys
+        ], number=1)
+        results['node'] = (seconds / len(node_keys) * 1e6, 'us/hash')
+
+    scenarios = (
+        ('local', values, lambda: [web3.sha3(value) for value in values]),
+        ('many', values, lambda: web3.sha3_many(values)),
+        ('memo', repeated, lambda: web3.sha3_many(repeated, memo=LRUCache(keys))),
+    )
+    for name, hashed, scenario in scenarios:
+        seconds = min(timeit.repeat(scenario, number=1, repeat=3))
+        results[name] = (seconds / len(hashed) * 1e6, 'us/hash')
+    return results
+
+
+def main(keys=100000):
+    report(measure(keys))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
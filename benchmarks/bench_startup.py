@@ -0,0 +1,50 @@
+'''
+Measure the latency from `import web3utils` to the first use of `web3`.
+
+Each sample runs in a fresh interpreter, so that import caching does not hide any cost.
+
+Run from the repository root: python -m benchmarks.bench_startup [samples]
+'''
+
+from collections import OrderedDict
+import json
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import report
+
+SAMPLE_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+from web3utils import web3
+imported = time.perf_counter()
+try:
+    web3.eth
+except Exception:
+    pass
+first_use = time.perf_counter()
+print(json.dumps({'import': imported - start, 'first_use': first_use - imported}))
+'''
+
+
+def sample():
+    output = subprocess.check_output([sys.executable, '-c', SAMPLE_SCRIPT])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def measure(samples=10):
+    'the median latency of each phase'
+    results = [sample() for _ in range(samples)]
+    return OrderedDict(
+        (phase, (statistics.median(result[phase] for result in results) * 1000, 'ms'))
+        for phase in ('import', 'first_use')
+    )
+
+
+def main(samples=10):
+    report(measure(samples))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,79 @@
+'''
+Measure how long a TransactionMonitor takes to hand a new block to a block watcher, from when
+the node has it, against a local stand-in node that answers both HTTP and WebSocket.
+
+"poll" polls a block filter every poll_interval, and "subscribe" is pushed new heads with
+`eth_subscribe`. Both fetch the block over HTTP before calling the watcher. Blocks are mined at
+random points between polls. Each also counts the HTTP requests per block, including polls that
+found nothing.
+
+Run from the repository root:
+python -m benchmarks.bench_subscriptions [blocks] [poll_interval_ms]
+'''
+
+from collections import OrderedDict
+import random
+import sys
+import threading
+import time
+
+from web3 import HTTPProvider
+
+from web3utils import web3
+from web3utils.monitors import TransactionMonitor
+
+from tests.standin import StandInChain, StandInNode
+
+from benchmarks.common import report
+
+
+def head_latency(chain, node, monitor, blocks, poll_interval):
+    'the mean seconds from a new head to its watcher being called'
+    spread = random.Random(blocks)
+    arrived = {}
+    changed = threading.Condition()
+
+    def watcher(block):
+        with changed:
+            arrived[block['number']] = time.perf_counter()
+            changed.notify_all()
+
+    monitor.watch_blocks(watcher)
+    total = 0
+    for _ in range(blocks):
+        time.sleep(spread.uniform(0, poll_interval))
+        chain.mine()
+        number = chain.height
+        mined_at = time.perf_counter()
+        node.notify('newHeads', chain.block(number))
+        with changed:
+            changed.wait_for(lambda: number in arrived, timeout=10)
+        total += arrived[number] - mined_at
+    return total / blocks
+
+
+def measure(blocks=20, poll_interval_ms=250):
+    results = OrderedDict()
+    for name in ('poll', 'subscribe'):
+        chain = StandInChain(height=10, txs_per_block=10)
+        with StandInNode(chain.handlers()) as node:
+            web3.setProvider(HTTPProvider(node.uri))
+            monitor = TransactionMonitor(
+                poll_interval=poll_interval_ms / 1000,
+                ws_uri=node.ws_uri if name == 'subscribe' else None,
+            )
+            try:
+                latency = head_latency(chain, node, monitor, blocks, poll_interval_ms / 1000)
+            finally:
+                monitor.stop()
+            results[name + '_latency'] = (latency * 1000, 'ms')
+            results[name + '_requests'] = (node.http_requests / blocks, 'requests/block')
+    return results
+
+
+def main(blocks=20, poll_interval_ms=250):
+    report(measure(blocks, poll_interval_ms))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
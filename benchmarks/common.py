@@ -0,0 +1,16 @@
+'''
+Helpers shared by the benchmarks.
+
+Each benchmark module has a `measure()` function, which returns an OrderedDict of
+metric name -> (value, unit), and a `main()` that prints them. Units per second are better
+when higher, and all others (like us/call) when lower.
+'''
+
+
+def higher_is_better(unit):
+    return unit.endswith('/s')
+
+
+def report(results):
+    for name, (value, unit) in results.items():
+        print('%-24s %12.3f %s' % (name, value, unit))
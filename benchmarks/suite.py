@@ -0,0 +1,150 @@
+'''
+Run all the benchmarks, store the results, and compare them to results stored earlier.
+
+    python -m benchmarks.suite --save before
+    (change something)
+    python -m benchmarks.suite --save after --compare before
+
+Results are saved as JSON in benchmarks/results/, with the Python and web3.py versions and the
+git revision they were measured at. Comparisons flag every metric that got worse by more than
+the threshold; the exit status is 1 if any did. Timings vary from run to run, so compare results
+measured on the same machine, and rerun before trusting a small regression.
+
+Use --quick for a faster, noisier run, like in CI.
+'''
+
+import argparse
+from collections import OrderedDict
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import web3
+
+from benchmarks.common import higher_is_better
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# benchmark module -> arguments to measure() for a full run, and for a quick run
+BENCHMARKS = OrderedDict([
+    ('bench_startup', ((10,), (3,))),
+    ('bench_proxy', ((1000000,), (100000,))),
+    ('bench_contract_method', ((100000,), (10000,))),
+    ('bench_monitor', ((50, 100, 1), (10, 50, 1))),
+    ('bench_sha3', ((100000,), (10000,))),
+    ('bench_encodings', ((100000,), (10000,))),
+    ('bench_http_pool', ((16, 2000), (8, 200))),
+    ('bench_records', ((20, 500), (5, 200))),
+    ('bench_sender', ((200, 1), (50, 1))),
+    ('bench_confirmations', ((10, 100, 1), (5, 20, 1))),
+    ('bench_subscriptions', ((20, 250), (5, 100))),
+])
+
+
+def run(names, quick=False):
+    'run the named benchmarks, and return their results as {"bench.metric": [value, unit]}'
+    results = OrderedDict()
+    for name in names:
+        full_args, quick_args = BENCHMARKS[name]
+        module = importlib.import_module('benchmarks.' + name)
+        print('running %s...' % name, file=sys.stderr)
+        measured = module.measure(*(quick_args if quick else full_args))
+        for metric, (value, unit) in measured.items():
+            results['%s.%s' % (name[len('bench_'):], metric)] = [value, unit]
+    return results
+
+
+def environment():
+    try:
+        revision = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'python': platform.python_version(),
+        'web3': web3.__version__,
+        'revision': revision,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def results_path(label):
+    return os.path.join(RESULTS_DIR, label + '.json')
+
+
+def save(label, results):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(results_path(label), 'w') as results_file:
+        json.dump({'environment': environment(), 'results': results}, results_file, indent=2)
+
+
+def load(label):
+    with open(results_path(label)) as results_file:
+        return json.load(results_file, object_pairs_hook=OrderedDict)
+
+
+def compare(baseline, results, threshold):
+    '''
+    @return a row per metric in both: (metric, old value, new value, unit, change, regressed),
+        where change is the relative improvement, so negative is worse
+    '''
+    rows = []
+    for metric, (value, unit) in results.items():
+        if metric not in baseline:
+            continue
+        old_value = baseline[metric][0]
+        if not old_value or not value:
+            continue
+        if higher_is_better(unit):
+            change = value / old_value - 1
+        else:
+            change = old_value / value - 1
+        rows.append((metric, old_value, value, unit, change, change < -threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', help='comma-separated benchmarks to run, like sha3,proxy')
+    parser.add_argument('--quick', action='store_true', help='run smaller, noisier benchmarks')
+    parser.add_argument('--save', metavar='LABEL', help='store the results under this label')
+    parser.add_argument('--compare', metavar='LABEL', help='compare to results stored earlier')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='flag metrics more than this fraction worse than the baseline (default 0.1)',
+    )
+    args = parser.parse_args(argv)
+
+    if args.only:
+        names = ['bench_' + name.strip() for name in args.only.split(',')]
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            parser.error('unknown benchmarks: %s' % ', '.join(unknown))
+    else:
+        names = list(BENCHMARKS)
+
+    baseline = load(args.compare) if args.compare else None
+    results = run(names, args.quick)
+    if args.save:
+        save(args.save, results)
+
+    if baseline is None:
+        for metric, (value, unit) in results.items():
+            print('%-32s %12.3f %s' % (metric, value, unit))
+        return 0
+
+    rows = compare(baseline['results'], results, args.threshold)
+    print('compared to %s, at revision %s' % (args.compare, baseline['environment']['revision']))
+    for metric, old_value, value, unit, change, regressed in rows:
+        print('%-32s %12.3f -> %12.3f %-12s %+7.1f%%%s' % (
+            metric, old_value, value, unit, change * 100, '  REGRESSED' if regressed else ''))
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
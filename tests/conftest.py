@@ -2,7 +2,11 @@
 import pytest
 from unittest.mock import Mock, MagicMock
 
-from web3utils import sweeten_contracts, DefaultedWeb3
+from web3 import Web3, HTTPProvider
+
+from web3utils import ContractSugar, sweeten_contracts, DefaultedWeb3
+
+from tests.standin import StandInNode, TOKEN_ABI, TOKEN_ADDRESS, token_handlers
 
 @pytest.fixture()
 def untouchable():
@@ -20,3 +24,13 @@ def mockweb3(provider):
     web3.setProvider(provider)
     web3._proxyto = MagicMock()
     return web3
+
+@pytest.fixture()
+def node():
+    with StandInNode(token_handlers()) as standin:
+        yield standin
+
+@pytest.fixture()
+def token(node):
+    web3 = Web3(HTTPProvider(node.uri))
+    return ContractSugar(web3.eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
@@ -0,0 +1,610 @@
+'''
+A local stand-in for an Ethereum node's HTTP JSON-RPC interface, for tests and benchmarks.
+
+Register a handler per RPC method; each handler receives the request params as arguments.
+Raise StandInError from a handler to answer with a JSON-RPC error.
+
+The same port also answers JSON-RPC over WebSocket, at `node.ws_uri`, including `eth_subscribe`.
+Push to subscribers with `node.notify(subscription, result)`.
+'''
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import itertools
+import json
+import socket
+from socketserver import ThreadingMixIn
+import threading
+import time
+
+from web3utils.websocket import (
+    OP_CLOSE,
+    OP_PING,
+    OP_PONG,
+    OP_TEXT,
+    accept_key,
+    encode_frame,
+    read_frame,
+)
+
+
+class StandInError(Exception):
+    def __init__(self, message, code=-32000):
+        super().__init__(message)
+        self.code = code
+
+
+class StandInNode:
+
+    def __init__(self, handlers=None, latency=0):
+        '''
+        @param handlers a dict of RPC method name to handler
+        @param latency seconds to wait before answering each HTTP request
+        '''
+        self.handlers = dict(handlers or {})
+        self.latency = latency
+        self.http_requests = 0
+        self.rpc_methods = []
+        self.ws_messages = 0
+        self._lock = threading.Lock()
+        self._server = None
+        # subscription id -> (subscription type, _StandInWebSocket)
+        self._subscriptions = {}
+        self._subscription_ids = itertools.count(1)
+
+    @property
+    def connections(self):
+        'how many TCP connections clients have opened'
+        return self._server.connections_opened
+
+    @property
+    def uri(self):
+        host, port = self._server.server_address
+        return 'http://%s:%d/' % (host, port)
+
+    @property
+    def ws_uri(self):
+        host, port = self._server.server_address
+        return 'ws://%s:%d/' % (host, port)
+
+    def notify(self, subscription, result):
+        '''
+        push a result to every subscriber of the subscription, like 'newHeads'
+
+        @return how many subscribers it was sent to
+        '''
+        with self._lock:
+            subscribers = [
+                (subscription_id, websocket)
+                for subscription_id, (kind, websocket) in self._subscriptions.items()
+                if kind == subscription
+            ]
+        for subscription_id, websocket in subscribers:
+            websocket.send({
+                'jsonrpc': '2.0',
+                'method': 'eth_subscription',
+                'params': {'subscription': subscription_id, 'result': result},
+            })
+        return len(subscribers)
+
+    def drop_websockets(self):
+        'close all WebSocket connections, and forget their subscriptions'
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, {}
+        for _, websocket in subscriptions.values():
+            websocket.close()
+
+    def start(self):
+        self._server = _ThreadedHTTPServer(('127.0.0.1', 0), _make_handler(self))
+        threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True,
+            ).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._server.close_connections()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def answer(self, payload):
+        with self._lock:
+            self.http_requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(payload, list):
+            return [self._answer_one(request) for request in payload]
+        else:
+            return self._answer_one(payload)
+
+    def answer_websocket(self, websocket, request):
+        with self._lock:
+            self.ws_messages += 1
+        if request.get('method') != 'eth_subscribe':
+            return self._answer_one(request)
+        with self._lock:
+            self.rpc_methods.append('eth_subscribe')
+            subscription_id = hex(next(self._subscription_ids))
+            self._subscriptions[subscription_id] = (request['params'][0], websocket)
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': subscription_id}
+
+    def _answer_one(self, request):
+        method = request.get('method')
+        with self._lock:
+            self.rpc_methods.append(method)
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        handler = self.handlers.get(method)
+        if handler is None:
+            response['error'] = {'code': -32601, 'message': 'method %s not found' % method}
+            return response
+        try:
+            response['result'] = handler(*request.get('params', []))
+        except StandInError as exc:
+            response['error'] = {'code': exc.code, 'message': str(exc)}
+        return response
+
+
+class _ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.connections_opened = 0
+        self._connections = set()
+
+    def process_request(self, request, client_address):
+        self.connections_opened += 1
+        self._connections.add(request)
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request):
+        self._connections.discard(request)
+        super().shutdown_request(request)
+
+    def close_connections(self):
+        'drop kept-alive connections, so a stopped node stops answering, like a real one'
+        for request in list(self._connections):
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _make_handler(node):
+    class JSONRPCHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+            body = json.dumps(node.answer(payload)).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.headers.get('Upgrade', '').lower() != 'websocket':
+                self.send_error(400)
+                return
+            self.send_response(101)
+            self.send_header('Upgrade', 'websocket')
+            self.send_header('Connection', 'Upgrade')
+            self.send_header('Sec-WebSocket-Accept', accept_key(self.headers['Sec-WebSocket-Key']))
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+            websocket = _StandInWebSocket(self.connection)
+            while True:
+                try:
+                    _, opcode, payload = read_frame(self.rfile)
+                except OSError:
+                    return
+                if opcode == OP_CLOSE:
+                    websocket.close()
+                    return
+                elif opcode == OP_PING:
+                    websocket.send_frame(OP_PONG, payload)
+                elif opcode == OP_TEXT:
+                    request = json.loads(payload.decode('utf-8'))
+                    websocket.send(node.answer_websocket(websocket, request))
+
+        def log_message(self, *args):
+            pass
+
+    return JSONRPCHandler
+
+
+class _StandInWebSocket:
+    'the server side of a WebSocket connection, which any thread may send to'
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        self.send_frame(OP_TEXT, json.dumps(message).encode('utf-8'))
+
+    def send_frame(self, opcode, payload):
+        with self._lock:
+            try:
+                self._connection.sendall(encode_frame(opcode, payload))
+            except OSError:
+                pass
+
+    def close(self):
+        self.send_frame(OP_CLOSE, b'')
+        try:
+            self._connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class StandInChain:
+    '''
+    A deterministic chain of blocks and transactions, to serve from a StandInNode.
+
+        chain = StandInChain(height=100, txs_per_block=20)
+        with StandInNode(chain.handlers()) as node:
+            ...
+    '''
+
+    def __init__(self, height=100, txs_per_block=10):
+        self.height = height
+        self.txs_per_block = txs_per_block
+        # filter id -> height last reported by the filter, or None for pending filters
+        self.filters = {}
+        self._filter_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def mine(self, count=1):
+        with self._lock:
+            self.height += count
+
+    def expire_filters(self):
+        'forget all filters, like a node does when it restarts'
+        with self._lock:
+            self.filters.clear()
+
+    def handlers(self):
+        return {
+            'eth_blockNumber': lambda: hex(self.height),
+            'eth_getBlockByNumber': self._block_by_number,
+            'eth_getBlockByHash': self._block_by_hash,
+            'eth_getTransactionByHash': self._transaction_by_hash,
+            'eth_newBlockFilter': lambda: self._new_filter(self.height),
+            'eth_newPendingTransactionFilter': lambda: self._new_filter(None),
+            'eth_getFilterChanges': self._filter_changes,
+            'eth_uninstallFilter': self._uninstall_filter,
+        }
+
+    def block_hash(self, number):
+        return '0x%064x' % (0xb10c << 128 | number)
+
+    def tx_hash(self, number, index):
+        return '0x%064x' % (0x7 << 128 | number << 32 | index)
+
+    def block(self, number, full_transactions=False):
+        if number > self.height:
+            return None
+        txs = [self.transaction(number, index) for index in range(self.txs_per_block)]
+        return {
+            'number': hex(number),
+            'hash': self.block_hash(number),
+            'parentHash': self.block_hash(number - 1) if number else '0x' + '00' * 32,
+            'timestamp': hex(1500000000 + 15 * number),
+            'gasLimit': hex(4700000),
+            'gasUsed': hex(21000 * len(txs)),
+            'transactions': txs if full_transactions else [tx['hash'] for tx in txs],
+        }
+
+    def transaction(self, number, index):
+        return {
+            'hash': self.tx_hash(number, index),
+            'blockHash': self.block_hash(number),
+            'blockNumber': hex(number),
+            'transactionIndex': hex(index),
+            'from': '0x%040x' % (0xf << 32 | index),
+            'to': '0x%040x' % (0x7 << 32 | index),
+            'value': hex(10 ** 18 + index),
+            'gas': hex(21000),
+            'gasPrice': hex(20 * 10 ** 9),
+            'nonce': hex(number),
+            'input': '0x',
+        }
+
+    def _new_filter(self, height):
+        with self._lock:
+            filter_id = hex(next(self._filter_ids))
+            self.filters[filter_id] = height
+        return filter_id
+
+    def _filter_changes(self, filter_id):
+        with self._lock:
+            if filter_id not in self.filters:
+                raise StandInError('filter not found')
+            reported = self.filters[filter_id]
+            if reported is None:
+                return []
+            self.filters[filter_id] = self.height
+            return [self.block_hash(number) for number in range(reported + 1, self.height + 1)]
+
+    def _uninstall_filter(self, filter_id):
+        with self._lock:
+            return self.filters.pop(filter_id, None) is not None
+
+    def _block_by_number(self, block_identifier, full_transactions=False):
+        if block_identifier == 'latest':
+            number = self.height
+        else:
+            number = int(block_identifier, 16)
+        return self.block(number, full_transactions)
+
+    def _block_by_hash(self, block_hash, full_transactions=False):
+        number = int(block_hash, 16) & (2 ** 128 - 1)
+        if self.block_hash(number) != block_hash:
+            return None
+        return self.block(number, full_transactions)
+
+    def _transaction_by_hash(self, tx_hash):
+        packed = int(tx_hash, 16)
+        number, index = (packed >> 32) & (2 ** 96 - 1), packed & (2 ** 32 - 1)
+        if self.tx_hash(number, index) != tx_hash or number > self.height:
+            return None
+        return self.transaction(number, index)
+
+
+# A fake token contract, at TOKEN_ADDRESS. balanceOf(address(n)) is n * 1000, except for
+# address(13), which fails. owner() is empty.
+
+TOKEN_ADDRESS = '0x' + '11' * 20
+COINBASE = '0x' + '22' * 20
+
+BALANCE_OF = '0x70a08231'
+OWNER = '0x8da5cb5b'
+
+TOKEN_ABI = [
+    {
+        'constant': True,
+        'inputs': [{'name': 'who', 'type': 'address'}],
+        'name': 'balanceOf',
+        'outputs': [{'name': '', 'type': 'uint256'}],
+        'type': 'function',
+    },
+    {
+        'constant': True,
+        'inputs': [],
+        'name': 'owner',
+        'outputs': [{'name': '', 'type': 'address'}],
+        'type': 'function',
+    },
+    {
+        'constant': False,
+        'inputs': [{'name': 'dst', 'type': 'address'}, {'name': 'wad', 'type': 'uint256'}],
+        'name': 'transfer',
+        'outputs': [{'name': '', 'type': 'bool'}],
+        'type': 'function',
+    },
+    {
+        'anonymous': False,
+        'inputs': [
+            {'indexed': True, 'name': 'src', 'type': 'address'},
+            {'indexed': True, 'name': 'dst', 'type': 'address'},
+            {'indexed': False, 'name': 'wad', 'type': 'uint256'},
+        ],
+        'name': 'Transfer',
+        'type': 'event',
+    },
+]
+
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+
+def address(num):
+    return '0x' + ('%040x' % num)
+
+
+def uint256_hex(num):
+    return '0x' + ('%064x' % num)
+
+
+def token_call(transaction, block_identifier):
+    'an eth_call handler for the fake token'
+    data = transaction['data']
+    if data.startswith(BALANCE_OF):
+        who = int(data[-40:], 16)
+        if who == 13:
+            raise StandInError('unlucky')
+        return uint256_hex(who * 1000)
+    elif data.startswith(OWNER):
+        return uint256_hex(0)
+    else:
+        raise StandInError('unknown function %s' % data[:10])
+
+
+def token_handlers():
+    return {
+        'eth_call': token_call,
+        'eth_coinbase': lambda: COINBASE,
+    }
+
+
+class StandInLogs:
+    '''
+    Transfer logs of the fake token, served by eth_getLogs.
+
+    Block n has n % 4 transfers, the i-th from address(n) to address(i), of i * 10 tokens.
+    Like many nodes, eth_getLogs fails when a query matches more than max_results logs.
+    '''
+
+    def __init__(self, height=1000, max_results=None):
+        self.height = height
+        self.max_results = max_results
+        # (first block, last block) of each eth_getLogs request
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def handlers(self):
+        return {
+            'eth_blockNumber': lambda: hex(self.height),
+            'eth_getLogs': self._get_logs,
+        }
+
+    def logs(self, number):
+        return [
+            {
+                'address': TOKEN_ADDRESS,
+                'topics': [TRANSFER_TOPIC, _topic(address(number)), _topic(address(index))],
+                'data': uint256_hex(index * 10),
+                'blockNumber': hex(number),
+                'blockHash': '0x%064x' % (0xb10c << 128 | number),
+                'transactionHash': '0x%064x' % (0x7 << 128 | number << 32 | index),
+                'transactionIndex': hex(index),
+                'logIndex': hex(index),
+            }
+            for index in range(number % 4)
+        ]
+
+    def _get_logs(self, params):
+        first, last = int(params['fromBlock'], 16), int(params['toBlock'], 16)
+        with self._lock:
+            self.queries.append((first, last))
+        matches = [
+            log
+            for number in range(first, min(last, self.height) + 1)
+            for log in self.logs(number)
+            if _log_matches(log, params)
+        ]
+        if self.max_results is not None and len(matches) > self.max_results:
+            raise StandInError('query returned more than %d results' % self.max_results)
+        return matches
+
+
+def _topic(address_hex):
+    return '0x' + '00' * 12 + address_hex[2:]
+
+
+def _log_matches(log, params):
+    if params.get('address') not in (None, log['address']):
+        return False
+    for wanted, topic in itertools.zip_longest(params.get('topics', []), log['topics']):
+        if wanted is None:
+            continue
+        elif topic is None or topic not in ([wanted] if isinstance(wanted, str) else wanted):
+            return False
+    return True
+
+
+class StandInAccounts:
+    '''
+    Accounts that the stand-in node signs for, with eth_sendTransaction.
+
+    Each account has a next nonce, which transactions without one get. Transactions below it are
+    rejected with "nonce too low", and those above it wait until the gap is filled, like in
+    a node's transaction pool. Sending the same transaction again is rejected with "already
+    known". Every accepted transaction stays pending, until it is dropped with `drop()`.
+    A transaction with a value of INSUFFICIENT_FUNDS is rejected.
+    '''
+
+    INSUFFICIENT_FUNDS = 10 ** 30
+
+    def __init__(self, gas_estimate=50000):
+        self.gas_estimate = gas_estimate
+        # account -> next nonce
+        self.nonces = {}
+        # account -> nonce -> transaction, for every accepted transaction
+        self.sent = {}
+        self.estimates = 0
+        self._lock = threading.Lock()
+
+    def handlers(self):
+        # web3.py reads the gas limit of the latest block, when it estimates gas itself
+        handlers = StandInChain(height=1, txs_per_block=0).handlers()
+        handlers.update(token_handlers())
+        handlers.update({
+            'eth_getTransactionCount': self._transaction_count,
+            'eth_estimateGas': self._estimate_gas,
+            'eth_sendTransaction': self._send_transaction,
+            'eth_getTransactionByHash': self._transaction_by_hash,
+            'eth_pendingTransactions': self._pending_transactions,
+        })
+        return handlers
+
+    def drop(self, account, nonce):
+        'forget an accepted transaction, like a node whose pool overflowed'
+        with self._lock:
+            del self.sent[account][nonce]
+            self.nonces[account] = min(self.nonces[account], nonce)
+
+    def mined(self, account):
+        'the transactions of the account that are not waiting on a gap, in nonce order'
+        sent = self.sent.get(account, {})
+        return [sent[nonce] for nonce in range(self.nonces.get(account, 0))]
+
+    def _transaction_count(self, account, block_identifier):
+        with self._lock:
+            return hex(self.nonces.get(account, 0))
+
+    def _estimate_gas(self, transaction):
+        with self._lock:
+            self.estimates += 1
+        return hex(self.gas_estimate)
+
+    def _send_transaction(self, transaction):
+        account = transaction['from']
+        if int(transaction.get('value', '0x0'), 16) == self.INSUFFICIENT_FUNDS:
+            raise StandInError('insufficient funds for gas * price + value')
+        with self._lock:
+            next_nonce = self.nonces.get(account, 0)
+            if 'nonce' in transaction:
+                nonce = int(transaction['nonce'], 16)
+            else:
+                nonce = next_nonce
+            sent = self.sent.setdefault(account, {})
+            if dict(sent.get(nonce, {}), nonce=hex(nonce)) == dict(transaction, nonce=hex(nonce)):
+                raise StandInError('already known')
+            if nonce < next_nonce or nonce in sent:
+                raise StandInError('nonce too low')
+            sent[nonce] = transaction
+            while next_nonce in sent:
+                next_nonce += 1
+            self.nonces[account] = next_nonce
+        return _sent_hash(transaction, nonce)
+
+    def _transaction_by_hash(self, txid):
+        packed = int(txid, 16)
+        account = '0x%040x' % (packed >> 64 & (2 ** 160 - 1))
+        nonce = packed & (2 ** 64 - 1)
+        with self._lock:
+            transaction = self.sent.get(account, {}).get(nonce)
+            if transaction is None or _sent_hash(transaction, nonce) != txid:
+                return None
+            return self._pending(account, nonce)
+
+    def _pending_transactions(self):
+        with self._lock:
+            return [
+                self._pending(account, nonce)
+                for account, sent in self.sent.items() for nonce in sent
+            ]
+
+    def _pending(self, account, nonce):
+        return dict(
+            self.sent[account][nonce],
+            hash=_sent_hash(self.sent[account][nonce], nonce),
+            nonce=hex(nonce),
+            blockNumber=None,
+        )
+
+
+def _sent_hash(transaction, nonce):
+    'a made-up hash, that packs the value, sender and nonce of the transaction'
+    value = int(transaction.get('value', '0x0'), 16)
+    return '0x%064x' % (value << 224 | int(transaction['from'], 16) << 64 | nonce)
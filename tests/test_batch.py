@@ -0,0 +1,57 @@
+import pytest
+
+from tests.standin import COINBASE, address
+
+
+def test_batch_results_in_order(token):
+    with token.batch() as batch:
+        futures = [batch.balanceOf(address(num)) for num in range(1, 6)]
+    assert [future.result() for future in futures] == [1000, 2000, 3000, 4000, 5000]
+
+
+def test_batch_chunks_requests(node, token):
+    with token.batch(batch_size=2) as batch:
+        futures = [batch.balanceOf(address(num)) for num in range(1, 6)]
+    assert all(future.done() for future in futures)
+    # one request to look up the coinbase, then three batches
+    assert node.http_requests == 4
+    assert node.rpc_methods.count('eth_call') == 5
+
+
+def test_batch_empty_result_is_none(token):
+    with token.batch() as batch:
+        owner = batch.owner()
+    assert owner.result() is None
+
+
+def test_batch_error_only_fails_its_call(token):
+    with token.batch() as batch:
+        unlucky = batch.balanceOf(address(13))
+        lucky = batch.balanceOf(address(7))
+    with pytest.raises(ValueError):
+        unlucky.result()
+    assert lucky.result() == 7000
+
+
+def test_batch_sends_explicit_sender(node, token):
+    with token.batch(transaction={'from': COINBASE}) as batch:
+        batch.owner()
+    assert node.rpc_methods == ['eth_call']
+
+
+def test_batch_not_sent_on_exception(node, token):
+    with pytest.raises(RuntimeError):
+        with token.batch() as batch:
+            future = batch.owner()
+            raise RuntimeError()
+    assert future.cancelled()
+    assert node.http_requests == 0
+
+
+def test_batch_fails_all_calls_when_node_is_down(node, token):
+    node.stop()
+    with token.batch() as batch:
+        futures = [batch.balanceOf(address(num)) for num in range(1, 3)]
+    for future in futures:
+        with pytest.raises(Exception):
+            future.result(0)
@@ -0,0 +1,83 @@
+import pytest
+
+from web3.utils.datastructures import AttributeDict
+
+from web3utils.blockstore import BlockStore
+
+
+def block(number, branch='a', num_txs=2):
+    return AttributeDict({
+        'number': number,
+        'hash': '0x%s%063x' % (branch, number),
+        'transactions': [tx_hash(number, index, branch) for index in range(num_txs)],
+    })
+
+
+def tx_hash(number, index, branch='a'):
+    return '0x%s%031x%032x' % (branch, number, index)
+
+
+def txs(number, branch='a', num_txs=2):
+    return [
+        AttributeDict({
+            'hash': tx_hash(number, index, branch), 'blockNumber': number, 'value': 10 ** 20})
+        for index in range(num_txs)
+    ]
+
+
+@pytest.fixture
+def store():
+    store = BlockStore(':memory:')
+    yield store
+    store.close()
+
+
+def test_lookups(store):
+    assert store.latest_block() is None
+    for number in (5, 6):
+        store.add(block(number), txs(number))
+
+    assert store.get_block(5) == block(5)
+    assert store.get_block(block(6)['hash']) == block(6)
+    assert store.get_block(7) is None
+    assert store.get_block('latest') is None
+    assert store.latest_block() == block(6)
+    assert store.get_block_with_txs(6) == (block(6), txs(6))
+    assert store.get_block_with_txs(7) == (None, [])
+    assert store.get_transaction(tx_hash(5, 1)).value == 10 ** 20
+    assert store.get_transaction(tx_hash(7, 1)) is None
+
+
+def test_replace_and_rollback(store):
+    for number in range(5, 10):
+        store.add(block(number), txs(number))
+    store.add(block(9, 'b', num_txs=1), txs(9, 'b', num_txs=1))
+    assert store.get_block_with_txs(9) == (block(9, 'b', num_txs=1), txs(9, 'b', num_txs=1))
+    assert store.get_transaction(tx_hash(9, 1)) is None
+
+    store.rollback(7)
+    assert store.latest_block() == block(6)
+    assert store.get_transaction(tx_hash(8, 0)) is None
+    assert len(store) == 2
+
+
+def test_max_blocks():
+    store = BlockStore(':memory:', max_blocks=3)
+    for number in range(10):
+        store.add(block(number), txs(number))
+    assert len(store) == 3
+    assert store.get_block(6) is None
+    assert store.get_transaction(tx_hash(6, 0)) is None
+    assert store.get_block(7) == block(7)
+
+
+def test_persisted(tmpdir):
+    path = str(tmpdir.join('blocks.sqlite'))
+    store = BlockStore(path)
+    store.add(block(5), txs(5))
+    store.close()
+
+    reopened = BlockStore(path)
+    assert reopened.latest_block() == block(5)
+    assert reopened.get_block_with_txs(5) == (block(5), txs(5))
+    reopened.close()
@@ -0,0 +1,46 @@
+import pytest
+
+from web3utils.caching import LRUCache, SizedLRUCache
+
+def test_lru_get_default():
+    cache = LRUCache(2)
+    assert cache.get('missing') is None
+    assert cache.get('missing', 'spam') == 'spam'
+
+def test_lru_evicts_oldest():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['c'] = 3
+    assert 'a' not in cache
+    assert cache.get('b') == 2
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+def test_lru_get_refreshes():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    cache.get('a')
+    cache['c'] = 3
+    assert 'a' in cache
+    assert 'b' not in cache
+
+def test_lru_clear():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache.clear()
+    assert len(cache) == 0
+
+def test_lru_needs_room():
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+def test_sized_lru_evicts_by_bytes():
+    cache = SizedLRUCache(maxbytes=100, sizeof=len)
+    cache['a'] = 'x' * 40
+    cache['b'] = 'x' * 40
+    cache['c'] = 'x' * 40
+    assert 'a' not in cache
+    assert 'b' in cache and 'c' in cache
+    assert cache.currentbytes == 82
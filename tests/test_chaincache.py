@@ -0,0 +1,167 @@
+import pytest
+from unittest.mock import Mock
+
+from web3 import Web3, HTTPProvider
+from web3.utils.datastructures import AttributeDict
+
+from web3utils.blockstore import BlockStore
+from web3utils.chaincache import ChainCache
+
+from tests.standin import StandInChain, StandInNode
+
+
+def block_hash(number):
+    return '0x%064x' % number
+
+
+def tx(txid, number):
+    return AttributeDict({'hash': txid, 'blockNumber': number, 'blockHash': block_hash(number)})
+
+
+def block(number, full_transactions=False):
+    txs = [tx('tx%d' % number, number)]
+    return AttributeDict({
+        'number': number,
+        'hash': block_hash(number),
+        'transactions': txs if full_transactions else [t['hash'] for t in txs],
+    })
+
+
+@pytest.fixture
+def eth():
+    eth = Mock()
+    eth.getBlock.side_effect = lambda block_id, full_transactions=False: block(
+        int(block_id, 16) if isinstance(block_id, str) else block_id,
+        full_transactions,
+    )
+    eth.getTransaction.side_effect = lambda txid: tx(txid, int(txid[2:]))
+    return eth
+
+
+@pytest.fixture
+def cache(eth):
+    return ChainCache(eth, immutable_depth=3)
+
+
+def test_block_by_hash_cached(eth, cache):
+    assert cache.get_block(block_hash(5))['number'] == 5
+    assert cache.get_block(block_hash(5))['number'] == 5
+    assert eth.getBlock.call_count == 1
+    assert cache.hits['block'] == 1
+    assert cache.misses['block'] == 1
+
+
+def test_tip_block_number_not_cached(eth, cache):
+    cache.get_block(10)
+    cache.get_block(10)
+    assert eth.getBlock.call_count == 2
+
+
+def test_deep_block_number_cached(eth, cache):
+    cache.get_block(7)
+    cache.get_block(10)
+    cache.get_block(7)
+    assert eth.getBlock.call_count == 2
+
+
+def test_block_with_txs_upgrades_entry(eth, cache):
+    cache.get_block(block_hash(5))
+    cached_block, txs = cache.get_block_with_txs(block_hash(5))
+    assert cached_block['transactions'] == ['tx5']
+    assert [t['hash'] for t in txs] == ['tx5']
+    cache.get_block_with_txs(block_hash(5))
+    assert eth.getBlock.call_count == 2
+
+
+def test_full_block_matches_web3(cache):
+    full = cache.get_block(block_hash(5), full_transactions=True)
+    assert full == block(5, full_transactions=True)
+
+
+def test_missing_block(eth, cache):
+    eth.getBlock.side_effect = None
+    eth.getBlock.return_value = None
+    assert cache.get_block_with_txs(block_hash(5)) == (None, [])
+    assert cache.get_block(block_hash(5)) is None
+
+
+def test_deep_transaction_cached(eth, cache):
+    cache.get_block_with_txs(7)
+    cache.get_block(10)
+    assert cache.get_transaction('tx7')['blockNumber'] == 7
+    assert not eth.getTransaction.called
+    assert cache.hits['transaction'] == 1
+
+
+def test_tip_transaction_not_cached(eth, cache):
+    cache.get_block_with_txs(10)
+    cache.get_transaction('tx10')
+    assert eth.getTransaction.call_count == 1
+
+
+def test_reorged_transaction_refetched(eth, cache):
+    cache.get_block_with_txs(7)
+    # a different block 7 replaces the one that included tx7
+    eth.getBlock.side_effect = None
+    eth.getBlock.return_value = AttributeDict({'number': 7, 'hash': '0xfork', 'transactions': []})
+    cache.get_block('0xfork')
+    eth.getBlock.return_value = block(10)
+    cache.get_block(10)
+    cache.get_transaction('tx7')
+    assert eth.getTransaction.call_count == 1
+
+
+def test_stored_blocks_and_transactions(eth):
+    store = BlockStore(':memory:')
+    store.add(block(7), [tx('tx7', 7)])
+    cache = ChainCache(eth, immutable_depth=3, store=store)
+
+    assert cache.get_block_with_txs(7) == (block(7), [tx('tx7', 7)])
+    assert cache.get_block(block_hash(7)) == block(7)
+    assert cache.get_transaction('tx7') == tx('tx7', 7)
+    assert cache.get_transactions(['tx7']) == [tx('tx7', 7)]
+    assert not eth.getBlock.called
+    assert not eth.getTransaction.called
+    assert cache.hits['stored block'] == 1
+    assert cache.hits['stored transaction'] == 2
+
+
+def test_transactions_batched_from_node():
+    chain = StandInChain(height=20, txs_per_block=2)
+    with StandInNode(chain.handlers()) as node:
+        cache = ChainCache(Web3(HTTPProvider(node.uri)).eth, immutable_depth=3)
+        cache.get_block(20)
+        cache.get_block(4, full_transactions=True)
+        cached = chain.tx_hash(4, 0)
+        requests_before = node.http_requests
+
+        txids = [chain.tx_hash(5, 1), cached, '0x' + 'ee' * 32, chain.tx_hash(6, 0)]
+        txs = cache.get_transactions(txids)
+
+    assert node.http_requests == requests_before + 1
+    assert node.rpc_methods.count('eth_getTransactionByHash') == 3
+    assert [tx and tx['hash'] for tx in txs] == [txids[0], cached, None, txids[3]]
+    assert txs[0]['blockNumber'] == 5
+
+
+def test_compact_records():
+    chain = StandInChain(height=20, txs_per_block=2)
+    with StandInNode(chain.handlers()) as node:
+        cache = ChainCache(
+            Web3(HTTPProvider(node.uri)).eth, immutable_depth=3,
+            block_fields=('timestamp', ), tx_fields=('from', 'value'),
+        )
+        block, txs = cache.get_block_with_txs(4)
+        tx = cache.get_transaction(chain.tx_hash(5, 1))
+        batched, = cache.get_transactions([chain.tx_hash(6, 0)])
+
+    assert dict(block) == {
+        'number': 4,
+        'hash': chain.block_hash(4),
+        'parentHash': chain.block_hash(3),
+        'timestamp': 1500000060,
+    }
+    assert set(txs[0]) == {'hash', 'blockNumber', 'blockHash', 'from', 'value'}
+    assert tx['value'] == 10 ** 18 + 1
+    assert batched['blockNumber'] == 6
+    assert not hasattr(tx, '__dict__')
@@ -1,9 +1,14 @@
 
+import gc
+import weakref
+
 import pytest
 from unittest.mock import Mock
 
+from web3 import Web3
+
 from web3utils import web3
-from web3utils.chainstate import isfresh, stalecheck, StaleBlockchain
+from web3utils.chainstate import HeadTracker, head_tracker, isfresh, stalecheck, StaleBlockchain
 
 
 @pytest.fixture
@@ -70,3 +75,79 @@ def test_stalecheck_calls_isfresh_with_block_and_time(mockweb3, mocker):
 
     assert true()
     freshspy.assert_called_once_with(block, 86400 * 3)
+
+
+def test_stalecheck_shares_latest_block(mockweb3, mocker):
+    mocker.patch('web3utils.chainstate.isfresh', return_value=True)
+
+    @stalecheck(mockweb3, days=1)
+    def one():
+        return 1
+
+    @stalecheck(mockweb3, hours=1)
+    def two():
+        return 2
+
+    assert [one(), two(), one()] == [1, 2, 1]
+    assert mockweb3.eth.getBlock.call_count == 1
+
+
+def test_stalecheck_refetches_every_call(mockweb3, mocker):
+    mocker.patch('web3utils.chainstate.isfresh', return_value=True)
+
+    @stalecheck(mockweb3, head_max_age=0, days=1)
+    def one():
+        return 1
+
+    one()
+    one()
+    assert mockweb3.eth.getBlock.call_count == 2
+
+
+def test_head_tracker_expires(mocker, now):
+    clock = mocker.patch('time.monotonic', return_value=100)
+    mocker.patch('time.time', return_value=now)
+    web3 = Mock()
+    web3.eth.getBlock.return_value = Block(now - 10)
+    tracker = HeadTracker(web3, max_age=5)
+
+    assert tracker.isfresh(10)
+    clock.return_value = 104.9
+    assert tracker.latest().timestamp == now - 10
+    assert tracker.fetches == 1
+
+    web3.eth.getBlock.return_value = Block(now - 1)
+    clock.return_value = 105
+    assert tracker.latest().timestamp == now - 1
+    assert tracker.fetches == 2
+    web3.eth.getBlock.assert_called_with('latest')
+
+
+def test_head_tracker_shared(mockweb3):
+    assert head_tracker(mockweb3) is head_tracker(mockweb3)
+    assert head_tracker(mockweb3, max_age=5) is not head_tracker(mockweb3)
+
+
+def test_head_tracker_does_not_keep_web3_alive():
+    short_lived = Web3(None)
+    head_tracker(short_lived)
+    collected = weakref.ref(short_lived)
+    del short_lived
+    gc.collect()
+    assert collected() is None
+
+
+def test_stalecheck_keeps_its_web3(mocker, now):
+    mocker.patch('time.time', return_value=now)
+    checked_web3 = Mock()
+    checked_web3.eth.getBlock.return_value = Block(now)
+
+    @stalecheck(checked_web3, days=1)
+    def answer():
+        return 42
+
+    collected = weakref.ref(checked_web3)
+    del checked_web3
+    gc.collect()
+    assert collected() is not None
+    assert answer() == 42
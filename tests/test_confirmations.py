@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import Mock
+
+from web3.utils.datastructures import AttributeDict
+
+from web3utils.confirmations import ConfirmationTimeout, ConfirmationTracker
+from web3utils.monitors import TransactionMonitor
+
+
+def tx(txid, number):
+    return AttributeDict({'hash': txid, 'blockNumber': number})
+
+
+def confident_block(number, txids):
+    return {'number': number}, [tx(txid, number) for txid in txids]
+
+
+@pytest.fixture
+def monitor():
+    monitor = Mock(solid_height=10)
+    monitor.cache.get_transactions.side_effect = lambda txids: [None for _ in txids]
+    return monitor
+
+
+def test_resolved_when_confident(monitor):
+    tracker = ConfirmationTracker(monitor)
+    callback = monitor.watch_confident_blocks.call_args[0][0]
+    first, second = tracker.track_many(['0xAA', '0xbb'])
+
+    callback(*confident_block(11, ['0xcc', '0xaa']))
+
+    assert first.result(0)['hash'] == '0xaa'
+    assert not second.done()
+    assert len(tracker) == 1
+
+
+def test_tracked_twice_shares_future(monitor):
+    tracker = ConfirmationTracker(monitor)
+    assert tracker.track('0xaa') is tracker.track('0xAA')
+    assert len(tracker) == 1
+
+
+def test_already_confirmed_resolved_in_one_lookup(monitor):
+    monitor.cache.get_transactions.side_effect = lambda txids: [
+        tx('0xaa', 9), tx('0xbb', 11), None]
+    tracker = ConfirmationTracker(monitor)
+
+    mined, unconfirmed, unknown = tracker.track_many(['0xaa', '0xbb', '0xcc'])
+
+    monitor.cache.get_transactions.assert_called_once_with(['0xaa', '0xbb', '0xcc'])
+    assert mined.result(0)['blockNumber'] == 9
+    assert not unconfirmed.done()
+    assert not unknown.done()
+
+
+def test_tracked_while_block_is_delivered(monitor):
+    # the monitor updates solid_height only after its watchers handled the block
+    monitor.solid_height = 6
+    tracker = ConfirmationTracker(monitor)
+    callback = monitor.watch_confident_blocks.call_args[0][0]
+    callback(*confident_block(7, ['0xaa']))
+    monitor.cache.get_transactions.side_effect = lambda txids: [tx('0xaa', 7)]
+
+    assert tracker.track('0xaa').result(0)['blockNumber'] == 7
+
+
+def test_timeout(monitor):
+    tracker = ConfirmationTracker(monitor, timeout_blocks=2)
+    callback = monitor.watch_confident_blocks.call_args[0][0]
+    future = tracker.track('0xaa')
+
+    callback(*confident_block(12, []))
+    assert not future.done()
+    callback(*confident_block(13, []))
+
+    with pytest.raises(ConfirmationTimeout):
+        future.result(0)
+    assert len(tracker) == 0
+
+
+def test_callback_may_track_more(monitor):
+    tracker = ConfirmationTracker(monitor)
+    callback = monitor.watch_confident_blocks.call_args[0][0]
+    later = []
+    tracker.track('0xaa').add_done_callback(lambda future: later.append(tracker.track('0xbb')))
+
+    callback(*confident_block(11, ['0xaa']))
+
+    assert len(later) == 1
+    assert len(tracker) == 1
+
+
+def test_with_monitor(mocker):
+    eth = mocker.patch('web3utils.monitors.eth', new=Mock())
+    eth.getBlock.side_effect = lambda number, full_transactions=False: AttributeDict({
+        'number': number,
+        'hash': 'block%d' % number,
+        'transactions': [tx('0xtx%d' % number, number)],
+    })
+    monitor = TransactionMonitor(confident_depth=3)
+    try:
+        tracker = ConfirmationTracker(monitor)
+        futures = tracker.track_many(['0xtx%d' % number for number in range(5, 10)],
+                                     check_mined=False)
+
+        monitor._solid_monitor(10)
+        monitor._solid_monitor(12)
+
+        assert [future.done() for future in futures] == [False, False, True, True, True]
+        assert futures[-1].result(0)['blockNumber'] == 9
+    finally:
+        monitor.stop()
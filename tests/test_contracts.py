@@ -1,9 +1,13 @@
 
 import pytest
-from unittest.mock import Mock
+from unittest.mock import Mock, call
+
+from web3 import Web3, HTTPProvider
 
 from web3utils.contracts import ContractSugar, ContractMethod, EthContractSugar
 
+from tests.standin import StandInAccounts, StandInNode, TOKEN_ABI, TOKEN_ADDRESS, address
+
 def test_encode_arguments_as_utf8():
     contract = Mock()
     sweet_method = ContractMethod(contract, 'grail')
@@ -66,3 +70,55 @@ def test_contract_sugar_passthrough():
     assert onelump._web3py_contract == contract
     twolumps = ContractSugar(onelump)
     assert twolumps._web3py_contract == contract
+
+def test_contract_sugar_reuses_method():
+    sweet = ContractSugar(Mock())
+    assert sweet.grail is sweet.grail
+
+def test_contract_sugar_shares_methods_when_wrapped():
+    onelump = ContractSugar(Mock())
+    twolumps = ContractSugar(onelump)
+    assert onelump.grail is twolumps.grail
+
+def test_contract_sugar_clear_cache():
+    sweet = ContractSugar(Mock())
+    method = sweet.grail
+    sweet.clear_cache()
+    assert sweet.grail is not method
+
+def test_prepared_call_is_reused():
+    contract = Mock()
+    sweet_method = ContractMethod(contract, 'grail')
+    sweet_method(b'arthur')
+    sweet_method(b'lancelot')
+    contract.call.assert_called_once_with({})
+    assert contract.call().grail.call_count == 2
+
+def test_prepared_per_modifier():
+    contract = Mock()
+    sweet_method = ContractMethod(contract, 'grail')
+    sweet_method(transact={'holy': 1})
+    sweet_method(transact={'holy': 2})
+    sweet_method(transact={'holy': 1})
+    sweet_method()
+    assert contract.transact.call_args_list == [call({'holy': 1}), call({'holy': 2})]
+    contract.call.assert_called_once_with({})
+
+def test_unhashable_modifier_not_cached():
+    contract = Mock()
+    sweet_method = ContractMethod(contract, 'grail')
+    sweet_method(transact={'holy': [1]})
+    sweet_method(transact={'holy': [1]})
+    assert contract.transact.call_count == 2
+
+def test_prepared_transact_follows_default_account():
+    accounts = StandInAccounts()
+    with StandInNode(accounts.handlers()) as node:
+        web3 = Web3(HTTPProvider(node.uri))
+        token = ContractSugar(web3.eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
+        web3.eth.defaultAccount = address(0xa)
+        token.transfer(address(1), 5, transact={})
+        web3.eth.defaultAccount = address(0xb)
+        token.transfer(address(1), 5, transact={})
+    assert len(accounts.mined(address(0xa))) == 1
+    assert len(accounts.mined(address(0xb))) == 1
@@ -0,0 +1,112 @@
+import pytest
+
+from web3 import Web3
+
+from web3utils import ContractSugar
+from web3utils.events import _ChunkSizer, event_topics
+from web3utils.providers import PooledHTTPProvider
+
+from tests.standin import (
+    StandInLogs,
+    StandInNode,
+    TOKEN_ABI,
+    TOKEN_ADDRESS,
+    TRANSFER_TOPIC,
+    address,
+)
+
+TRANSFER_ABI = TOKEN_ABI[-1]
+
+
+@pytest.fixture
+def chain():
+    return StandInLogs(height=200)
+
+
+@pytest.fixture
+def token(chain):
+    with StandInNode(chain.handlers()) as node:
+        provider = PooledHTTPProvider(node.uri)
+        web3 = Web3(provider)
+        yield ContractSugar(web3.eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
+        provider.close()
+
+
+def expected_transfers(blocks):
+    return [(number, index) for number in blocks for index in range(number % 4)]
+
+
+def positions(events):
+    return [(event['blockNumber'], event['logIndex']) for event in events]
+
+
+def test_stream_in_block_order(token, chain):
+    events = list(token.events.Transfer.stream(10, 'latest', chunk_size=7))
+    assert positions(events) == expected_transfers(range(10, 201))
+    assert events[0]['event'] == 'Transfer'
+    assert events[0]['args'] == {'src': address(10), 'dst': address(0), 'wad': 0}
+    assert len(chain.queries) > 4
+
+
+def test_stream_indexed_filters(token, chain):
+    events = list(token.events.Transfer.stream(
+        0, 100, argument_filters={'src': [address(7), address(11)], 'dst': address(2)}))
+    assert positions(events) == [(7, 2), (11, 2)]
+
+
+def test_stream_unindexed_filters(token):
+    events = list(token.events.Transfer.stream(0, 20, argument_filters={'wad': 20}))
+    assert positions(events) == [(3, 2), (7, 2), (11, 2), (15, 2), (19, 2)]
+
+
+def test_stream_splits_failing_chunks(token, chain):
+    chain.max_results = 30
+    events = list(token.events.Transfer.stream(0, 200, chunk_size=100, workers=2))
+    assert positions(events) == expected_transfers(range(201))
+    # refused queries were split in half, and later chunks shrank
+    assert (0, 49) in chain.queries
+    assert max(last - first for first, last in chain.queries[-5:]) < 50
+
+
+def test_stream_single_block_failure(token, chain):
+    chain.max_results = 1
+    with pytest.raises(ValueError):
+        list(token.events.Transfer.stream(0, 10))
+
+
+def test_stream_stops_early(token, chain):
+    stream = token.events.Transfer.stream(0, 200, chunk_size=1, workers=2)
+    assert positions([next(stream), next(stream)]) == [(1, 0), (2, 0)]
+    stream.close()
+    assert len(chain.queries) < 200
+
+
+def test_missing_event(token):
+    with pytest.raises(AttributeError):
+        token.events.Approval
+
+
+def test_event_topics():
+    assert event_topics(TRANSFER_ABI) == [TRANSFER_TOPIC]
+    assert event_topics(TRANSFER_ABI, {'dst': [address(1), address(2)]}) == [
+        TRANSFER_TOPIC,
+        None,
+        ['0x' + '00' * 31 + '01', '0x' + '00' * 31 + '02'],
+    ]
+
+
+@pytest.mark.parametrize(
+        'blocks,largest_success,num_logs,new_size',
+        (
+            (100, 100, 0, 200),
+            (100, 100, 600, 100),
+            (100, 100, 4000, 25),
+            (100, 13, 0, 13),
+            (50, 50, 0, 100),
+        ),
+        ids=['grow', 'keep', 'shrink', 'split', 'stale_chunk']
+    )
+def test_chunk_sizer(blocks, largest_success, num_logs, new_size):
+    sizer = _ChunkSizer(100, 1000, 1000)
+    sizer.update(blocks, largest_success, num_logs)
+    assert sizer.size == new_size
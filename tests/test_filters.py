@@ -0,0 +1,164 @@
+import time
+
+import pytest
+
+from web3 import Web3, HTTPProvider
+
+from web3utils.filters import HealingFilter, SubscriptionFilter
+from web3utils.monitors import TransactionMonitor
+
+from tests.standin import StandInChain, StandInNode
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def chain():
+    return StandInChain(height=10, txs_per_block=1)
+
+
+@pytest.fixture
+def node(chain):
+    with StandInNode(chain.handlers()) as node:
+        yield node
+
+
+@pytest.fixture
+def chain_eth(node):
+    return Web3(HTTPProvider(node.uri)).eth
+
+
+def test_filter_recreated_after_expiry(chain, chain_eth):
+    seen = []
+    recreated = []
+    watcher = HealingFilter(
+        chain_eth, 'latest', seen.append, on_recreate=lambda: recreated.append(chain.height),
+        poll_interval=0.01, retry_interval=0.01,
+        ).start()
+    try:
+        chain.mine()
+        assert wait_for(lambda: len(seen) == 1)
+        chain.expire_filters()
+        chain.mine(3)
+        assert wait_for(lambda: recreated)
+        chain.mine()
+        assert wait_for(lambda: len(seen) == 2)
+    finally:
+        watcher.stop_watching()
+
+    assert seen == [chain.block_hash(11), chain.block_hash(15)]
+    assert recreated == [14]
+    assert watcher.recreated == 1
+    assert len(chain.filters) == 0
+
+
+def test_failing_callback_keeps_filter_alive(chain, chain_eth):
+    seen = []
+
+    def flaky(blockhash):
+        seen.append(blockhash)
+        raise ValueError('whoops')
+
+    watcher = HealingFilter(chain_eth, 'latest', flaky, poll_interval=0.01).start()
+    try:
+        chain.mine()
+        assert wait_for(lambda: len(seen) == 1)
+        chain.mine()
+        assert wait_for(lambda: len(seen) == 2)
+    finally:
+        watcher.stop_watching()
+    assert watcher.recreated == 0
+
+
+def test_monitor_catches_up_after_filter_lost(chain, chain_eth, mocker):
+    mocker.patch('web3utils.monitors.eth', new=chain_eth)
+    monitor = TransactionMonitor(confident_depth=3, poll_interval=0.01)
+    seen = []
+    monitor.watch_blocks(lambda block: seen.append(block['number']))
+
+    try:
+        chain.mine()
+        assert wait_for(lambda: seen == [11])
+        chain.expire_filters()
+        chain.mine(20)
+        assert wait_for(lambda: seen[-1:] == [31])
+        chain.mine()
+        assert wait_for(lambda: seen[-1:] == [32])
+    finally:
+        monitor.stop()
+
+    assert seen == list(range(11, 33))
+
+
+def test_subscription_pushes_hashes(chain, node):
+    blocks = []
+    txs = []
+    watchers = [
+        SubscriptionFilter(node.ws_uri, 'latest', blocks.append).start(),
+        SubscriptionFilter(node.ws_uri, 'pending', txs.append).start(),
+    ]
+    try:
+        chain.mine()
+        node.notify('newHeads', chain.block(11))
+        node.notify('newPendingTransactions', chain.tx_hash(12, 0))
+        assert wait_for(lambda: blocks and txs)
+    finally:
+        for watcher in watchers:
+            watcher.stop_watching()
+
+    assert blocks == [chain.block_hash(11)]
+    assert txs == [chain.tx_hash(12, 0)]
+    assert 'eth_newBlockFilter' not in node.rpc_methods
+
+
+def test_subscription_renewed_after_disconnect(chain, node):
+    seen = []
+    recreated = []
+    watcher = SubscriptionFilter(
+        node.ws_uri, 'latest', seen.append, on_recreate=lambda: recreated.append(True),
+        retry_interval=0.01,
+        ).start()
+    try:
+        node.drop_websockets()
+        assert wait_for(lambda: recreated)
+        node.notify('newHeads', chain.block(10))
+        assert wait_for(lambda: seen)
+    finally:
+        watcher.stop_watching()
+
+    assert seen == [chain.block_hash(10)]
+    assert watcher.recreated == 1
+
+
+def test_monitor_subscribes_to_blocks(chain, chain_eth, node, mocker):
+    mocker.patch('web3utils.monitors.eth', new=chain_eth)
+    monitor = TransactionMonitor(confident_depth=3, poll_interval=60, ws_uri=node.ws_uri)
+    seen = []
+    monitor.watch_blocks(lambda block: seen.append(block['number']))
+
+    try:
+        chain.mine()
+        node.notify('newHeads', chain.block(11))
+        assert wait_for(lambda: seen == [11])
+    finally:
+        monitor.stop()
+
+    assert 'eth_newBlockFilter' not in node.rpc_methods
+
+
+def test_monitor_polls_without_subscriptions(chain, chain_eth, node, mocker):
+    mocker.patch('web3utils.monitors.eth', new=chain_eth)
+    monitor = TransactionMonitor(confident_depth=3, poll_interval=0.01, ws_uri='ws://127.0.0.1:1/')
+    seen = []
+    monitor.watch_blocks(lambda block: seen.append(block['number']))
+
+    try:
+        chain.mine()
+        assert wait_for(lambda: seen == [11])
+    finally:
+        monitor.stop()
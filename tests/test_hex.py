@@ -1,7 +1,17 @@
 
 import pytest
 
-from web3utils.encodings import hex2bytes, emptyhex
+from web3utils.encodings import (
+    array2hex,
+    bytes2hex_many,
+    emptyhex,
+    hex2array,
+    hex2bytes,
+    hex2bytes_many,
+    hex2packed,
+    is_empty_hex,
+    packed2hex,
+)
 
 def test_hex_to_bytes_already_bytes():
     assert hex2bytes(b'\x11\x11') == b'\x11\x11'
@@ -19,3 +29,65 @@ def test_hex_to_bytes():
     )
 def test_emptyhex(num_bytes, expected):
     assert emptyhex(num_bytes) == expected
+
+@pytest.mark.parametrize(
+        'value, expected',
+        (
+            ('0x', True),
+            ('0x0', True),
+            (emptyhex(), True),
+            ('0x0001', False),
+            ('0x10', False),
+            ('00', False),
+            (b'\0', False),
+            (None, False),
+        )
+    )
+def test_is_empty_hex(value, expected):
+    assert is_empty_hex(value) is expected
+
+def test_hex_to_bytes_many():
+    hex_strs = ['0x', '0x1111', '0xdeadbeef']
+    values = hex2bytes_many(hex_strs)
+    assert values == [hex2bytes(hex_str) for hex_str in hex_strs]
+    assert bytes2hex_many(values) == hex_strs
+
+def test_hex_to_bytes_many_like_hex_to_bytes():
+    values = ['abcd', '0Xabcd', b'\xab\xcd']
+    assert hex2bytes_many(values) == [hex2bytes(value) for value in values] == [b'\xab\xcd'] * 3
+    with pytest.raises(ValueError):
+        hex2bytes_many(['0xzz'])
+
+def test_packed_roundtrip():
+    hex_strs = ['0x' + '%040x' % n for n in (1, 2, 0xffff)]
+    packed = hex2packed(hex_strs, 20)
+    assert len(packed) == 60
+    assert packed[20:40] == hex2bytes(hex_strs[1])
+    assert packed2hex(packed, 20) == hex_strs
+    assert packed2hex(b'', 20) == []
+
+def test_packed_prefix_optional():
+    values = ['0x' + 'ab' * 20, 'cd' * 20, b'\xef' * 20]
+    assert hex2packed(values, 20) == b'\xab' * 20 + b'\xcd' * 20 + b'\xef' * 20
+
+def test_packed_not_hex():
+    with pytest.raises(ValueError):
+        hex2packed(['zz' + '11' * 32], 32)
+    with pytest.raises(ValueError):
+        hex2packed(['0x' + 'zz' * 32], 32)
+
+def test_packed_wrong_length():
+    with pytest.raises(ValueError):
+        hex2packed(['0x1111'], 32)
+    with pytest.raises(ValueError):
+        hex2packed([b'\x11' * 31], 32)
+    with pytest.raises(ValueError):
+        packed2hex(b'\0' * 33, 32)
+
+def test_array_roundtrip():
+    numpy = pytest.importorskip('numpy')
+    hex_strs = numpy.array([emptyhex(), '0x' + 'ab' * 32])
+    array = hex2array(hex_strs)
+    assert array.shape == (2, 32)
+    assert array[1, 0] == 0xab
+    assert array2hex(array) == list(hex_strs)
@@ -0,0 +1,93 @@
+import pytest
+
+from web3 import Web3, HTTPProvider
+
+from web3utils import ContractSugar, instrumentation
+from web3utils.instrumentation import Histogram, InstrumentedProvider, instrument, uninstrument
+
+from tests.standin import TOKEN_ABI, TOKEN_ADDRESS, address
+
+
+@pytest.fixture
+def web3(node):
+    web3 = Web3(HTTPProvider(node.uri))
+    yield web3
+    uninstrument(web3)
+
+
+@pytest.fixture
+def contract(web3):
+    return ContractSugar(web3.eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
+
+
+def test_rpcs_counted(web3, contract):
+    metrics = instrument(web3)
+    assert contract.balanceOf(address(2)) == 2000
+    with pytest.raises(ValueError):
+        contract.balanceOf(address(13))
+
+    calls = metrics.rpcs['eth_call']
+    assert (calls.calls, calls.errors, calls.latency.count) == (2, 1, 2)
+    assert calls.bytes_sent > 2 * 64
+    assert calls.bytes_received > 64
+    assert metrics.rpcs['eth_coinbase'].calls == 2
+
+    by_function = metrics.contract_calls[(TOKEN_ADDRESS, 'balanceOf')]
+    assert (by_function.calls, by_function.errors) == (2, 1)
+
+
+def test_batches_counted_per_request(web3, contract):
+    metrics = instrument(web3)
+    with contract.batch() as batch:
+        for num in range(3):
+            batch.balanceOf(address(num))
+    assert metrics.rpcs['eth_call'].calls == 3
+
+
+def test_uninstrument(web3, contract):
+    metrics = instrument(web3)
+    instrument(web3, metrics)
+    assert not isinstance(web3.currentProvider.provider, InstrumentedProvider)
+    uninstrument(web3)
+    assert instrumentation.active == 0
+    contract.owner()
+    assert not metrics.rpcs
+    assert not metrics.contract_calls
+
+
+def test_contract_calls_reported_to_their_own_web3(node, web3, contract):
+    other_web3 = Web3(HTTPProvider(node.uri))
+    other_contract = ContractSugar(other_web3.eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
+    metrics = instrument(web3)
+    other_metrics = instrument(other_web3)
+    try:
+        contract.balanceOf(address(1))
+        other_contract.balanceOf(address(2))
+        other_contract.balanceOf(address(3))
+        uninstrument(web3)
+        other_contract.balanceOf(address(4))
+    finally:
+        uninstrument(other_web3)
+
+    assert metrics.contract_calls[(TOKEN_ADDRESS, 'balanceOf')].calls == 1
+    assert other_metrics.contract_calls[(TOKEN_ADDRESS, 'balanceOf')].calls == 3
+
+
+def test_histogram_buckets():
+    histogram = Histogram([0.1, 1])
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    assert list(histogram.cumulative_counts()) == [(0.1, 2), (1, 3), (float('inf'), 4)]
+    assert histogram.sum == pytest.approx(3.65)
+
+
+def test_prometheus_text(web3, contract):
+    metrics = instrument(web3)
+    contract.balanceOf(address(1))
+    text = metrics.prometheus()
+    assert '# TYPE web3utils_rpc_requests_total counter\n' in text
+    assert 'web3utils_rpc_requests_total{method="eth_call"} 1\n' in text
+    assert 'web3utils_rpc_errors_total{method="eth_call"} 0\n' in text
+    assert 'web3utils_rpc_latency_seconds_bucket{method="eth_call",le="+Inf"} 1\n' in text
+    assert 'web3utils_contract_calls_total{address="%s",function="balanceOf"} 1\n' % (
+        TOKEN_ADDRESS) in text
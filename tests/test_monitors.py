@@ -0,0 +1,560 @@
+import asyncio
+from collections import Counter
+import threading
+import time
+
+import pytest
+from unittest.mock import Mock
+
+from web3.utils.datastructures import AttributeDict
+
+from web3utils.blockstore import BlockStore
+from web3utils.chaincache import ChainCache
+from web3utils.monitors import (
+    AsyncTransactionMonitor,
+    BlockHistory,
+    PhantomTracker,
+    TransactionMonitor,
+)
+
+
+def full_block(number, txids):
+    txs = [AttributeDict({'hash': txid, 'blockNumber': number}) for txid in txids]
+    return AttributeDict({'number': number, 'hash': 'block%d' % number, 'transactions': txs})
+
+
+@pytest.fixture
+def eth(mocker):
+    return mocker.patch('web3utils.monitors.eth', new=Mock())
+
+
+def test_solid_block_fetched_in_one_request(eth):
+    eth.getBlock.return_value = full_block(7, ['tx1', 'tx2'])
+    monitor = TransactionMonitor(confident_depth=3)
+    watcher = Mock()
+    monitor.solid_watchers.append(watcher)
+
+    monitor._solid_monitor(10)
+
+    eth.getBlock.assert_called_once_with(7, full_transactions=True)
+    assert not eth.getTransaction.called
+    block, txs = watcher.call_args[0]
+    assert block['transactions'] == ['tx1', 'tx2']
+    assert [tx['hash'] for tx in txs] == ['tx1', 'tx2']
+    assert monitor.solid_height == 7
+    assert monitor.solid_block_id == 'block7'
+
+
+def test_solid_block_compact_records(eth):
+    eth.getBlock.return_value = full_block(7, ['tx1', 'tx2'])
+    monitor = TransactionMonitor(confident_depth=3, block_fields=(), tx_fields=('value', ))
+    watcher = Mock()
+    monitor.solid_watchers.append(watcher)
+
+    monitor._solid_monitor(10)
+
+    block, txs = watcher.call_args[0]
+    assert dict(block) == {'number': 7, 'hash': 'block7', 'parentHash': None}
+    assert [dict(tx) for tx in txs] == [
+        {'hash': txid, 'blockNumber': 7, 'blockHash': None, 'value': None}
+        for txid in ('tx1', 'tx2')
+    ]
+
+
+def test_solid_reorg_check_skips_transactions(eth):
+    eth.getBlock.return_value = AttributeDict({'number': 7, 'hash': 'block7'})
+    monitor = TransactionMonitor(confident_depth=3)
+    monitor.solid_height = 7
+    monitor.solid_block_id = 'block7'
+
+    monitor._solid_monitor(10)
+
+    eth.getBlock.assert_called_once_with(7)
+
+
+def test_solid_reorg_check_from_cache(chain, eth):
+    monitor = TransactionMonitor(confident_depth=3)
+    monitor.solid_watchers.append(lambda block, txs: None)
+    for number in range(10, 14):
+        monitor._new_block(chain.blocks[number]['hash'])
+    fetches = eth.getBlock.call_count
+
+    # check confident block 10 again, which the block history knows
+    monitor._solid_monitor(13)
+
+    assert eth.getBlock.call_count == fetches
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+def test_async_confident_blocks(eth, loop):
+    eth.getBlock.return_value = full_block(7, ['tx1'])
+    received = []
+
+    async def watcher(block, txs):
+        received.append((block['number'], [tx['hash'] for tx in txs]))
+
+    async def scenario():
+        monitor = AsyncTransactionMonitor(confident_depth=3)
+        monitor.solid_watchers.append(monitor._start_watcher(watcher))
+        await monitor._solid_monitor(10)
+        await monitor.join()
+        await monitor.stop()
+
+    loop.run_until_complete(scenario())
+    assert received == [(7, ['tx1'])]
+
+
+def test_async_blocks_polled_from_filter(eth, loop):
+    eth.filter.return_value = Mock(filter_id='0x1')
+    changes = [['0xb1', '0xb2']]
+    eth.getFilterChanges.side_effect = lambda filter_id: changes.pop() if changes else []
+    eth.getBlock.side_effect = lambda blockid, full_transactions=False: AttributeDict({
+        'number': int(str(blockid), 0), 'hash': str(blockid), 'transactions': []})
+    received = []
+
+    async def scenario():
+        monitor = AsyncTransactionMonitor(poll_interval=0.01)
+        monitor.watch_blocks(lambda block: received.append(block['hash']))
+        # polling runs RPCs in the executor, which can take a while on a busy machine
+        for _ in range(200):
+            if len(received) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await monitor.join()
+        await monitor.stop()
+
+    loop.run_until_complete(scenario())
+    eth.filter.assert_called_once_with('latest')
+    assert received == ['0xb1', '0xb2']
+
+
+def test_async_pending_phantoms(eth, loop):
+    eth.getTransaction.side_effect = lambda txid: None if txid == 'ghost' else AttributeDict(
+        {'hash': txid, 'blockNumber': None})
+    received = []
+
+    async def scenario():
+        monitor = AsyncTransactionMonitor()
+        monitor.pending_tx_watchers.append(
+            monitor._start_watcher(lambda tx: received.append(tx['hash'])))
+        await monitor._new_pending_txs(['tx1', 'ghost', 'tx2'])
+        await monitor.join()
+        await monitor.stop()
+        return monitor
+
+    monitor = loop.run_until_complete(scenario())
+    assert received == ['tx1', 'tx2']
+    assert list(monitor.phantom_txids) == ['ghost']
+
+
+def test_async_slow_watcher_backpressure(loop):
+    release = asyncio.Event()
+
+    async def slow(block):
+        await release.wait()
+
+    async def scenario():
+        monitor = AsyncTransactionMonitor(queue_size=1)
+        watcher = monitor._start_watcher(slow)
+        fast_received = []
+        fast = monitor._start_watcher(fast_received.append)
+        # the slow watcher takes the first block, and queues the second
+        await monitor._dispatch([fast, watcher], 1)
+        await monitor._dispatch([fast, watcher], 2)
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(monitor._dispatch([watcher], 3), 0.05)
+        release.set()
+        await monitor._dispatch([watcher], 3)
+        await watcher.queue.join()
+        await monitor.stop()
+        return fast_received
+
+    assert loop.run_until_complete(scenario()) == [1, 2]
+
+
+class FakeChain:
+    'blocks 0..height, where blocks from a fork number up are replaced when forking'
+
+    def __init__(self, height):
+        self.blocks = {}
+        self.by_hash = {}
+        self.extend(0, height, 'a')
+
+    def extend(self, start, end, branch):
+        for number in range(start, end + 1):
+            parent = self.blocks.get(number - 1)
+            block = AttributeDict({
+                'number': number,
+                'hash': '0x%s%063x' % (branch, number),
+                'parentHash': parent['hash'] if parent else None,
+                'transactions': [],
+            })
+            self.blocks[number] = block
+            self.by_hash[block['hash']] = block
+
+    def get_block(self, block_id, full_transactions=False):
+        if isinstance(block_id, int):
+            return self.blocks.get(block_id)
+        return self.by_hash.get(block_id)
+
+
+@pytest.fixture
+def chain(eth):
+    chain = FakeChain(20)
+    eth.getBlock.side_effect = chain.get_block
+    return chain
+
+
+def test_skipped_blocks_backfilled_in_order(chain):
+    monitor = TransactionMonitor(confident_depth=3)
+    seen = []
+    monitor.block_watchers.append(lambda block: seen.append(block['number']))
+    confident = []
+    monitor.solid_watchers.append(lambda block, txs: confident.append(block['number']))
+
+    monitor._new_block(chain.blocks[10]['hash'])
+    monitor._new_block(chain.blocks[15]['hash'])
+    assert monitor.join(timeout=1)
+
+    assert seen == [10, 11, 12, 13, 14, 15]
+    assert confident == [7, 8, 9, 10, 11, 12]
+
+
+def test_new_blocks_followed_during_backfill(chain, eth):
+    release = threading.Event()
+    get_block = chain.get_block
+
+    def slow_backfill(blockid, full_transactions=False):
+        if isinstance(blockid, int) and 10 < blockid < 15:
+            release.wait()
+        return get_block(blockid, full_transactions)
+
+    eth.getBlock.side_effect = slow_backfill
+    monitor = TransactionMonitor(confident_depth=3)
+    seen = []
+    monitor.block_watchers.append(lambda block: seen.append(block['number']))
+    monitor._new_block(chain.blocks[10]['hash'])
+
+    monitor._new_block(chain.blocks[15]['hash'])
+    monitor._new_block(chain.blocks[16]['hash'])
+    assert monitor.join(timeout=0.05) is False
+    assert seen == [10]
+
+    release.set()
+    assert monitor.join(timeout=1)
+    assert seen == list(range(10, 17))
+
+
+def test_tip_fork_reported(chain):
+    monitor = TransactionMonitor(confident_depth=3)
+    reorgs = []
+    monitor.reorg_watchers.append(lambda *args: reorgs.append(args))
+    old_tip = chain.blocks[15]['hash']
+
+    monitor._new_block(old_tip)
+    chain.extend(15, 15, 'b')
+    monitor._new_block(chain.blocks[15]['hash'])
+
+    assert reorgs == [(15, [old_tip])]
+
+
+def test_deep_reorg_walks_back_and_replays_confident(chain):
+    monitor = TransactionMonitor(confident_depth=3)
+    seen = []
+    monitor.block_watchers.append(lambda block: seen.append(block['hash']))
+    confident = []
+    monitor.solid_watchers.append(lambda block, txs: confident.append(block['hash']))
+    reorgs = []
+    monitor.reorg_watchers.append(lambda *args: reorgs.append(args))
+    for number in range(10, 16):
+        monitor._new_block(chain.blocks[number]['hash'])
+    replaced = [chain.blocks[number]['hash'] for number in range(11, 16)]
+
+    chain.extend(11, 16, 'b')
+    monitor._new_block(chain.blocks[16]['hash'])
+
+    assert reorgs == [(11, replaced)]
+    assert seen[-6:] == [chain.blocks[number]['hash'] for number in range(11, 17)]
+    # confident blocks 11 and 12 were replaced, and are sent again, followed by 13
+    assert confident[-3:] == [chain.blocks[number]['hash'] for number in range(11, 14)]
+    assert monitor.solid_height == 13
+
+
+def test_confident_reorg_fallback(chain):
+    monitor = TransactionMonitor(confident_depth=3)
+    confident = []
+    monitor.solid_watchers.append(lambda block, txs: confident.append(block['hash']))
+    reorgs = []
+    monitor.reorg_watchers.append(lambda *args: reorgs.append(args))
+    monitor._solid_monitor(10)
+    old_solid = chain.blocks[7]['hash']
+
+    chain.extend(7, 10, 'b')
+    monitor._solid_monitor(10)
+
+    assert reorgs == [(7, [old_solid])]
+    assert confident == [old_solid, chain.blocks[7]['hash']]
+
+
+def test_block_history_bounded():
+    history = BlockHistory(size=3)
+    for number in range(10):
+        history.record({'number': number, 'hash': 'h%d' % number})
+    assert history.get(6) is None
+    assert history.get(7) == 'h7'
+    assert history.forget_from(8) == ['h8', 'h9']
+    assert history.get(8) is None
+
+
+def test_async_skipped_blocks_backfilled(chain, loop):
+    seen = []
+
+    async def scenario():
+        monitor = AsyncTransactionMonitor(confident_depth=3)
+        monitor.block_watchers.append(
+            monitor._start_watcher(lambda block: seen.append(block['number'])))
+        await monitor._new_blocks([chain.blocks[10]['hash']])
+        await monitor._new_blocks([chain.blocks[13]['hash']])
+        await monitor.join()
+        await monitor.stop()
+
+    loop.run_until_complete(scenario())
+    assert seen == [10, 11, 12, 13]
+
+
+def test_async_poll_recreates_lost_filter(eth, loop):
+    eth.filter.side_effect = [Mock(filter_id='0x1'), Mock(filter_id='0x2')]
+    eth.getFilterChanges.side_effect = [ValueError('filter not found'), ['block'], []]
+    handled = []
+    recreated = []
+
+    async def handle(changes):
+        handled.append(changes)
+
+    async def on_recreate():
+        recreated.append(True)
+
+    async def scenario():
+        monitor = AsyncTransactionMonitor(poll_interval=0)
+        monitor._start_task(monitor._poll('latest', handle, on_recreate))
+        while not handled:
+            await asyncio.sleep(0)
+        await monitor.stop()
+
+    loop.run_until_complete(scenario())
+    assert recreated == [True]
+    assert handled == [['block']]
+    assert [call[0][0] for call in eth.getFilterChanges.call_args_list][:2] == ['0x1', '0x2']
+
+
+def test_phantoms_expire_after_ttl():
+    phantoms = PhantomTracker(max_size=10, ttl=2)
+    phantoms.add('tx1')
+    phantoms.age()
+    phantoms.add('tx2')
+    phantoms.age()
+    assert list(phantoms) == ['tx2']
+    phantoms.recovered('tx2')
+    phantoms.age()
+    assert len(phantoms) == 0
+    assert phantoms.stats == {'added': 2, 'expired': 1, 'recovered': 1}
+
+
+def test_phantoms_bounded():
+    phantoms = PhantomTracker(max_size=2, ttl=10)
+    for txid in ('tx1', 'tx2', 'tx3', 'tx3'):
+        phantoms.add(txid)
+    assert list(phantoms) == ['tx2', 'tx3']
+    assert phantoms.stats == {'added': 3, 'evicted': 1}
+
+
+def test_phantoms_shared_across_threads():
+    phantoms = PhantomTracker(max_size=100, ttl=1)
+
+    def add(prefix):
+        for num in range(2000):
+            phantoms.add('%s%d' % (prefix, num))
+
+    adders = [threading.Thread(target=add, args=(prefix, )) for prefix in 'ab']
+    for adder in adders:
+        adder.start()
+    for _ in range(200):
+        list(phantoms)
+        phantoms.age()
+    for adder in adders:
+        adder.join()
+
+    stats = phantoms.stats
+    assert stats['added'] == 4000
+    assert stats['added'] == stats['evicted'] + stats['expired'] + len(phantoms)
+
+
+def test_phantoms_recovered_in_one_batch(chain, eth):
+    eth.getTransaction.return_value = None
+    eth.web3.currentProvider.make_batch_request.side_effect = lambda requests: [
+        {'result': None} if params[0] == 'ghost' else
+        {'result': {'hash': params[0], 'blockNumber': None, 'nonce': '0x0', 'gas': '0x0',
+                    'gasPrice': '0x0', 'value': '0x0'}}
+        for method, params in requests
+    ]
+    monitor = TransactionMonitor(confident_depth=3, phantom_ttl=1)
+    received = []
+    monitor.pending_tx_watchers.append(lambda tx: received.append(tx['hash']))
+    for txid in ('tx1', 'ghost', 'tx2'):
+        monitor._new_pending_tx(txid)
+    assert received == []
+
+    monitor._new_block(chain.blocks[10]['hash'])
+
+    assert received == ['tx1', 'tx2']
+    assert eth.web3.currentProvider.make_batch_request.call_count == 1
+    assert monitor.phantom_txids.stats == {'added': 3, 'recovered': 2, 'expired': 1}
+    assert len(monitor.phantom_txids) == 0
+
+
+def test_resume_from_store(chain):
+    store = BlockStore(':memory:')
+    monitor = TransactionMonitor(confident_depth=3, store=store)
+    monitor.solid_watchers.append(lambda block, txs: None)
+    monitor._new_block(chain.blocks[10]['hash'])
+    monitor._new_block(chain.blocks[15]['hash'])
+    assert monitor.join(timeout=1)
+    assert store.latest_block()['number'] == 12
+
+    restarted = TransactionMonitor(confident_depth=3, store=store)
+    assert (restarted.solid_height, restarted.solid_block_id) == (12, chain.blocks[12]['hash'])
+    seen = []
+    restarted.block_watchers.append(lambda block: seen.append(block['number']))
+    confident = []
+    restarted.solid_watchers.append(lambda block, txs: confident.append(block['number']))
+    restarted._new_block(chain.blocks[18]['hash'])
+    assert restarted.join(timeout=1)
+
+    assert seen == [13, 14, 15, 16, 17, 18]
+    assert confident == [13, 14, 15]
+    assert store.latest_block()['number'] == 15
+    # confident blocks are looked up in the store, not on the node
+    chain.blocks.pop(8)
+    assert restarted.cache.get_block(8)['hash'] == '0xa%063x' % 8
+
+
+def test_long_backfill_fetches_each_block_once(chain, eth):
+    chain.extend(21, 300, 'a')
+    store = BlockStore(':memory:')
+    store.add(chain.blocks[5], [])
+    # a cache too small to hold the range, so blocks cannot be found there a second time
+    cache = ChainCache(eth, immutable_depth=3, max_blocks=8)
+    monitor = TransactionMonitor(confident_depth=3, cache=cache, store=store)
+    events = []
+    monitor.block_watchers.append(lambda block: events.append(('block', block['number'])))
+    monitor.solid_watchers.append(
+        lambda block, txs: events.append(('confident', block['number'])))
+
+    monitor._new_block(chain.blocks[300]['hash'])
+    assert monitor.join(timeout=5)
+
+    assert [num for kind, num in events if kind == 'block'] == list(range(6, 301))
+    assert [num for kind, num in events if kind == 'confident'] == list(range(6, 298))
+    # confident blocks are confirmed as their chunk is delivered, not after the whole range
+    assert events.index(('confident', 6)) < events.index(('block', 100))
+    fetched = Counter(args[0] for args, _ in eth.getBlock.call_args_list)
+    assert set(fetched.values()) == {1}
+    assert set(range(6, 300)) <= set(fetched)
+
+
+def test_store_rolled_back_on_confident_reorg(chain):
+    store = BlockStore(':memory:')
+    monitor = TransactionMonitor(confident_depth=3, store=store)
+    monitor.solid_watchers.append(lambda block, txs: None)
+    monitor._solid_monitor(10)
+
+    chain.extend(7, 10, 'b')
+    monitor._solid_monitor(10)
+
+    assert store.latest_block()['hash'] == chain.blocks[7]['hash']
+
+
+def test_dispatch_slow_watcher_does_not_delay_others(chain):
+    monitor = TransactionMonitor(confident_depth=3, dispatch_workers=2, queue_size=10)
+    release = threading.Event()
+    slow_seen = []
+    fast_seen = []
+
+    def slow(block):
+        release.wait()
+        slow_seen.append(block['number'])
+
+    monitor.block_watchers.append(monitor._dispatched(slow))
+    monitor.block_watchers.append(
+        monitor._dispatched(lambda block: fast_seen.append(block['number'])))
+
+    for number in range(10, 15):
+        monitor._new_block(chain.blocks[number]['hash'])
+    assert monitor.join(timeout=0.05) is False
+    assert fast_seen == [10, 11, 12, 13, 14]
+    slow_stats = monitor.dispatch_stats()[0][1]
+    assert slow_stats['queued'] == 4
+
+    release.set()
+    assert monitor.join(timeout=1)
+    assert slow_seen == [10, 11, 12, 13, 14]
+    callback, stats = monitor.dispatch_stats()[0]
+    assert callback is slow
+    assert stats['handled'] == 5
+    assert stats['max_lag'] >= 0.05
+
+
+def test_dispatch_reorg_ordered_with_confident_blocks(chain):
+    monitor = TransactionMonitor(confident_depth=3, dispatch_workers=2)
+    events = []
+
+    def slow_reorg(fork_num, replaced_hashes):
+        time.sleep(0.05)
+        events.append(('reorg', fork_num))
+
+    monitor.solid_watchers.append(monitor._dispatched(
+        lambda block, txs: events.append(('confident', block['hash']))))
+    monitor.reorg_watchers.append(monitor._dispatched(slow_reorg))
+    for number in range(10, 16):
+        monitor._new_block(chain.blocks[number]['hash'])
+
+    chain.extend(11, 16, 'b')
+    monitor._new_block(chain.blocks[16]['hash'])
+
+    assert monitor.join(timeout=1)
+    reorg_at = events.index(('reorg', 11))
+    assert ('confident', chain.blocks[11]['hash']) in events[reorg_at + 1:]
+    assert all(kind == 'confident' for kind, _ in events[reorg_at + 1:])
+
+
+def test_dispatch_queue_bounded():
+    monitor = TransactionMonitor(dispatch_workers=1, queue_size=2)
+    release = threading.Event()
+    watcher = monitor._dispatched(lambda tx: release.wait())
+    for txid in ('tx1', 'tx2', 'tx3'):
+        watcher(txid)
+    blocked = threading.Thread(target=watcher, args=('tx4', ))
+    blocked.start()
+    blocked.join(0.05)
+    # tx1 is being handled, while tx2 and tx3 fill the queue
+    assert blocked.is_alive()
+    release.set()
+    blocked.join(1)
+    assert not blocked.is_alive()
+    assert watcher.join(1)
+
+
+def test_dispatch_failures_counted():
+    monitor = TransactionMonitor(dispatch_workers=1)
+    monitor.pending_tx_watchers.append(monitor._dispatched(lambda tx: 1 / 0))
+    monitor._notify_pending_tx({'hash': 'tx1'})
+    assert monitor.join(1)
+    assert monitor.dispatch_stats()[0][1]['failed'] == 1
@@ -0,0 +1,106 @@
+import pytest
+
+from web3utils.pinned import BlockPin, CallCache
+
+from tests.standin import address
+
+
+def fake_block(number_hex, full_transactions=False):
+    number = int(number_hex, 16)
+    return {
+        'number': number_hex,
+        'hash': '0x' + ('%064x' % (0xb10c + number)),
+        'timestamp': hex(1500000000 + number),
+        'transactions': [],
+    }
+
+
+@pytest.fixture
+def node(node):
+    node.handlers['eth_getBlockByNumber'] = fake_block
+    return node
+
+
+@pytest.fixture
+def cache():
+    return CallCache()
+
+
+def test_pinned_call_at_block(node, token, cache):
+    calls_at = []
+    original_call = node.handlers['eth_call']
+
+    def spy_call(transaction, block_identifier):
+        calls_at.append(block_identifier)
+        return original_call(transaction, block_identifier)
+
+    node.handlers['eth_call'] = spy_call
+    assert token.at_block(5, cache).balanceOf(address(2)) == 2000
+    assert calls_at == ['0x5']
+
+
+def test_pinned_results_cached(node, token, cache):
+    pinned = token.at_block(5, cache)
+    assert pinned.balanceOf(address(2)) == 2000
+    assert pinned.balanceOf(address(2)) == 2000
+    assert pinned.balanceOf(address(3)) == 3000
+    assert node.rpc_methods.count('eth_call') == 2
+
+
+def test_cache_keyed_by_block(node, token, cache):
+    token.at_block(5, cache).balanceOf(address(2))
+    token.at_block(6, cache).balanceOf(address(2))
+    assert node.rpc_methods.count('eth_call') == 2
+    assert len(cache) == 2
+
+
+def test_shared_pin(node, token, cache):
+    pin = BlockPin(token._web3py_contract.web3, 5, cache)
+    token.at_block(pin).balanceOf(address(2))
+    token.at_block(pin).balanceOf(address(2))
+    assert node.rpc_methods.count('eth_getBlockByNumber') == 1
+    assert node.rpc_methods.count('eth_call') == 1
+
+
+def test_pinned_empty_result_is_none(token, cache):
+    assert token.at_block(5, cache).owner() is None
+
+
+def test_pinned_rejects_transact(token, cache):
+    with pytest.raises(ValueError):
+        token.at_block(5, cache).owner(transact={})
+
+
+def test_unpinned_contract_untouched(token, cache):
+    token.at_block(5, cache)
+    assert token._pin is None
+
+
+def test_persistent_cache(node, token, tmpdir):
+    path = str(tmpdir.join('calls'))
+    first_cache = CallCache(path=path)
+    token.at_block(5, first_cache).balanceOf(address(2))
+    first_cache.close()
+
+    second_cache = CallCache(path=path)
+    assert token.at_block(5, second_cache).balanceOf(address(2)) == 2000
+    assert node.rpc_methods.count('eth_call') == 1
+    second_cache.close()
+
+
+
+def test_cache_keyed_by_whole_call(node, token, cache):
+    pinned = token.at_block(5, cache)
+    pinned.balanceOf(address(2))
+    pinned.balanceOf(address(2), call={'value': 1})
+    pinned.balanceOf(address(2), call={'gas': 100000})
+    assert node.rpc_methods.count('eth_call') == 3
+
+
+def test_sender_follows_default_account(node, token, cache):
+    pinned = token.at_block(5, cache)
+    pinned.balanceOf(address(2))
+    token._web3py_contract.web3.eth.defaultAccount = address(9)
+    pinned.balanceOf(address(2))
+    assert node.rpc_methods.count('eth_call') == 2
+    assert node.rpc_methods.count('eth_coinbase') == 1
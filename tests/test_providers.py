@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+from web3 import Web3, HTTPProvider
+
+from web3utils import ContractSugar
+from web3utils.providers import PooledHTTPProvider, ProviderPool
+from web3utils.rpc import batch_request
+
+from tests.standin import (
+    COINBASE,
+    StandInChain,
+    StandInNode,
+    TOKEN_ABI,
+    TOKEN_ADDRESS,
+    address,
+)
+
+
+@pytest.fixture
+def chain():
+    return StandInChain(height=10, txs_per_block=1)
+
+
+@pytest.fixture
+def nodes(chain):
+    started = [StandInNode(chain.handlers()).start() for _ in range(3)]
+    yield started
+    for node in started:
+        if node._server.socket.fileno() != -1:
+            node.stop()
+
+
+def pool_of(nodes, **kwargs):
+    kwargs.setdefault('health_interval', 60)
+    return ProviderPool([HTTPProvider(node.uri) for node in nodes], **kwargs)
+
+
+def test_routes_to_first_node_until_latency_known(nodes):
+    web3 = Web3(pool_of(nodes))
+    assert web3.eth.blockNumber == 10
+    assert [node.http_requests for node in nodes] == [1, 0, 0]
+
+
+def test_routes_to_fastest_node(nodes):
+    nodes[0].latency = 0.2
+    nodes[1].latency = 0.1
+    pool = pool_of(nodes)
+    pool.check_health()
+    requests_before = [node.http_requests for node in nodes]
+
+    Web3(pool).eth.getBlock(5)
+
+    assert [node.http_requests - before for node, before in zip(nodes, requests_before)] == \
+        [0, 0, 1]
+
+
+def test_fails_over_to_next_node(nodes):
+    nodes[0].stop()
+    pool = pool_of(nodes)
+    web3 = Web3(pool)
+
+    assert web3.eth.blockNumber == 10
+    assert not pool.nodes[0].healthy
+    assert web3.eth.blockNumber == 10
+    assert [node.http_requests for node in nodes[1:]] == [2, 0]
+
+
+def test_all_nodes_down(nodes):
+    for node in nodes:
+        node.stop()
+    with pytest.raises(Exception):
+        Web3(pool_of(nodes)).eth.blockNumber
+
+
+def test_json_rpc_errors_not_retried(nodes):
+    with pytest.raises(ValueError):
+        Web3(pool_of(nodes)).eth.getFilterChanges('0x99')
+    assert [node.http_requests for node in nodes] == [0, 0, 0]
+
+
+def test_lagging_node_unhealthy(nodes):
+    lagging = StandInChain(height=4)
+    nodes[0].handlers.update(lagging.handlers())
+    pool = pool_of(nodes)
+    pool.check_health()
+    assert [node.healthy for node in pool.nodes] == [False, True, True]
+    assert pool.isConnected()
+
+
+def test_slow_read_hedged(nodes):
+    nodes[0].latency = 1
+    pool = pool_of(nodes, hedge_after=0.05)
+    start = time.monotonic()
+    assert Web3(pool).eth.getBlock(5)['number'] == 5
+    assert time.monotonic() - start < 0.5
+    assert nodes[1].http_requests == 1
+
+
+def test_writes_not_hedged_or_retried(nodes):
+    nodes[0].stop()
+    pool = pool_of(nodes, hedge_after=0)
+    with pytest.raises(Exception):
+        pool.make_request('eth_sendTransaction', [{}])
+    assert [node.http_requests for node in nodes[1:]] == [0, 0]
+
+
+def test_filters_stay_on_their_node(chain, nodes):
+    pool = pool_of(nodes)
+    web3 = Web3(pool)
+    block_filter = web3.eth.filter('latest')
+    # the fastest node changes, but the filter only exists on the first
+    pool.nodes[0].latency = 1
+    chain.mine()
+
+    assert web3.eth.getFilterChanges(block_filter.filter_id) == [chain.block_hash(11)]
+    assert web3.eth.uninstallFilter(block_filter.filter_id)
+    assert nodes[0].rpc_methods == [
+        'eth_newBlockFilter', 'eth_getFilterChanges', 'eth_uninstallFilter']
+    with pytest.raises(ValueError):
+        web3.eth.getFilterChanges(block_filter.filter_id)
+
+
+def test_batches_fail_over(nodes):
+    nodes[0].stop()
+    pool = pool_of(nodes)
+    responses = pool.make_batch_request([('eth_blockNumber', []), ('eth_blockNumber', [])])
+    assert [response['result'] for response in responses] == ['0xa', '0xa']
+    assert nodes[1].http_requests == 1
+
+
+def test_batches_with_writes_not_retried(nodes):
+    nodes[0].stop()
+    pool = pool_of(nodes)
+    with pytest.raises(Exception):
+        pool.make_batch_request([('eth_blockNumber', []), ('eth_sendRawTransaction', ['0x00'])])
+    assert [node.http_requests for node in nodes[1:]] == [0, 0]
+
+
+def test_pooled_http_reuses_connections(node):
+    provider = PooledHTTPProvider(node.uri, pool_size=3)
+    contract = ContractSugar(Web3(provider).eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
+    with ThreadPoolExecutor(8) as executor:
+        balances = list(executor.map(contract.balanceOf, [address(n) for n in range(20, 220)]))
+    assert balances == [n * 1000 for n in range(20, 220)]
+    assert node.connections <= 3
+
+
+def test_pooled_http_batches(node):
+    provider = PooledHTTPProvider(node.uri)
+    responses = batch_request(provider, [('eth_coinbase', [])] * 3)
+    assert [response['result'] for response in responses] == [COINBASE] * 3
+    assert node.http_requests == 1
+
+
+def test_pooled_http_timeout():
+    with StandInNode({'eth_blockNumber': lambda: '0x1'}, latency=0.5) as node:
+        provider = PooledHTTPProvider(node.uri, timeout=0.05)
+        assert not provider.isConnected()
+        with pytest.raises(IOError):
+            provider.make_request('eth_blockNumber', [])
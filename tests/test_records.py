@@ -0,0 +1,29 @@
+import pytest
+
+from web3utils.records import record_type
+
+Transfer = record_type('Transfer', ('hash', 'from', 'to', 'value', 'hash'))
+
+
+def test_record_from_dict():
+    transfer = Transfer.from_dict({'hash': '0x1', 'from': '0xa', 'value': 5, 'gas': 21000})
+    assert transfer == {'hash': '0x1', 'from': '0xa', 'to': None, 'value': 5}
+    assert transfer['from'] == '0xa'
+    assert transfer.value == 5
+    assert 'to' in transfer
+    assert 'gas' not in transfer
+    assert transfer.get('gas') is None
+    with pytest.raises(KeyError):
+        transfer['gas']
+    with pytest.raises(KeyError):
+        transfer['get']
+
+
+def test_record_compact_and_read_only():
+    transfer = Transfer('0x1', '0xa', '0xb', 5)
+    assert list(transfer) == ['hash', 'from', 'to', 'value']
+    assert not hasattr(transfer, '__dict__')
+    with pytest.raises(TypeError):
+        transfer.value = 6
+    with pytest.raises(TypeError):
+        Transfer('0x1')
@@ -0,0 +1,155 @@
+from concurrent.futures import Future
+import gc
+import weakref
+
+import pytest
+
+from web3 import Web3
+
+from web3utils import ContractSugar
+from web3utils.providers import PooledHTTPProvider
+from web3utils.sender import TransactionSender, transaction_sender
+
+from tests.standin import StandInAccounts, StandInNode, TOKEN_ABI, TOKEN_ADDRESS, address
+
+SENDER = address(0xa)
+
+
+@pytest.fixture
+def accounts():
+    return StandInAccounts()
+
+
+@pytest.fixture
+def web3(accounts):
+    with StandInNode(accounts.handlers()) as node:
+        provider = PooledHTTPProvider(node.uri)
+        yield Web3(provider)
+        provider.close()
+
+
+@pytest.fixture
+def token(web3):
+    return ContractSugar(web3.eth.contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS))
+
+
+def send_transfers(token, amounts, sender=None):
+    with token.send_batch({'from': SENDER}, sender=sender) as batch:
+        futures = [batch.transfer(address(num), amount) for num, amount in amounts]
+    return futures
+
+
+def test_batch_nonces_counted_locally(token, accounts):
+    sender = TransactionSender(token._web3py_contract.web3)
+    futures = send_transfers(token, [(20, 1), (21, 2), (22, 3)], sender)
+    futures += send_transfers(token, [(23, 4)], sender)
+
+    assert [future.result() for future in futures] == [
+        '0x%064x' % (0xa << 64 | nonce) for nonce in range(4)]
+    mined = accounts.mined(SENDER)
+    assert [int(tx['nonce'], 16) for tx in mined] == [0, 1, 2, 3]
+    assert sender.nonces.lookups == 1
+    # one estimate for all the transfers, which have the same shape
+    assert accounts.estimates == 1
+    assert int(mined[0]['gas'], 16) == 62500
+    assert sender.stats == {'sent': 4, 'estimates': 1, 'cached_estimates': 3}
+
+
+def test_nonce_too_low_recovered(token, accounts):
+    sender = TransactionSender(token._web3py_contract.web3)
+    sender.send({'from': SENDER, 'to': address(1)})
+    # another process sends from the same account
+    accounts.nonces[SENDER] = 5
+
+    futures = send_transfers(token, [(20, 1), (21, 2)], sender)
+
+    assert [future.result() for future in futures] == [
+        '0x%064x' % (0xa << 64 | nonce) for nonce in (5, 6)]
+    assert sender.stats['retries'] == 2
+
+
+def test_failed_transaction_nonce_reused(token, accounts):
+    sender = TransactionSender(token._web3py_contract.web3)
+    ok, broke = Future(), Future()
+    sender.send_many([
+        ({'from': SENDER, 'to': address(1), 'value': 1}, ok),
+        ({'from': SENDER, 'to': address(1), 'value': accounts.INSUFFICIENT_FUNDS}, broke),
+    ])
+    with pytest.raises(ValueError):
+        broke.result()
+    assert ok.result()
+
+    # the failed transaction's nonce is taken over, instead of leaving a gap
+    future, = send_transfers(token, [(22, 3)], sender)
+    future.result()
+    assert len(accounts.mined(SENDER)) == 2
+
+
+def test_encoding_errors_stay_in_future(token, accounts):
+    futures = send_transfers(token, [(20, 'not a number'), (21, 2)])
+    with pytest.raises(TypeError):
+        futures[0].result()
+    assert futures[1].result()
+    assert len(accounts.mined(SENDER)) == 1
+
+
+def test_sender_shared_per_web3(web3):
+    assert transaction_sender(web3) is transaction_sender(web3)
+    assert transaction_sender(web3) is not transaction_sender(Web3(None))
+
+
+def test_shared_sender_does_not_keep_web3_alive():
+    short_lived = Web3(None)
+    transaction_sender(short_lived)
+    collected = weakref.ref(short_lived)
+    del short_lived
+    gc.collect()
+    assert collected() is None
+
+
+def test_already_known_resolved_without_sending_twice(web3, accounts):
+    transfer = {'from': SENDER, 'to': address(1), 'value': 1}
+    first = TransactionSender(web3).send(transfer)
+    # another sender counts from a node whose pending count lags behind
+    accounts.nonces[SENDER] = 0
+    sender = TransactionSender(web3)
+
+    assert sender.send(transfer) == first
+    assert sender.stats == {'known': 1}
+    assert len(accounts.sent[SENDER]) == 1
+
+
+def test_nonce_lookup_failure_fails_all(web3, accounts, mocker):
+    sender = TransactionSender(web3)
+    mocker.patch.object(sender.nonces, 'reserve', side_effect=ConnectionError('node is down'))
+    futures = [Future(), Future()]
+
+    sender.send_many([({'from': SENDER, 'to': address(1)}, future) for future in futures])
+
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(0)
+    assert sender.stats['failed'] == 2
+
+
+def test_dropped_transaction_resent(web3, accounts):
+    sender = TransactionSender(web3)
+    txids = [sender.send({'from': SENDER, 'to': address(1), 'value': value}) for value in (1, 2)]
+    accounts.drop(SENDER, 1)
+
+    assert sender.resend_dropped() == [txids[1]]
+    assert [int(tx['value'], 16) for tx in accounts.mined(SENDER)] == [1, 2]
+    assert sender.stats['resent'] == 1
+    # the node has them all again
+    assert sender.resend_dropped() == []
+
+
+def test_dropped_transaction_abandoned_when_nonce_used(web3, accounts):
+    sender = TransactionSender(web3)
+    sender.send({'from': SENDER, 'to': address(1), 'value': 1})
+    accounts.drop(SENDER, 0)
+    TransactionSender(web3).send({'from': SENDER, 'to': address(1), 'value': 2})
+
+    assert sender.resend_dropped() == []
+    assert sender.stats['abandoned'] == 1
+    assert [int(tx['value'], 16) for tx in accounts.mined(SENDER)] == [2]
@@ -1,9 +1,24 @@
 
+import threading
+
 import pytest
 from unittest.mock import Mock
 
+from web3 import HTTPProvider
+
 from web3utils import ProxyEth, DefaultedWeb3
-from web3utils.web3proxies import Web3ConfigException
+from web3utils.caching import LRUCache
+from web3utils.providers import ProviderPool
+from web3utils.web3proxies import (
+    PROVIDER_ENV,
+    PROVIDER_HINT_ENV,
+    Web3ConfigException,
+    provider_from_uri,
+    provider_uri,
+)
+
+ETH_SHA3 = '0x4f5b812789fc606be1b3b16908db13fc7a9adf7ca72641f84d75b47069d3d7f0'
+EMPTY_SHA3 = bytes.fromhex('c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470')
 
 PROVIDER_LIVE = Mock(isConnected=lambda: True)
 PROVIDER_DOWN = Mock(isConnected=lambda: False)
@@ -47,8 +62,125 @@ def test_sha3_bytes(monkeypatch):
     web3 = DefaultedWeb3()
     sha = web3.sha3(b'eth', encoding='bytes')
     assert type(sha) == bytes
-    assert web3.toHex(sha) == '0x4f5b812789fc606be1b3b16908db13fc7a9adf7ca72641f84d75b47069d3d7f0'
+    assert web3.toHex(sha) == ETH_SHA3
 
 def test_sha3_argument_detection(mockweb3):
     mockweb3.sha3(b'parrot')
-    mockweb3._proxyto.sha3.assert_called_once_with(b'parrot', encoding='bytes')
+    assert not mockweb3._proxyto.sha3.called
+    mockweb3.sha3('0x01')
+    mockweb3._proxyto.sha3.assert_called_once_with('0x01')
+
+def test_sha3_bytes_without_provider(mocker):
+    mocker.patch.object(DefaultedWeb3, '_DEFAULT_PROVIDERS', [])
+    web3 = DefaultedWeb3()
+    assert web3.sha3(bytearray(b'')) == EMPTY_SHA3
+    assert web3.toHex(web3.sha3(b'eth')) == ETH_SHA3
+    with pytest.raises(Web3ConfigException):
+        web3.sha3('0xDEAD')
+
+def test_sha3_many():
+    web3 = DefaultedWeb3()
+    assert web3.sha3_many([b'', bytearray(b'eth')]) == [EMPTY_SHA3, web3.sha3(b'eth')]
+
+def test_sha3_many_memo():
+    memo = LRUCache(2)
+    web3 = DefaultedWeb3()
+    hashes = web3.sha3_many([b'eth', b'', b'eth'], memo=memo)
+    assert hashes == web3.sha3_many([b'eth', b'', b'eth'])
+    assert memo.get(b'eth') == hashes[0]
+    with pytest.raises(TypeError):
+        web3.sha3_many(['not bytes'])
+
+def test_no_detection_on_init(mocker):
+    factory = Mock()
+    mocker.patch.object(DefaultedWeb3, '_DEFAULT_PROVIDERS', [factory])
+    DefaultedWeb3()
+    assert not factory.called
+
+def test_detection_on_first_use(mocker):
+    mocker.patch.object(DefaultedWeb3, '_DEFAULT_PROVIDERS', [lambda: PROVIDER_LIVE])
+    web3 = DefaultedWeb3()
+    assert web3.currentProvider is PROVIDER_LIVE
+
+def test_detection_runs_once(mocker):
+    factory = Mock(return_value=PROVIDER_DOWN)
+    mocker.patch.object(DefaultedWeb3, '_DEFAULT_PROVIDERS', [factory])
+    web3 = DefaultedWeb3()
+    for _ in range(2):
+        with pytest.raises(Web3ConfigException):
+            web3.eth
+    factory.assert_called_once_with()
+
+def test_slow_provider_misses_deadline():
+    unblock = threading.Event()
+    slow = Mock(isConnected=lambda: unblock.wait(5))
+    web3 = DefaultedWeb3()
+    try:
+        assert web3._first_connection([slow, PROVIDER_LIVE], timeout=0.05) == PROVIDER_LIVE
+    finally:
+        unblock.set()
+
+def test_explicit_provider_env(monkeypatch, mocker):
+    factory = Mock()
+    mocker.patch.object(DefaultedWeb3, '_DEFAULT_PROVIDERS', [factory])
+    monkeypatch.setenv(PROVIDER_ENV, 'http://10.0.0.1:8545/')
+    web3 = DefaultedWeb3()
+    assert web3.currentProvider.endpoint_uri == 'http://10.0.0.1:8545/'
+    assert not factory.called
+
+def test_provider_hint_saved(monkeypatch, mocker, tmpdir):
+    hint = tmpdir.join('provider')
+    monkeypatch.setenv(PROVIDER_HINT_ENV, str(hint))
+    live_http = HTTPProvider('http://10.0.0.2:8545/')
+    mocker.patch.object(live_http, 'isConnected', return_value=True)
+    mocker.patch.object(DefaultedWeb3, '_DEFAULT_PROVIDERS', [lambda: live_http])
+    web3 = DefaultedWeb3()
+    assert web3.currentProvider is live_http
+    assert hint.read() == 'http://10.0.0.2:8545/'
+
+def test_provider_uri_roundtrip():
+    assert provider_uri(provider_from_uri('https://node:8545/')) == 'https://node:8545/'
+    assert provider_uri(provider_from_uri('/tmp/geth.ipc')) == '/tmp/geth.ipc'
+    assert provider_uri(PROVIDER_LIVE) is None
+
+def test_provider_pool_uri_roundtrip():
+    uri = 'http://10.0.0.1:8545/,/tmp/geth.ipc'
+    pool = provider_from_uri(uri)
+    assert isinstance(pool, ProviderPool)
+    assert provider_uri(pool) == uri
+
+def test_web3_attributes_bound_until_set_provider():
+    web3 = DefaultedWeb3()
+    web3.setProvider(PROVIDER_LIVE)
+    eth = web3.eth
+    assert vars(web3)['eth'] is eth
+    assert web3.currentProvider is PROVIDER_LIVE
+    assert 'currentProvider' not in vars(web3)
+
+    web3.setProvider(PROVIDER_DOWN)
+    assert 'eth' not in vars(web3)
+    assert web3.currentProvider is PROVIDER_DOWN
+    assert web3.eth is eth
+
+def test_web3_unbound_without_provider(mocker):
+    mocker.patch.object(DefaultedWeb3, '_DEFAULT_PROVIDERS', [])
+    web3 = DefaultedWeb3()
+    web3.setProvider(PROVIDER_LIVE)
+    eth = ProxyEth(web3)
+    eth.getBlock
+    web3.setProvider(None)
+    with pytest.raises(Web3ConfigException):
+        web3.eth
+    with pytest.raises(Web3ConfigException):
+        eth.getBlock
+
+def test_ethproxy_binds_methods_only():
+    web3 = DefaultedWeb3()
+    web3.setProvider(PROVIDER_LIVE)
+    eth = ProxyEth(web3)
+    assert eth.getBlock == web3.eth.getBlock
+    assert 'getBlock' in vars(eth)
+    web3.eth.defaultAccount = '0x1'
+    assert eth.defaultAccount == '0x1'
+    web3.eth.defaultAccount = '0x2'
+    assert eth.defaultAccount == '0x2'
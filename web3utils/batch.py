@@ -0,0 +1,138 @@
+from concurrent.futures import Future
+import functools
+
+from eth_abi import decode_abi
+from eth_abi.exceptions import DecodingError
+from web3.exceptions import BadFunctionCallOutput
+from web3.formatters import input_block_identifier_formatter, input_transaction_formatter
+from web3.utils.abi import get_abi_output_types, normalize_return_type
+from web3.utils.empty import empty
+
+from web3utils.encodings import encode_contract_arg, is_empty_hex
+from web3utils.rpc import BATCH_SIZE, batch_request, response_result
+
+
+class ContractBatch:
+    '''
+    Queue up contract reads, to send in JSON-RPC batches.
+
+    Each queued call returns a concurrent.futures.Future, which resolves to what the equivalent
+    ContractMethod call returns: string arguments are utf-8 encoded, and empty results are None.
+
+    Get one from `ContractSugar.batch()`, rather than building it directly.
+    '''
+
+    def __init__(self, contract, batch_size=BATCH_SIZE, transaction=None):
+        self._contract = contract
+        self._batch_size = batch_size
+        self._transaction = dict(transaction or {})
+        self._queued = []
+
+    def __getattr__(self, function):
+        if function.startswith('__'):
+            raise AttributeError(function)
+        return functools.partial(self._queue, function)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            for _, _, future in self._queued:
+                future.cancel()
+            self._queued = []
+
+    def _queue(self, function, *args):
+        future = Future()
+        self._queued.append((function, args, future))
+        return future
+
+    def execute(self):
+        '''
+        Send all queued calls, and resolve their futures.
+
+        If the batch cannot be sent at all, like when the node is down, every future fails with
+        the same exception.
+        '''
+        queued, self._queued = self._queued, []
+        try:
+            self._execute(queued)
+        except Exception as exc:
+            for _, _, future in queued:
+                if not future.done():
+                    future.set_exception(exc)
+
+    def _execute(self, queued):
+        transaction = self._call_transaction()
+        requests, pending = [], []
+        for function, args, future in queued:
+            try:
+                args = [encode_contract_arg(arg, function) for arg in args]
+                requests.append(self._call_request(function, args, transaction))
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                pending.append((function, args, future))
+
+        provider = self._contract.web3.currentProvider
+        responses = batch_request(provider, requests, self._batch_size)
+        for (function, args, future), response in zip(pending, responses):
+            try:
+                return_data = response_result(response)
+                result = decode_call_result(self._contract, function, args, return_data)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def _call_transaction(self):
+        'like Contract.call(), but look up the default sender once per batch, not once per call'
+        transaction = dict(self._transaction)
+        transaction.setdefault('to', self._contract.address)
+        if 'from' not in transaction:
+            transaction['from'] = default_sender(self._contract.web3.eth)
+        return transaction
+
+    def _call_request(self, function, args, transaction):
+        eth = self._contract.web3.eth
+        prepared = self._contract._prepare_transaction(
+            fn_name=function,
+            fn_args=args,
+            transaction=transaction,
+        )
+        return 'eth_call', [
+            input_transaction_formatter(eth, prepared),
+            input_block_identifier_formatter(eth.defaultBlock),
+        ]
+
+
+def default_sender(eth):
+    'the sender that web3.py assumes for a call without a "from"'
+    if eth.defaultAccount is empty:
+        return eth.coinbase
+    else:
+        return eth.defaultAccount
+
+
+def decode_call_result(contract, function, args, return_data):
+    'decode eth_call output the way web3.py does, then convert empty results to None'
+    function_abi = contract._find_matching_fn_abi(function, args, {})
+    output_types = get_abi_output_types(function_abi)
+    try:
+        output_data = decode_abi(output_types, return_data)
+    except DecodingError as exc:
+        raise BadFunctionCallOutput(
+            "Could not decode contract function call %s return data %s for output_types %s" % (
+                function, return_data, output_types)) from exc
+
+    normalized = [
+        normalize_return_type(data_type, data_value)
+        for data_type, data_value in zip(output_types, output_data)
+    ]
+    result = normalized[0] if len(normalized) == 1 else normalized
+    if is_empty_hex(result):
+        return None
+    else:
+        return result
@@ -0,0 +1,139 @@
+'''
+Keep confident blocks and their transactions on disk, to survive restarts.
+
+    store = BlockStore('blocks.sqlite')
+    monitor = TransactionMonitor(store=store)
+
+A TransactionMonitor with a store writes every block it sends to confident block watchers, and
+resumes from the highest stored block when it starts again. Blocks mined while it was stopped
+are then sent to watchers, like any other skipped blocks. Its ChainCache answers lookups of
+stored blocks and transactions from disk, instead of asking the node.
+'''
+
+import json
+import sqlite3
+import threading
+
+from web3.utils.datastructures import AttributeDict
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    block TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    hash TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    tx TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_by_block ON transactions (block_number, position);
+'''
+
+
+class BlockStore:
+    '''
+    An SQLite database of blocks, by number and hash, and their transactions, by hash.
+
+    Only blocks that will not change should be stored, so one block is kept per number. Any
+    thread may use the store.
+    '''
+
+    def __init__(self, path, max_blocks=None):
+        '''
+        @param path the database file, created if missing, or ':memory:' to not keep it
+        @param max_blocks how many of the highest blocks to keep, or None to keep all
+        '''
+        self.path = path
+        self.max_blocks = max_blocks
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT count(*) FROM blocks').fetchone()[0]
+
+    def add(self, block, txs):
+        '''
+        Store a block, with transaction hashes like from `eth.getBlock(block_id)`, and its
+        transactions. Replaces any block stored at the same number.
+        '''
+        number = block['number']
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM transactions WHERE block_number = ?', (number,))
+            self._db.execute(
+                'INSERT OR REPLACE INTO blocks (number, hash, block) VALUES (?, ?, ?)',
+                (number, block['hash'], _encode(block)),
+            )
+            self._db.executemany(
+                'INSERT OR REPLACE INTO transactions (hash, block_number, position, tx) '
+                'VALUES (?, ?, ?, ?)',
+                [(tx['hash'], number, position, _encode(tx)) for position, tx in enumerate(txs)],
+            )
+            if self.max_blocks is not None:
+                self._forget_below(number - self.max_blocks + 1)
+
+    def rollback(self, block_num):
+        'forget the blocks at or above block_num, after they were reorganized away'
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM blocks WHERE number >= ?', (block_num,))
+            self._db.execute('DELETE FROM transactions WHERE block_number >= ?', (block_num,))
+
+    def latest_block(self):
+        'the highest stored block, or None if the store is empty'
+        return self._block('SELECT block FROM blocks ORDER BY number DESC LIMIT 1', ())
+
+    def get_block(self, block_id):
+        '''
+        @param block_id a block number or hash
+        @return the stored block, with transaction hashes, or None
+        '''
+        if isinstance(block_id, int):
+            return self._block('SELECT block FROM blocks WHERE number = ?', (block_id,))
+        elif isinstance(block_id, str) and len(block_id) == 66:
+            return self._block('SELECT block FROM blocks WHERE hash = ?', (block_id,))
+        else:
+            return None
+
+    def get_block_with_txs(self, block_id):
+        '@return (block, transactions), or (None, []) if the block is not stored'
+        block = self.get_block(block_id)
+        if block is None:
+            return None, []
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT tx FROM transactions WHERE block_number = ? ORDER BY position',
+                (block['number'],),
+            ).fetchall()
+        return block, [_decode(tx) for tx, in rows]
+
+    def get_transaction(self, txid):
+        'the stored transaction, or None'
+        with self._lock:
+            row = self._db.execute('SELECT tx FROM transactions WHERE hash = ?', (txid,)).fetchone()
+        return row and _decode(row[0])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _block(self, query, args):
+        with self._lock:
+            row = self._db.execute(query, args).fetchone()
+        return row and _decode(row[0])
+
+    def _forget_below(self, block_num):
+        self._db.execute('DELETE FROM blocks WHERE number < ?', (block_num,))
+        self._db.execute('DELETE FROM transactions WHERE block_number < ?', (block_num,))
+
+
+def _encode(value):
+    # web3.py returns AttributeDicts, which json cannot encode without help
+    return json.dumps(value, default=dict, separators=(',', ':'))
+
+
+def _decode(encoded):
+    return AttributeDict(json.loads(encoded))
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+import sys
+import threading
+
+
+class LRUCache:
+    '''
+    A thread-safe mapping that evicts the least recently used entry once it holds maxsize entries
+    '''
+
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError("LRUCache must hold at least one entry, got maxsize=%r" % maxsize)
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SizedLRUCache(LRUCache):
+    '''
+    An LRUCache that also evicts entries once their approximate total size exceeds maxbytes
+    '''
+
+    def __init__(self, maxsize=10 ** 6, maxbytes=64 * 2 ** 20, sizeof=None):
+        super().__init__(maxsize)
+        self.maxbytes = maxbytes
+        self.currentbytes = 0
+        self._sizeof = sizeof or approximate_size
+        self._sizes = {}
+
+    def __setitem__(self, key, value):
+        size = self._sizeof(key) + self._sizeof(value)
+        with self._lock:
+            self.currentbytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while self._entries and (
+                    len(self._entries) > self.maxsize or self.currentbytes > self.maxbytes):
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.currentbytes -= self._sizes.pop(evicted_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.currentbytes = 0
+
+
+def approximate_size(value):
+    'size in bytes of the value, including the items of shallow containers like tuples of strings'
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(map(sys.getsizeof, value))
+    return size
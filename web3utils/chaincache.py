@@ -0,0 +1,213 @@
+from collections import Counter
+
+from web3.formatters import output_transaction_formatter
+from web3.utils.datastructures import AttributeDict
+
+from web3utils.caching import LRUCache
+from web3utils.records import record_type
+from web3utils.rpc import BATCH_SIZE, batch_request
+
+# the fields that ChainCache and TransactionMonitor read, always kept in compact records
+BLOCK_RECORD_FIELDS = ('number', 'hash', 'parentHash')
+TRANSACTION_RECORD_FIELDS = ('hash', 'blockNumber', 'blockHash')
+
+
+class ChainCache:
+    '''
+    Cache blocks and transactions fetched through an `eth` object, like web3utils.eth
+
+    Blocks are cached by hash, which always identifies the same contents. Lookups by block number
+    and by transaction hash can change when the tip of the chain reorganizes, so they are only
+    answered from the cache once the block is at least `immutable_depth` blocks below the highest
+    block seen, and still matches the most recent block seen at that number.
+
+    Counts of cache hits and misses are kept in `hits` and `misses`, by 'block' and 'transaction'.
+
+    With a `web3utils.blockstore.BlockStore`, lookups that miss the cache are answered from the
+    store when they can be, before asking the node. Those are counted in `hits`, as 'stored block'
+    and 'stored transaction'.
+
+    With block_fields or tx_fields, blocks or transactions are cached and returned as compact
+    `web3utils.records.Record`s of only those fields, plus the ones the cache needs.
+    '''
+
+    def __init__(self, eth, immutable_depth=3, max_blocks=256, max_txs=50000, store=None,
+                 block_fields=None, tx_fields=None):
+        self.immutable_depth = immutable_depth
+        self.store = store
+        self._compact_block = _compactor('Block', BLOCK_RECORD_FIELDS, block_fields)
+        self._compact_tx = _compactor('Transaction', TRANSACTION_RECORD_FIELDS, tx_fields)
+        self.head_number = None
+        self.hits = Counter()
+        self.misses = Counter()
+        self._eth = eth
+        # block hash -> (block with transaction hashes, list of transactions or None)
+        self._blocks = LRUCache(max_blocks)
+        # block number -> hash of the most recent block seen at that number
+        self._hashes = LRUCache(max_blocks)
+        # transaction hash -> mined transaction
+        self._txs = LRUCache(max_txs)
+
+    def get_block(self, block_id, full_transactions=False):
+        'equivalent to `eth.getBlock(block_id, full_transactions)`'
+        if full_transactions:
+            block, txs = self.get_block_with_txs(block_id)
+            return block and AttributeDict(dict(block, transactions=txs))
+        entry = self._cached_block(block_id)
+        if entry is None:
+            entry = self._stored_block(block_id)
+        if entry is None:
+            entry = self._fetch_block(block_id, full_transactions=False)
+        return entry[0]
+
+    def get_block_with_txs(self, block_id):
+        '''
+        @return (block, transactions), where the block lists transaction hashes,
+            as if it came from `eth.getBlock(block_id)`. If the block is not found: (None, [])
+        '''
+        entry = self._cached_block(block_id)
+        if entry is None or entry[1] is None:
+            entry = self._stored_block(block_id)
+        if entry is None:
+            entry = self._fetch_block(block_id, full_transactions=True)
+        block, txs = entry
+        return block, txs or []
+
+    def get_transaction(self, txid):
+        'equivalent to `eth.getTransaction(txid)`'
+        tx = self._cached_transaction(txid)
+        if tx is None:
+            tx = self._stored_transaction(txid)
+        if tx is None:
+            tx = self._compact_tx(self._eth.getTransaction(txid))
+            self._remember_transaction(tx)
+        return tx
+
+    def get_transactions(self, txids, batch_size=BATCH_SIZE):
+        '''
+        Like `[eth.getTransaction(txid) for txid in txids]`, except that transactions missing
+        from the cache are requested in JSON-RPC batches. If the node answers a request with an
+        error, that transaction is None, like one that was not found.
+        '''
+        found = {}
+        missing = []
+        for txid in txids:
+            tx = self._cached_transaction(txid)
+            if tx is None:
+                tx = self._stored_transaction(txid)
+            if tx is None:
+                missing.append(txid)
+            else:
+                found[txid] = tx
+        requests = [('eth_getTransactionByHash', [txid]) for txid in missing]
+        responses = batch_request(self._eth.web3.currentProvider, requests, batch_size)
+        for txid, response in zip(missing, responses):
+            tx = self._compact_tx(output_transaction_formatter(response.get('result')))
+            self._remember_transaction(tx)
+            found[txid] = tx
+        return [found[txid] for txid in txids]
+
+    def _cached_transaction(self, txid):
+        tx = self._txs.get(txid)
+        if tx is not None and self._is_settled(tx):
+            self.hits['transaction'] += 1
+            return tx
+        self.misses['transaction'] += 1
+        return None
+
+    def _remember_transaction(self, tx):
+        if tx and tx['blockNumber'] is not None:
+            self._txs[tx['hash']] = tx
+
+    def _cached_block(self, block_id):
+        block_hash = self._cacheable_hash(block_id)
+        entry = block_hash and self._blocks.get(block_hash)
+        if entry:
+            self.hits['block'] += 1
+        else:
+            self.misses['block'] += 1
+        return entry
+
+    def _stored_block(self, block_id):
+        'look up a block and its transactions in the store, and cache them by hash'
+        if self.store is None:
+            return None
+        block, txs = self.store.get_block_with_txs(block_id)
+        if block is None:
+            return None
+        self.hits['stored block'] += 1
+        block, txs = self._compact_block(block), [self._compact_tx(tx) for tx in txs]
+        self._blocks[block['hash']] = (block, txs)
+        return block, txs
+
+    def _stored_transaction(self, txid):
+        if self.store is None:
+            return None
+        tx = self.store.get_transaction(txid)
+        if tx is not None:
+            self.hits['stored transaction'] += 1
+        return self._compact_tx(tx)
+
+    def _cacheable_hash(self, block_id):
+        if isinstance(block_id, int):
+            if self._is_immutable(block_id):
+                return self._hashes.get(block_id)
+            else:
+                return None
+        elif isinstance(block_id, str) and len(block_id) == 66:
+            return block_id
+        else:
+            # like 'latest' or 'pending'
+            return None
+
+    def _fetch_block(self, block_id, full_transactions):
+        fetched = self._eth.getBlock(block_id, full_transactions=full_transactions)
+        if not fetched:
+            return None, None
+        if full_transactions:
+            txs = [self._compact_tx(tx) for tx in fetched['transactions']]
+            block = self._compact_block(
+                AttributeDict(dict(fetched, transactions=[tx['hash'] for tx in txs])))
+        else:
+            block, txs = self._compact_block(fetched), None
+        self._remember(block, txs)
+        return block, txs
+
+    def _remember(self, block, txs):
+        number = block['number']
+        if number is None:
+            # pending blocks have no number or hash
+            return
+        if self.head_number is None or number > self.head_number:
+            self.head_number = number
+        self._hashes[number] = block['hash']
+        self._blocks[block['hash']] = (block, txs)
+        for tx in txs or []:
+            self._txs[tx['hash']] = tx
+
+    def _is_immutable(self, block_number):
+        return self.head_number is not None and \
+            block_number <= self.head_number - self.immutable_depth
+
+    def _is_settled(self, tx):
+        block_number = tx['blockNumber']
+        return self._is_immutable(block_number) and \
+            self._hashes.get(block_number) == tx['blockHash']
+
+
+def _compactor(name, required_fields, fields):
+    '''
+    a function to convert a dict to a record of the fields, or to leave it as it is,
+    if fields is None
+    '''
+    if fields is None:
+        return _unchanged
+    record = record_type(name, required_fields + tuple(fields))
+
+    def compact(value):
+        return value and record.from_dict(value)
+    return compact
+
+
+def _unchanged(value):
+    return value
@@ -1,13 +1,80 @@
 
 import datetime
+import threading
 import time
+import weakref
+
+# by default, how many seconds to reuse the latest block before fetching it again
+HEAD_MAX_AGE = 1
 
 
 def isfresh(block, allowable_delay):
     return block and time.time() - block.timestamp <= allowable_delay
 
 
-def stalecheck(web3, **kwargs):
+class HeadTracker:
+    '''
+    Remember the latest block, so that frequent checks of the chain head don't each need an RPC.
+
+    The block is fetched again once it is max_age seconds old. Concurrent callers
+    wait for one fetch to finish, instead of sending their own.
+
+    Only a weak reference to web3 is kept, so that sharing a tracker per web3 with
+    `head_tracker()` does not keep the web3 alive.
+    '''
+
+    def __init__(self, web3, max_age=HEAD_MAX_AGE):
+        self._web3 = weakref.ref(web3)
+        self.max_age = max_age
+        self.fetches = 0
+        self._head = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def web3(self):
+        return self._web3()
+
+    def latest(self):
+        'the latest block, as of at most max_age seconds ago'
+        if not self._is_expired():
+            return self._head
+        with self._lock:
+            # another thread may have fetched it while this one waited for the lock
+            if self._is_expired():
+                self._head = self.web3.eth.getBlock('latest')
+                self._fetched_at = time.monotonic()
+                self.fetches += 1
+            return self._head
+
+    def isfresh(self, allowable_delay):
+        return isfresh(self.latest(), allowable_delay)
+
+    def clear(self):
+        'fetch the latest block on the next call'
+        self._fetched_at = None
+
+    def _is_expired(self):
+        fetched_at = self._fetched_at
+        return fetched_at is None or time.monotonic() - fetched_at >= self.max_age
+
+
+_head_trackers = weakref.WeakKeyDictionary()
+_head_trackers_lock = threading.Lock()
+
+
+def head_tracker(web3, max_age=HEAD_MAX_AGE):
+    '''
+    The HeadTracker shared by all callers with the same web3 and max_age
+    '''
+    with _head_trackers_lock:
+        trackers = _head_trackers.setdefault(web3, {})
+        if max_age not in trackers:
+            trackers[max_age] = HeadTracker(web3, max_age)
+        return trackers[max_age]
+
+
+def stalecheck(web3, head_max_age=HEAD_MAX_AGE, **kwargs):
     '''
     Use to require that a function will run only of the blockchain is recently updated.
 
@@ -16,18 +83,24 @@ def stalecheck(web3, **kwargs):
     Define how stale the chain can be with keyword arguments from datetime.timedelta,
     like stalecheck(web3, days=2)
 
+    The latest block is shared with other checks on the same web3, and is fetched again once it
+    is head_max_age seconds old. Use head_max_age=0 to fetch it on every call.
+
     Turn off the staleness check at runtime with:
     wrapped_func(..., assertfresh=False)
     '''
     allowable_delay = datetime.timedelta(**kwargs).total_seconds()
+    tracker = head_tracker(web3, head_max_age)
 
     def decorator(func):
         def wrapper(*args, assertfresh=True, **kwargs):
             if assertfresh:
-                last_block = web3.eth.getBlock('latest')
+                last_block = tracker.latest()
                 if not isfresh(last_block, allowable_delay):
                     raise StaleBlockchain(last_block, allowable_delay)
             return func(*args, **kwargs)
+        # the tracker only holds web3 weakly, so keep it alive for as long as the function
+        wrapper._stalecheck_web3 = web3
         return wrapper
     return decorator
 
@@ -0,0 +1,129 @@
+'''
+Wait for many transactions to be confirmed, without polling for each one.
+
+    tracker = ConfirmationTracker(TransactionMonitor(confident_depth=12))
+    futures = tracker.track_many(txids)
+    for future in futures:
+        print(future.result()['blockNumber'])
+
+The tracker watches the monitor's confident blocks, and looks up each of their transactions in
+the set of tracked ones, so the cost grows with the number of blocks, not with the number of
+tracked transactions.
+'''
+
+from collections import deque
+from concurrent.futures import Future
+import threading
+
+
+class ConfirmationTimeout(Exception):
+    'the transaction was not confirmed within the blocks it was given'
+    pass
+
+
+class ConfirmationTracker:
+    '''
+    Resolve a future for each tracked transaction, once it is in a confident block.
+
+    Each future resolves to the transaction, as the monitor's confident block watchers receive
+    it. Add callbacks with `future.add_done_callback()`, or use `asyncio.wrap_future()` to await
+    it. Confident blocks are not expected to change, so a reorganization after a future was
+    resolved does not undo it.
+    '''
+
+    def __init__(self, monitor, timeout_blocks=None):
+        '''
+        @param monitor the TransactionMonitor to watch confident blocks with
+        @param timeout_blocks after how many confident blocks to give up on a transaction,
+            like one that was dropped, with a ConfirmationTimeout, or None to wait forever
+        '''
+        self.monitor = monitor
+        self.timeout_blocks = timeout_blocks
+        # txid -> future
+        self._pending = {}
+        # (confident height when tracked, txid), oldest first
+        self._tracked_at = deque()
+        # the highest confident block seen, which the monitor's solid_height lags behind while
+        # watchers are still handling it
+        self._confirmed_height = monitor.solid_height
+        self._lock = threading.Lock()
+        monitor.watch_confident_blocks(self._confident_block)
+
+    def __len__(self):
+        'how many transactions are waiting to be confirmed'
+        return len(self._pending)
+
+    def track(self, txid, check_mined=True):
+        'the future confirmation of one transaction, see `track_many()`'
+        return self.track_many([txid], check_mined)[0]
+
+    def track_many(self, txids, check_mined=True):
+        '''
+        Start tracking transactions, and return a future confirmation of each.
+
+        A transaction tracked twice shares one future.
+
+        @param check_mined look the transactions up in one JSON-RPC batch, to resolve the ones
+            already confirmed, which the monitor will not see again
+        '''
+        futures = []
+        new_txids = []
+        with self._lock:
+            height = self._confirmed_height
+            for txid in txids:
+                txid = txid.lower()
+                future = self._pending.get(txid)
+                if future is None:
+                    future = Future()
+                    self._pending[txid] = future
+                    self._tracked_at.append((height, txid))
+                    new_txids.append(txid)
+                futures.append(future)
+        if check_mined and new_txids:
+            self._resolve_mined(new_txids)
+        return futures
+
+    def _resolve_mined(self, txids):
+        with self._lock:
+            solid_height = self._confirmed_height
+        txs = self.monitor.cache.get_transactions(txids)
+        confirmed = [
+            tx for tx in txs
+            if tx and tx['blockNumber'] is not None and tx['blockNumber'] <= solid_height
+        ]
+        self._confirm(confirmed)
+
+    def _confident_block(self, block, txs):
+        with self._lock:
+            self._confirmed_height = block['number']
+        self._confirm(txs)
+        if self.timeout_blocks is not None:
+            self._expire(block['number'] - self.timeout_blocks)
+
+    def _confirm(self, txs):
+        confirmed = []
+        with self._lock:
+            if not self._pending:
+                return
+            for tx in txs:
+                future = self._pending.pop(tx['hash'].lower(), None)
+                if future is not None:
+                    confirmed.append((future, tx))
+        # callbacks run here, so call them outside the lock, in case they track more
+        for future, tx in confirmed:
+            if not future.done():
+                future.set_result(tx)
+
+    def _expire(self, tracked_before):
+        'give up on transactions tracked below the given confident height'
+        expired = []
+        with self._lock:
+            while self._tracked_at and self._tracked_at[0][0] < tracked_before:
+                _, txid = self._tracked_at.popleft()
+                future = self._pending.pop(txid, None)
+                if future is not None:
+                    expired.append((txid, future))
+        for txid, future in expired:
+            if not future.done():
+                future.set_exception(ConfirmationTimeout(
+                    "%s was not confirmed within %d blocks" % (txid, self.timeout_blocks)))
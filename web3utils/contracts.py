@@ -1,11 +1,24 @@
 
+import time
+
 from toolz import compose
 
-from web3utils.encodings import is_empty_hex
+from web3utils import instrumentation
+from web3utils.batch import ContractBatch
+from web3utils.caching import LRUCache
+from web3utils.encodings import CONTRACT_ENCODING, encode_contract_arg, is_empty_hex  # noqa: F401
+from web3utils.events import ContractEvents
+from web3utils.pinned import BlockPin
+from web3utils.rpc import BATCH_SIZE
+from web3utils.sender import SendBatch, transaction_sender
+
+# how many ContractMethod objects each contract keeps, one per function name
+METHOD_CACHE_SIZE = 256
 
+# how many prepared web3.py functions each ContractMethod keeps, one per modifier (eg~ transact)
+PREPARED_CACHE_SIZE = 8
 
-# default is utf-8: https://github.com/ethereum/wiki/wiki/Ethereum-Contract-ABI#argument-encoding
-CONTRACT_ENCODING = 'utf-8'
+_DEFAULT_MODIFIER_KEY = ('call', frozenset())
 
 
 class EthContractSugar:
@@ -26,49 +39,162 @@ class EthContractSugar:
 
 
 class ContractSugar:
-    def __init__(self, contract):
+    '''
+    Resolved methods are cached per contract, and shared with any ContractSugar that wraps this one.
+    '''
+    __slots__ = ('_web3py_contract', '_methods', '_pin')
+
+    def __init__(self, contract, cache_size=METHOD_CACHE_SIZE, pin=None):
         if isinstance(contract, ContractSugar):
             self._web3py_contract = contract._web3py_contract
+            if pin is None or pin is contract._pin:
+                self._methods = contract._methods
+                self._pin = contract._pin
+            else:
+                self._methods = LRUCache(cache_size)
+                self._pin = pin
         else:
             self._web3py_contract = contract
+            self._methods = LRUCache(cache_size)
+            self._pin = pin
 
     def __getattr__(self, attr):
-        return ContractMethod(self._web3py_contract, attr)
+        if attr in ContractSugar.__slots__:
+            # not initialized yet, don't mistake internal attributes for contract functions
+            raise AttributeError(attr)
+        method = self._methods.get(attr)
+        if method is None:
+            method = ContractMethod(self._web3py_contract, attr, self._pin)
+            self._methods[attr] = method
+        return method
+
+    def clear_cache(self):
+        self._methods.clear()
+
+    @property
+    def events(self):
+        'the events of the contract, by name, like `contract.events.Transfer.stream(from_block)`'
+        return ContractEvents(self._web3py_contract)
+
+    def batch(self, batch_size=BATCH_SIZE, transaction=None):
+        '''
+        Collect calls, and send them as JSON-RPC batches of up to batch_size when the context exits
+
+            with contract.batch() as batch:
+                futures = [batch.balanceOf(addr) for addr in addrs]
+            balances = [future.result() for future in futures]
+
+        @param transaction the call transaction, like `contract.owner(call=transaction)`
+        '''
+        return ContractBatch(self._web3py_contract, batch_size, transaction)
+
+    def send_batch(self, transaction=None, sender=None):
+        '''
+        Collect transactions, and send them in JSON-RPC batches when the context exits,
+        with nonces counted locally and gas estimates reused. See `web3utils.sender`.
+
+            with contract.send_batch({'from': me}) as batch:
+                futures = [batch.transfer(to, amount) for to, amount in payouts]
+            txids = [future.result() for future in futures]
+
+        @param transaction like `contract.transfer(to, amount, transact=transaction)`
+        @param sender a TransactionSender, defaults to the one shared by this contract's web3
+        '''
+        if sender is None:
+            sender = transaction_sender(self._web3py_contract.web3)
+        return SendBatch(self._web3py_contract, sender, transaction)
+
+    def at_block(self, block_identifier='latest', cache=None):
+        '''
+        A copy of this contract, whose reads are all made at one block, and cached.
+
+        @param block_identifier a block number or hash, or a BlockPin to share with other contracts
+        @param cache where to keep results, defaults to the process-wide pinned.CALL_CACHE
+        '''
+        if isinstance(block_identifier, BlockPin):
+            pin = block_identifier
+        else:
+            pin = BlockPin(self._web3py_contract.web3, block_identifier, cache)
+        return ContractSugar(self, pin=pin)
 
 
 class ContractMethod:
+    __slots__ = ('__contract', '__function', '__prepared', '__pin')
 
-    def __init__(self, contract, function):
+    def __init__(self, contract, function, pin=None):
         self.__contract = contract
         self.__function = function
+        self.__prepared = LRUCache(PREPARED_CACHE_SIZE)
+        self.__pin = pin
 
     def __call__(self, *args, **kwargs):
+        if instrumentation.active:
+            instrument = instrumentation.instrumentation_of(self.__contract.web3)
+            if instrument is not None:
+                return self.__instrumented_call(instrument, *args, **kwargs)
+        if self.__pin is not None:
+            return self.__pinned_call(*args, **kwargs)
+        return self.__unpinned_call(*args, **kwargs)
+
+    def __instrumented_call(self, instrument, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            if self.__pin is not None:
+                result = self.__pinned_call(*args, **kwargs)
+            else:
+                result = self.__unpinned_call(*args, **kwargs)
+        except Exception:
+            instrument.contract_call(
+                self.__contract.address, self.__function, time.perf_counter() - start, True)
+            raise
+        instrument.contract_call(
+            self.__contract.address, self.__function, time.perf_counter() - start, False)
+        return result
+
+    def __unpinned_call(self, *args, **kwargs):
         contract_function = self.__prepared_function(**kwargs)
-        args = map(self.__tobytes, args)
+        args = [encode_contract_arg(arg, self.__function) for arg in args]
         result = contract_function(*args)
         if is_empty_hex(result):
             return None
         else:
             return result
 
+    def __pinned_call(self, *args, **kwargs):
+        if set(kwargs) - {'call'}:
+            raise ValueError("Reads pinned to a block only accept the call keyword argument")
+        args = [encode_contract_arg(arg, self.__function) for arg in args]
+        return self.__pin.call(self.__contract, self.__function, args, kwargs.get('call'))
+
     def __prepared_function(self, **kwargs):
         if not kwargs:
             modifier, modifier_dict = 'call', {}
+            cache_key = _DEFAULT_MODIFIER_KEY
         elif len(kwargs) == 1:
             modifier, modifier_dict = kwargs.popitem()
+            cache_key = _modifier_key(modifier, modifier_dict)
         else:
             raise ValueError("Only use one keyword argument at a time, eg~ transact or call")
-        contract_modifier_func = getattr(self.__contract, modifier)
-        return getattr(contract_modifier_func(modifier_dict), self.__function)
-
-    def __tobytes(self, candidate):
-        if isinstance(candidate, str):
-            try:
-                candidate = candidate.encode(CONTRACT_ENCODING)
-            except UnicodeEncodeError as unicode_exc:
-                raise TypeError("Cannot call %s with %r. Convert to bytes or a %s string first" % (
-                    (self.__prepared_function, candidate, CONTRACT_ENCODING))) from unicode_exc
-        return candidate
+        if cache_key is not None:
+            # web3.py copies the default account into the prepared transaction, as its "from"
+            cache_key += (self.__contract.web3.eth.defaultAccount, )
+            prepared = self.__prepared.get(cache_key)
+        else:
+            prepared = None
+        if prepared is None:
+            contract_modifier_func = getattr(self.__contract, modifier)
+            prepared = getattr(contract_modifier_func(modifier_dict), self.__function)
+            if cache_key is not None:
+                self.__prepared[cache_key] = prepared
+        return prepared
+
+
+def _modifier_key(modifier, modifier_dict):
+    'a hashable key for the modifier and its dict, or None if the dict has unhashable values'
+    try:
+        return modifier, frozenset(modifier_dict.items())
+    except (AttributeError, TypeError):
+        return None
 
 
 def dict_copy(func):
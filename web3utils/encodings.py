@@ -1,6 +1,9 @@
 
 from web3 import Web3
 
+# default is utf-8: https://github.com/ethereum/wiki/wiki/Ethereum-Contract-ABI#argument-encoding
+CONTRACT_ENCODING = 'utf-8'
+
 
 def emptybytes(num_bytes=32):
     return b'\0' * num_bytes
@@ -15,11 +18,87 @@ def is_empty_hex(value):
         return False
     if not value.startswith('0x'):
         return False
-    noprefix = value[2:]
-    return noprefix == '0' * len(noprefix)
+    # counting avoids building a string of zeros to compare against
+    return value.count('0', 2) == len(value) - 2
 
 
 def hex2bytes(hex_str):
     if isinstance(hex_str, str):
         return Web3.toAscii(hex_str)
     return hex_str
+
+
+def hex2bytes_many(hex_strs):
+    '''
+    hex2bytes for each of the hex strings, as a list of bytes. Like hex2bytes, the 0x prefix is
+    optional, and bytes are passed through.
+    '''
+    return [
+        bytes.fromhex(_remove_0x(hex_str)) if isinstance(hex_str, str) else hex_str
+        for hex_str in hex_strs
+    ]
+
+
+def bytes2hex_many(values):
+    'the inverse of hex2bytes_many, each value as a 0x-prefixed hex string'
+    return ['0x' + value.hex() for value in values]
+
+
+def hex2packed(hex_strs, num_bytes=32):
+    '''
+    Convert hex strings that are each num_bytes long, like hashes or addresses, to a single bytes
+    object with all of them back to back. Also takes a NumPy array of strings. Like hex2bytes,
+    the 0x prefix is optional, and bytes are taken as they are.
+
+    That is a lot faster than converting each value separately, and much more compact.
+    '''
+    hex_len = 2 * num_bytes
+    stripped = []
+    for hex_str in hex_strs:
+        if isinstance(hex_str, str):
+            digits = _remove_0x(hex_str)
+        else:
+            digits = bytes(hex_str).hex()
+        if len(digits) != hex_len:
+            raise ValueError("%r is not %d bytes long" % (hex_str, num_bytes))
+        stripped.append(digits)
+    return bytes.fromhex(''.join(stripped))
+
+
+def packed2hex(packed, num_bytes=32):
+    'the inverse of hex2packed, a list of 0x-prefixed hex strings'
+    if len(packed) % num_bytes:
+        raise ValueError("%d bytes cannot be split into %d-byte values" % (len(packed), num_bytes))
+    hexed = bytes(packed).hex()
+    width = 2 * num_bytes
+    return ['0x' + hexed[start:start + width] for start in range(0, len(hexed), width)]
+
+
+def hex2array(hex_strs, num_bytes=32):
+    '''
+    Convert hex strings that are each num_bytes long to a NumPy array of bytes, with a row per
+    value. Requires NumPy, which web3utils does not install.
+    '''
+    import numpy
+    packed = hex2packed(hex_strs, num_bytes)
+    return numpy.frombuffer(packed, dtype=numpy.uint8).reshape(-1, num_bytes)
+
+
+def array2hex(array):
+    'the inverse of hex2array, a list of 0x-prefixed hex strings'
+    return packed2hex(array.tobytes(), array.shape[-1])
+
+
+def _remove_0x(hex_str):
+    return hex_str[2:] if hex_str[:2] in ('0x', '0X') else hex_str
+
+
+def encode_contract_arg(candidate, function_name):
+    'encode strings for a contract function call, like Solidity does'
+    if isinstance(candidate, str):
+        try:
+            candidate = candidate.encode(CONTRACT_ENCODING)
+        except UnicodeEncodeError as unicode_exc:
+            raise TypeError("Cannot call %s with %r. Convert to bytes or a %s string first" % (
+                (function_name, candidate, CONTRACT_ENCODING))) from unicode_exc
+    return candidate
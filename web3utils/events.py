@@ -0,0 +1,237 @@
+'''
+Read contract events over large block ranges, without timeouts or oversized responses.
+
+    for transfer in contract.events.Transfer.stream(4000000, 'latest'):
+        print(transfer['blockNumber'], transfer['args'])
+
+The range is fetched with `eth_getLogs` in chunks of blocks. A chunk that fails, because the
+node timed out or refused to return so many logs, is split in half and retried. Chunks grow
+while they return few logs, and shrink when they return many. Several chunks are fetched at
+once, and logs are yielded in block order, with at most `workers` chunks held in memory.
+
+Fetching in parallel needs a thread-safe provider, like web3utils' default PooledHTTPProvider.
+'''
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from eth_abi import encode_single
+from eth_utils import encode_hex, event_abi_to_log_topic, is_list_like
+from web3.formatters import output_log_formatter
+from web3.utils.abi import exclude_indexed_event_inputs, get_indexed_event_inputs
+from web3.utils.events import get_event_data, is_dynamic_sized_type
+
+from web3utils.hashing import keccak
+from web3utils.rpc import parse_response, response_result
+
+# blocks in the first chunk, by default
+CHUNK_SIZE = 1000
+
+# the most blocks in a chunk, by default
+MAX_CHUNK_SIZE = 100000
+
+# chunks are resized to return about this many logs each, by default
+TARGET_LOGS = 1000
+
+# chunks to fetch at once, by default
+STREAM_WORKERS = 4
+
+
+class ContractEvents:
+    '''
+    The events of a contract, by name, like `contract.events.Transfer`
+    '''
+
+    def __init__(self, contract):
+        self._contract = contract
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        abis = [
+            abi for abi in self._contract.abi
+            if abi.get('type') == 'event' and abi.get('name') == name
+        ]
+        if not abis:
+            raise AttributeError("Contract has no event named %r" % name)
+        elif len(abis) > 1:
+            raise AttributeError("Contract has several events named %r" % name)
+        return ContractEvent(self._contract, abis[0])
+
+
+class ContractEvent:
+
+    def __init__(self, contract, event_abi):
+        self._contract = contract
+        self.abi = event_abi
+
+    def stream(self, from_block=0, to_block='latest', argument_filters=None, **kwargs):
+        '''
+        Generate the decoded events between two blocks, inclusive, in block order.
+
+        Each event is a dict like web3.py's `contract.on()` passes to its callbacks, with
+        the event arguments in 'args'.
+
+        @param from_block the first block number to read, or 'earliest'
+        @param to_block the last block number to read, or 'latest', which is resolved once,
+            when iteration starts
+        @param argument_filters a dict of argument name to a value, or list of values, to
+            match. Indexed arguments are filtered by the node, the others after decoding.
+        @param kwargs tuning for `stream_logs()`
+        '''
+        argument_filters = dict(argument_filters or {})
+        unindexed = {arg['name'] for arg in exclude_indexed_event_inputs(self.abi)}
+        data_filters = {
+            name: _as_list(value) for name, value in argument_filters.items()
+            if name in unindexed
+        }
+        filter_params = {
+            'address': self._contract.address,
+            'topics': event_topics(self.abi, argument_filters),
+        }
+
+        def decode(log):
+            event = get_event_data(self.abi, output_log_formatter(log))
+            for name, values in data_filters.items():
+                if event['args'][name] not in values:
+                    return None
+            return event
+
+        return stream_logs(
+            self._contract.web3, filter_params, from_block, to_block, decode=decode, **kwargs)
+
+
+def event_topics(event_abi, argument_filters=None):
+    '''
+    The `topics` of a log filter that matches the event, with its indexed arguments
+    filtered to the values in argument_filters
+    '''
+    argument_filters = argument_filters or {}
+    if event_abi.get('anonymous'):
+        topics = []
+    else:
+        topics = [encode_hex(event_abi_to_log_topic(event_abi))]
+    for arg in get_indexed_event_inputs(event_abi):
+        if argument_filters.get(arg['name']) is None:
+            topics.append(None)
+            continue
+        options = [
+            _encode_topic(arg['type'], value) for value in _as_list(argument_filters[arg['name']])
+        ]
+        topics.append(options[0] if len(options) == 1 else options)
+    while topics and topics[-1] is None:
+        topics.pop()
+    return topics
+
+
+def stream_logs(web3, filter_params, from_block=0, to_block='latest', decode=None,
+                chunk_size=CHUNK_SIZE, max_chunk_size=MAX_CHUNK_SIZE, target_logs=TARGET_LOGS,
+                workers=STREAM_WORKERS):
+    '''
+    Generate the logs matching filter_params between two blocks, inclusive, in block order.
+
+    @param filter_params an `eth_getLogs` filter, without fromBlock and toBlock
+    @param from_block the first block number to read, or 'earliest'
+    @param to_block the last block number to read, or 'latest'
+    @param decode called on each raw log in a worker thread, and its result is yielded instead,
+        unless it is None
+    @param chunk_size blocks in the first chunk
+    @param max_chunk_size the most blocks in a chunk
+    @param target_logs resize chunks to return about this many logs each
+    @param workers how many chunks to fetch at once
+    '''
+    reader = _LogReader(web3, filter_params, decode)
+    sizer = _ChunkSizer(chunk_size, max_chunk_size, target_logs)
+    start = 0 if from_block == 'earliest' else from_block
+    if to_block == 'latest':
+        end = web3.eth.blockNumber
+    else:
+        end = to_block
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    # (first block, last block, future) of the chunks in flight, in block order
+    pending = deque()
+    try:
+        while pending or start <= end:
+            while len(pending) < workers and start <= end:
+                last = min(start + sizer.size - 1, end)
+                pending.append((start, last, executor.submit(reader.read, start, last)))
+                start = last + 1
+            first, last, future = pending.popleft()
+            logs, largest_success = future.result()
+            sizer.update(last - first + 1, largest_success, len(logs))
+            for log in logs:
+                yield log
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+class _LogReader:
+
+    def __init__(self, web3, filter_params, decode):
+        self.web3 = web3
+        self.filter_params = filter_params
+        self.decode = decode
+
+    def read(self, first, last):
+        '''
+        @return (logs between the blocks, the most blocks that one request succeeded on)
+        '''
+        try:
+            logs = self._get_logs(first, last)
+        except Exception:
+            if first == last:
+                raise
+            middle = (first + last) // 2
+            early_logs, early_blocks = self.read(first, middle)
+            late_logs, late_blocks = self.read(middle + 1, last)
+            return early_logs + late_logs, max(early_blocks, late_blocks)
+        if self.decode is not None:
+            logs = [decoded for decoded in map(self.decode, logs) if decoded is not None]
+        return logs, last - first + 1
+
+    def _get_logs(self, first, last):
+        params = dict(self.filter_params, fromBlock=hex(first), toBlock=hex(last))
+        response = self.web3.currentProvider.make_request('eth_getLogs', [params])
+        return response_result(parse_response(response))
+
+
+class _ChunkSizer:
+    'choose the number of blocks in the next chunk, from how the last one went'
+
+    def __init__(self, size, max_size, target_logs):
+        self.size = max(1, min(size, max_size))
+        self.max_size = max_size
+        self.target_logs = target_logs
+
+    def update(self, blocks, largest_success, num_logs):
+        '''
+        @param blocks how many blocks the chunk had
+        @param largest_success how many blocks the largest successful request for it had,
+            which is less than blocks if the chunk had to be split
+        @param num_logs how many logs the chunk returned
+        '''
+        if largest_success < blocks:
+            size = largest_success
+        elif num_logs > self.target_logs:
+            size = blocks * self.target_logs // num_logs
+        elif num_logs < self.target_logs // 2 and blocks >= self.size:
+            size = self.size * 2
+        else:
+            return
+        self.size = max(1, min(size, self.max_size))
+
+
+def _as_list(value):
+    return list(value) if is_list_like(value) else [value]
+
+
+def _encode_topic(abi_type, value):
+    if is_dynamic_sized_type(abi_type):
+        # indexed strings and byte arrays are logged as their hash
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        return encode_hex(keccak(value))
+    return encode_hex(encode_single(abi_type, value))
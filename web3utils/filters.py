@@ -0,0 +1,230 @@
+
+from __future__ import print_function
+
+import itertools
+import json
+import sys
+import threading
+import traceback
+
+from web3utils.websocket import CONNECT_TIMEOUT, WebSocket
+
+# eth_subscribe subscriptions, by the `eth.filter()` params they stand in for
+SUBSCRIPTIONS = {
+    'latest': 'newHeads',
+    'pending': 'newPendingTransactions',
+}
+
+
+class HealingFilter(threading.Thread):
+    '''
+    Watch a filter like web3.py's `eth.filter(params).watch(callback)`, except that the filter is
+    recreated when polling it fails. For example, nodes forget filters that are not polled for a
+    while, and all filters when they restart: web3.py's watcher thread then dies with
+    `ValueError: filter not found`.
+
+    Changes that happened while the filter was missing are lost, so on_recreate is called after
+    each new filter is installed, to let the caller catch up.
+
+        watcher = HealingFilter(eth, 'latest', print).start()
+    '''
+
+    def __init__(self, eth, filter_params, callback, on_recreate=None,
+                 poll_interval=1, retry_interval=1):
+        '''
+        @param eth the `eth` object to create and poll the filter with
+        @param filter_params anything accepted by `eth.filter()`
+        @param callback called with each new entry in the filter
+        @param on_recreate called with no arguments, after the filter was lost and recreated
+        @param poll_interval seconds to wait between polls
+        @param retry_interval seconds to wait between attempts to recreate the filter
+        '''
+        super().__init__(daemon=True)
+        self.eth = eth
+        self.filter_params = filter_params
+        self.callback = callback
+        self.on_recreate = on_recreate
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.filter_id = None
+        self.recreated = 0
+        self._stopped = threading.Event()
+
+    def start(self):
+        'install the filter and start polling it; returns self'
+        self.filter_id = self.eth.filter(self.filter_params).filter_id
+        super().start()
+        return self
+
+    def stop_watching(self, timeout=None):
+        self._stopped.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+        try:
+            self.eth.uninstallFilter(self.filter_id)
+        except Exception:
+            # the filter might already be gone, which is fine
+            pass
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                changes = self.eth.getFilterChanges(self.filter_id)
+            except Exception:
+                print(
+                    'WARNING: lost %r filter %s, recreating it:' % (
+                        self.filter_params, self.filter_id),
+                    file=sys.stderr,
+                    )
+                traceback.print_exc()
+                self._recreate()
+                continue
+            for entry in changes or []:
+                _handle(self.callback, entry)
+            self._stopped.wait(self.poll_interval)
+
+    def _recreate(self):
+        while not self._stopped.is_set():
+            try:
+                self.filter_id = self.eth.filter(self.filter_params).filter_id
+            except Exception as exc:
+                print('WARNING: cannot recreate %r filter: %r' % (self.filter_params, exc),
+                      file=sys.stderr)
+                self._stopped.wait(self.retry_interval)
+            else:
+                self.recreated += 1
+                if self.on_recreate:
+                    _handle(self.on_recreate)
+                return
+
+
+class SubscriptionFilter(threading.Thread):
+    '''
+    Like a HealingFilter, but pushed by the node over a WebSocket with `eth_subscribe`, instead
+    of polled. Entries arrive as soon as the node has them, rather than up to a poll interval
+    later, and nothing is requested while nothing changes.
+
+    When the connection is lost, it is reopened and the subscription renewed, and on_recreate
+    is called, like after a HealingFilter recreates its filter.
+
+        watcher = SubscriptionFilter('ws://localhost:8546', 'latest', print).start()
+    '''
+
+    def __init__(self, uri, filter_params, callback, on_recreate=None,
+                 retry_interval=1, timeout=CONNECT_TIMEOUT):
+        '''
+        @param uri the node's WebSocket endpoint, like ws://localhost:8546
+        @param filter_params 'latest' for new block hashes, or 'pending' for new transaction
+            hashes, like `eth.filter()`
+        @param callback called with each new block or transaction hash
+        @param on_recreate called with no arguments, after the connection was lost and the
+            subscription renewed
+        @param retry_interval seconds to wait between attempts to reconnect
+        @param timeout seconds to wait for the node to connect and subscribe
+        '''
+        if filter_params not in SUBSCRIPTIONS:
+            raise ValueError("cannot subscribe to %r, only to %s" % (
+                filter_params, ', '.join(map(repr, SUBSCRIPTIONS))))
+        super().__init__(daemon=True)
+        self.uri = uri
+        self.filter_params = filter_params
+        self.callback = callback
+        self.on_recreate = on_recreate
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.subscription_id = None
+        self.recreated = 0
+        self._socket = None
+        self._request_ids = itertools.count(1)
+        self._stopped = threading.Event()
+
+    def start(self):
+        '''
+        connect and subscribe, then start receiving; returns self
+
+        @raise OSError or ValueError if the node cannot be reached, or does not support
+            the subscription
+        '''
+        self._subscribe()
+        super().start()
+        return self
+
+    def stop_watching(self, timeout=None):
+        self._stopped.set()
+        if self._socket is not None:
+            self._socket.close()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                message = json.loads(self._socket.recv())
+            except Exception:
+                if self._stopped.is_set():
+                    return
+                print(
+                    'WARNING: lost %r subscription %s, renewing it:' % (
+                        self.filter_params, self.subscription_id),
+                    file=sys.stderr,
+                    )
+                traceback.print_exc()
+                self._socket.close()
+                self._recreate()
+                continue
+            params = message.get('params') or {}
+            if message.get('method') == 'eth_subscription' and \
+                    params.get('subscription') == self.subscription_id:
+                _handle(self.callback, _entry(params['result']))
+
+    def _subscribe(self):
+        self._socket = WebSocket(self.uri, self.timeout)
+        try:
+            request_id = next(self._request_ids)
+            self._socket.send(json.dumps({
+                'jsonrpc': '2.0',
+                'id': request_id,
+                'method': 'eth_subscribe',
+                'params': [SUBSCRIPTIONS[self.filter_params]],
+            }))
+            while True:
+                response = json.loads(self._socket.recv())
+                if response.get('id') == request_id:
+                    break
+            if 'error' in response:
+                raise ValueError(response['error'])
+            self.subscription_id = response['result']
+        except Exception:
+            self._socket.close()
+            raise
+
+    def _recreate(self):
+        while not self._stopped.is_set():
+            try:
+                self._subscribe()
+            except Exception as exc:
+                print('WARNING: cannot renew %r subscription: %r' % (self.filter_params, exc),
+                      file=sys.stderr)
+                self._stopped.wait(self.retry_interval)
+            else:
+                if self._stopped.is_set():
+                    self._socket.close()
+                    return
+                self.recreated += 1
+                if self.on_recreate:
+                    _handle(self.on_recreate)
+                return
+
+
+def _entry(result):
+    'newHeads sends block headers, of which filters only report the hash'
+    return result['hash'] if isinstance(result, dict) else result
+
+
+def _handle(callback, *args):
+    'a failing callback should not stop the filter'
+    try:
+        callback(*args)
+    except Exception:
+        print('WARNING: filter callback %r failed:' % callback, file=sys.stderr)
+        traceback.print_exc()
@@ -0,0 +1,37 @@
+'''
+Keccak-256, which Ethereum calls sha3, computed locally instead of by a node
+
+The hash itself comes from eth_utils, which web3.py already depends on.
+'''
+
+from eth_utils import keccak as _eth_keccak
+
+
+def keccak(value):
+    'the hash of bytes, as bytes'
+    if not isinstance(value, (bytes, bytearray)):
+        # eth_utils would encode a str, which hides a missing conversion from hex
+        raise TypeError("Can only hash bytes, not %r" % type(value))
+    return _eth_keccak(value)
+
+
+def keccak_many(values, memo=None):
+    '''
+    Hash each of the values, which must be bytes
+
+    @param memo a dict-like object of previous results, such as a `caching.LRUCache`,
+        which pays off when the same values are hashed again and again
+    @return a list of hashes, as bytes
+    '''
+    if memo is None:
+        return [keccak(value) for value in values]
+    hashes = []
+    for value in values:
+        if isinstance(value, bytearray):
+            value = bytes(value)
+        digest = memo.get(value)
+        if digest is None:
+            digest = keccak(value)
+            memo[value] = digest
+        hashes.append(digest)
+    return hashes
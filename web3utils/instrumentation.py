@@ -0,0 +1,281 @@
+'''
+Count and time the requests web3utils makes, by RPC method and by contract function.
+
+    from web3utils import web3
+    from web3utils.instrumentation import instrument
+
+    metrics = instrument(web3)
+    ...
+    print(metrics.prometheus())
+
+`instrument()` wraps the provider in an InstrumentedProvider, which sees every RPC, whether it
+comes from `eth`, a contract or a TransactionMonitor. It also turns on timing of ContractMethod
+calls to contracts of that web3, which are broken down by contract address and function.
+
+Anything with the methods of Instrumentation can collect the measurements instead of Metrics,
+to forward them to another monitoring system. When nothing is instrumented, the only cost is
+a check of `instrumentation.active` per contract call.
+'''
+
+import bisect
+from collections import defaultdict
+import json
+import threading
+import time
+
+from web3utils.rpc import batch_request
+
+# seconds, like the Prometheus client's default latency buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# how many web3s are instrumented; ContractMethod only looks for its web3's instrumentation
+# when some are
+active = 0
+
+
+class Instrumentation:
+    'the hooks that measurements are reported to; the default implementation ignores them'
+
+    def rpc(self, method, seconds, error, bytes_sent, bytes_received):
+        '''
+        @param error whether the request raised an exception, or was answered with an error
+        @param bytes_sent approximately how many bytes of JSON the request was
+        @param bytes_received approximately how many bytes of JSON the response was
+        '''
+        pass
+
+    def contract_call(self, address, function, seconds, error):
+        pass
+
+
+class Histogram:
+    'counts of observations at or below each bucket bound, like a Prometheus histogram'
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last count is for observations above every bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        'pairs of (upper bound, observations at or below it), ending with infinity'
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics(Instrumentation):
+    '''
+    Keep totals in memory, to read directly or as Prometheus text with `prometheus()`.
+
+    `rpcs` maps each RPC method to a _Totals, and `contract_calls` maps each
+    (address, function) pair to one. A _Totals has `calls`, `errors`, `latency` (a Histogram),
+    and, for RPCs, `bytes_sent` and `bytes_received`.
+    '''
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.rpcs = defaultdict(self._new_totals)
+        self.contract_calls = defaultdict(self._new_totals)
+        self._lock = threading.Lock()
+
+    def rpc(self, method, seconds, error, bytes_sent, bytes_received):
+        with self._lock:
+            totals = self.rpcs[method]
+            totals.observe(seconds, error)
+            totals.bytes_sent += bytes_sent
+            totals.bytes_received += bytes_received
+
+    def contract_call(self, address, function, seconds, error):
+        with self._lock:
+            self.contract_calls[(address, function)].observe(seconds, error)
+
+    def prometheus(self, prefix='web3utils'):
+        'all metrics, in the Prometheus text exposition format'
+        with self._lock:
+            rpcs = [({'method': method}, totals) for method, totals in sorted(self.rpcs.items())]
+            contract_calls = [
+                ({'address': address, 'function': function}, totals)
+                for (address, function), totals in sorted(self.contract_calls.items())
+            ]
+            lines = []
+            _counter(lines, prefix + '_rpc_requests_total', 'JSON-RPC requests sent', rpcs,
+                     'calls')
+            _counter(lines, prefix + '_rpc_errors_total', 'JSON-RPC requests that failed', rpcs,
+                     'errors')
+            _histogram(lines, prefix + '_rpc_latency_seconds', 'JSON-RPC request latency', rpcs)
+            _counter(lines, prefix + '_rpc_sent_bytes_total', 'JSON-RPC request bytes', rpcs,
+                     'bytes_sent')
+            _counter(lines, prefix + '_rpc_received_bytes_total', 'JSON-RPC response bytes',
+                     rpcs, 'bytes_received')
+            _counter(lines, prefix + '_contract_calls_total', 'Contract function calls',
+                     contract_calls, 'calls')
+            _counter(lines, prefix + '_contract_call_errors_total', 'Contract calls that failed',
+                     contract_calls, 'errors')
+            _histogram(lines, prefix + '_contract_call_latency_seconds', 'Contract call latency',
+                       contract_calls)
+        return '\n'.join(lines) + '\n'
+
+    def _new_totals(self):
+        return _Totals(self.buckets)
+
+
+class _Totals:
+    __slots__ = ('calls', 'errors', 'latency', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, buckets):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram(buckets)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def observe(self, seconds, error):
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.latency.observe(seconds)
+
+
+def _labels(labels, **extra):
+    pairs = list(labels.items()) + list(extra.items())
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+
+
+def _counter(lines, name, help_text, series, attr):
+    lines.append('# HELP %s %s' % (name, help_text))
+    lines.append('# TYPE %s counter' % name)
+    for labels, totals in series:
+        lines.append('%s%s %s' % (name, _labels(labels), getattr(totals, attr)))
+
+
+def _histogram(lines, name, help_text, series):
+    lines.append('# HELP %s %s' % (name, help_text))
+    lines.append('# TYPE %s histogram' % name)
+    for labels, totals in series:
+        histogram = totals.latency
+        for bound, count in histogram.cumulative_counts():
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append('%s_bucket%s %d' % (name, _labels(labels, le=le), count))
+        lines.append('%s_sum%s %r' % (name, _labels(labels), histogram.sum))
+        lines.append('%s_count%s %d' % (name, _labels(labels), histogram.count))
+
+
+class InstrumentedProvider:
+    '''
+    Wrap a provider, to report every request to an Instrumentation.
+
+    Request and response sizes are measured from the JSON when the provider returns raw bytes,
+    and estimated by encoding the params and response otherwise.
+    '''
+
+    def __init__(self, provider, instrumentation):
+        self.provider = provider
+        self.instrumentation = instrumentation
+
+    def __getattr__(self, attr):
+        return getattr(self.provider, attr)
+
+    def __str__(self):
+        return "Instrumented %s" % self.provider
+
+    def isConnected(self):
+        return self.provider.isConnected()
+
+    def make_request(self, method, params):
+        start = time.perf_counter()
+        try:
+            response = self.provider.make_request(method, params)
+        except Exception:
+            self.instrumentation.rpc(
+                method, time.perf_counter() - start, True, _request_size(method, params), 0)
+            raise
+        seconds = time.perf_counter() - start
+        if isinstance(response, (bytes, bytearray, str)):
+            received = len(response)
+            error = '"error"' in response if isinstance(response, str) else b'"error"' in response
+        else:
+            received = _json_size(response)
+            error = 'error' in response
+        self.instrumentation.rpc(method, seconds, error, _request_size(method, params), received)
+        return response
+
+    def make_batch_request(self, requests):
+        '''
+        Report each request in a batch separately, with the latency of the whole batch
+        '''
+        start = time.perf_counter()
+        try:
+            responses = batch_request(self.provider, requests, len(requests) or 1)
+        except Exception:
+            seconds = time.perf_counter() - start
+            for method, params in requests:
+                self.instrumentation.rpc(method, seconds, True, _request_size(method, params), 0)
+            raise
+        seconds = time.perf_counter() - start
+        for (method, params), response in zip(requests, responses):
+            self.instrumentation.rpc(
+                method, seconds, 'error' in response,
+                _request_size(method, params), _json_size(response),
+            )
+        return responses
+
+
+def instrument(web3, instrumentation=None):
+    '''
+    Report every RPC that web3 sends, and every ContractMethod call, to instrumentation.
+
+    For web3utils' own `web3`, this detects the provider, if none was set yet.
+
+    @param instrumentation defaults to a new Metrics
+    @return the instrumentation
+    '''
+    global active
+    if instrumentation is None:
+        instrumentation = Metrics()
+    provider = web3.currentProvider
+    if isinstance(provider, InstrumentedProvider):
+        provider = provider.provider
+    else:
+        active += 1
+    web3.setProvider(InstrumentedProvider(provider, instrumentation))
+    return instrumentation
+
+
+def uninstrument(web3):
+    'undo instrument()'
+    global active
+    provider = web3.currentProvider
+    if isinstance(provider, InstrumentedProvider):
+        web3.setProvider(provider.provider)
+        active -= 1
+
+
+def instrumentation_of(web3):
+    'the instrumentation that web3 reports to, or None'
+    provider = web3.currentProvider
+    if isinstance(provider, InstrumentedProvider):
+        return provider.instrumentation
+    return None
+
+
+def _request_size(method, params):
+    # the JSON-RPC envelope around the params is about 50 bytes, plus the method name
+    return _json_size(params) + len(method) + 50
+
+
+def _json_size(value):
+    try:
+        return len(json.dumps(value))
+    except (TypeError, ValueError):
+        return 0
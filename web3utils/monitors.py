@@ -1,9 +1,19 @@
 
 from __future__ import print_function
 
+import asyncio
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import itertools
 import sys
+import threading
+import time
+import traceback
 
 from . import eth
+from .chaincache import ChainCache
+from .filters import HealingFilter, SubscriptionFilter
 
 
 class TransactionMonitor(object):
@@ -12,10 +22,42 @@ class TransactionMonitor(object):
     (ie~ don't offer unwatch option, and be super lazy about stopping filters)
     '''
 
-    def __init__(self, confident_depth=3):
+    # how many blocks to fetch at a time, when catching up on skipped or confident blocks
+    BACKFILL_CHUNK = 64
+
+    def __init__(self, confident_depth=3, cache=None, history_size=256, backfill_workers=8,
+                 poll_interval=1, max_phantoms=1000, phantom_ttl=25, store=None,
+                 block_fields=None, tx_fields=None, dispatch_workers=None, queue_size=100,
+                 ws_uri=None):
         '''
         @param confident_depth the number of blocks deep before a transaction
             is considered to be mined confidently for your application
+        @param cache a ChainCache to share with other code, defaults to a new one,
+            which reads from the store
+        @param history_size how many recent block hashes to remember, which bounds how deep
+            a reorganization can be detected
+        @param backfill_workers how many blocks to fetch concurrently when catching up
+        @param poll_interval seconds to wait between polls of each filter
+        @param max_phantoms the most pending transactions to keep looking for, when the node
+            announced them but could not return them yet
+        @param phantom_ttl how many new blocks to keep looking for each of those transactions
+        @param store a `web3utils.blockstore.BlockStore` to save confident blocks in, and resume
+            from after a restart
+        @param block_fields the block fields that watchers need, like ('number', 'timestamp'),
+            to get compact records of those fields instead of web3.py blocks, which saves memory
+            and garbage collection time. Only applies to the default cache.
+        @param tx_fields the transaction fields that watchers need, like ('from', 'to', 'value'),
+            to get compact records of those instead of web3.py transactions
+        @param dispatch_workers how many threads to call watchers from, or None to call them
+            one after the other, from the threads that poll the node. With threads, each watcher
+            receives its events in order, from its own queue, so a slow watcher does not delay
+            the others until its queue is full. Use `join()` to wait for the queues to empty.
+            A reorganization waits for all block watchers' queues, so that block, confident
+            block and reorganization events stay in order across watchers.
+        @param queue_size the most events to queue up for each watcher, with dispatch_workers
+        @param ws_uri the node's WebSocket endpoint, like ws://localhost:8546, to be told about
+            new blocks and pending transactions with `eth_subscribe` as soon as the node has
+            them, instead of polling filters. Falls back to polling if subscribing fails.
         '''
         # variables use "solid" as a shorter way to describe confidence
         self.solid_depth = confident_depth
@@ -24,8 +66,45 @@ class TransactionMonitor(object):
         self.solid_watchers = []
         self.block_watchers = []
         self.pending_tx_watchers = []
-        self.phantom_txids = set()
+        self.reorg_watchers = []
+        self.phantom_txids = PhantomTracker(max_phantoms, phantom_ttl)
         self.last_block_num = None
+        self.history = BlockHistory(history_size)
+        self.poll_interval = poll_interval
+        self.ws_uri = ws_uri
+        if cache is None:
+            cache = ChainCache(
+                eth, immutable_depth=confident_depth, store=store,
+                block_fields=block_fields, tx_fields=tx_fields,
+            )
+        self.cache = cache
+        self.store = store
+        self._backfill_pool = ThreadPoolExecutor(max_workers=backfill_workers)
+        self.queue_size = queue_size
+        if dispatch_workers:
+            self._dispatch_pool = ThreadPoolExecutor(max_workers=dispatch_workers)
+        else:
+            self._dispatch_pool = None
+        self._filters = []
+        # new blocks that arrive while skipped blocks are backfilled, to deliver after them
+        self._held_blocks = []
+        self._backfilling = False
+        self._backfill_done = threading.Condition()
+        if store is not None:
+            self._resume()
+
+    def _resume(self):
+        '''
+        Internal: continue after the highest stored confident block. Blocks mined since then
+        are backfilled when the next block arrives.
+        '''
+        solid_block = self.store.latest_block()
+        if solid_block is None:
+            return
+        self.solid_height = solid_block['number']
+        self.solid_block_id = solid_block['hash']
+        self.last_block_num = solid_block['number']
+        self.history.record(solid_block)
 
     def watch_confident_blocks(self, callback):
         '''
@@ -33,7 +112,7 @@ class TransactionMonitor(object):
         * the block object now considered confident
         * a list of transaction objects in that block
         '''
-        self.solid_watchers.append(callback)
+        self.solid_watchers.append(self._dispatched(callback))
         self._start_watching_blocks()
 
     def watch_blocks(self, callback):
@@ -45,7 +124,7 @@ class TransactionMonitor(object):
 
         This is equivalent to `eth.filter('latest')`
         '''
-        self.block_watchers.append(callback)
+        self.block_watchers.append(self._dispatched(callback))
         self._start_watching_blocks()
 
     def watch_pending_transactions(self, callback):
@@ -54,57 +133,328 @@ class TransactionMonitor(object):
 
         This is equivalent to `eth.filter('pending')`
         '''
-        self.pending_tx_watchers.append(callback)
+        self.pending_tx_watchers.append(self._dispatched(callback))
         if len(self.pending_tx_watchers) == 1:
-            eth.filter('pending').watch(self._new_pending_tx)
+            self._watch_filter('pending', self._new_pending_tx)
+
+    def watch_reorgs(self, callback):
+        '''
+        Callback will receive two arguments, when blocks already sent to watchers are replaced:
+        * the lowest block number that was replaced
+        * a list of the replaced block hashes, from lowest to highest block number
+
+        If any of the replaced blocks were already sent to confident block watchers, undo what
+        was done with them. Confident block watchers will then receive the replacement blocks.
+        Blocks sent before the reorganization are handled before this callback is called, and
+        replacement blocks are sent only after it returns, even with dispatch_workers.
+        '''
+        self.reorg_watchers.append(self._dispatched(callback))
+        self._start_watching_blocks()
+
+    def join(self, timeout=None):
+        '''
+        Wait until skipped blocks were backfilled, and with dispatch_workers, until every
+        watcher has handled all of its queued events.
+
+        @return False if the timeout ran out first, otherwise True
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._backfill_done:
+            if not self._backfill_done.wait_for(lambda: not self._backfilling, timeout):
+                return False
+        for watcher in self._all_watchers():
+            if isinstance(watcher, _DispatchedWatcher):
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                if not watcher.join(remaining):
+                    return False
+        return True
+
+    def dispatch_stats(self):
+        '''
+        With dispatch_workers, the queue of each watcher, as a list of (callback, stats) pairs.
+
+        stats is a dict of:
+        * 'queued': how many events are waiting now
+        * 'lag': how many seconds the latest event waited in the queue
+        * 'max_lag': the longest any event waited
+        * 'handled' and 'failed': how many events the callback handled, and how many of those
+          raised an exception
+        '''
+        return [
+            (watcher.callback, watcher.stats())
+            for watcher in self._all_watchers() if isinstance(watcher, _DispatchedWatcher)
+        ]
+
+    def _dispatched(self, callback):
+        if self._dispatch_pool is None:
+            return callback
+        return _DispatchedWatcher(callback, self._dispatch_pool, self.queue_size)
+
+    def _all_watchers(self):
+        return self.solid_watchers + self.block_watchers + self.pending_tx_watchers + \
+            self.reorg_watchers
 
     def _start_watching_blocks(self):
         '''
         Internal: call immediately after registering a block watcher
         If the new watcher is the first, then start watching web3 remotely
         '''
-        if sum(map(len, (self.solid_watchers, self.block_watchers))) == 1:
-            eth.filter('latest').watch(self._new_block)
+        if self._num_block_watchers() == 1:
+            self._watch_filter('latest', self._new_block, on_recreate=self._catch_up)
+
+    def stop(self):
+        'stop polling filters or subscriptions, which is only needed if the process keeps running'
+        filters, self._filters = self._filters, []
+        for healing_filter in filters:
+            healing_filter.stop_watching()
+
+    def _watch_filter(self, filter_params, callback, on_recreate=None):
+        if self.ws_uri is not None:
+            try:
+                self._filters.append(SubscriptionFilter(
+                    self.ws_uri, filter_params, callback, on_recreate=on_recreate,
+                    retry_interval=self.poll_interval,
+                    ).start())
+                return
+            except Exception as exc:
+                print('WARNING: cannot subscribe to %r at %s, polling instead: %r' % (
+                    filter_params, self.ws_uri, exc), file=sys.stderr)
+        self._filters.append(HealingFilter(
+            eth, filter_params, callback, on_recreate=on_recreate,
+            poll_interval=self.poll_interval,
+            ).start())
+
+    def _catch_up(self):
+        '''
+        Internal: after the block filter was lost, deliver the blocks it missed, by treating
+        the latest block as new. The skipped range is backfilled in the background.
+        '''
+        if self.last_block_num is None:
+            return
+        latest = self._get_block('latest')
+        if latest and latest['number'] > self.last_block_num:
+            self._new_block(latest['hash'])
+
+    def _num_block_watchers(self):
+        return sum(map(len, (self.solid_watchers, self.block_watchers, self.reorg_watchers)))
 
     def _new_pending_tx(self, txid):
-        tx = eth.getTransaction(txid)
+        tx = self.cache.get_transaction(txid)
         if not tx:
             self.phantom_txids.add(txid)
             return
+        self._notify_pending_tx(tx)
+
+    def _notify_pending_tx(self, tx):
         for watcher in self.pending_tx_watchers:
             watcher(tx)
 
+    def _get_block(self, blockid):
+        return self._get_block_entry(blockid)[0]
+
+    def _get_block_entry(self, blockid):
+        '@return (block, transactions), or (block, None) when confident blocks are not needed'
+        if self.solid_watchers or self.store is not None:
+            # fetch transactions now, so the block is cached by the time it is confident
+            return self.cache.get_block_with_txs(blockid)
+        else:
+            return self.cache.get_block(blockid), None
+
     def _new_block(self, blockid):
-        block = eth.getBlock(blockid)
+        '''
+        Deliver a new block, and the parents it replaced. If blocks were skipped since the last
+        one, they are backfilled in another thread, so that this one keeps fetching new blocks,
+        which are held until the skipped ones were delivered before them.
+        '''
+        block = self._get_block(blockid)
         if not block:
             print('WARNING: cannot find block ' + blockid, file=sys.stderr)
             return
-        if self.last_block_num and block['number'] > self.last_block_num + 1:
-            print('WARNING: skipped blocks from %d to %d' % (self.last_block_num, block['number']),
-                  file=sys.stderr)
-        for watcher in self.block_watchers:
-            watcher(block)
+        with self._backfill_done:
+            if self._backfilling:
+                self._held_blocks.append(block)
+                return
+            new_chain, skipped = self._follow(block)
+            if skipped:
+                self._backfilling = True
+                self._held_blocks.append(block)
+                threading.Thread(target=self._run_backfill, args=(skipped, ), daemon=True).start()
+                return
+        self._deliver_new(block, new_chain)
+
+    def _follow(self, block):
+        '''
+        Walk back from the block to the blocks it replaced, and report the reorganization if any.
+
+        @return (the new chain up to the block, the range of block numbers skipped before it)
+        '''
+        new_chain = [block]
+        while self.history.is_missing_parent(new_chain[0]):
+            parent = self._get_block(new_chain[0]['parentHash'])
+            if not parent:
+                break
+            new_chain.insert(0, parent)
+        reorg = self.history.find_reorg(new_chain)
+        if reorg:
+            self._reorganized(*reorg)
+        first_new_num = new_chain[0]['number']
+        if self.last_block_num and first_new_num > self.last_block_num + 1:
+            return new_chain, range(self.last_block_num + 1, first_new_num)
+        return new_chain, None
+
+    def _deliver_new(self, block, new_chain, fetched=None):
+        self._deliver_blocks(new_chain)
         self._recover_phantom_txs()
-        self._solid_monitor(block['number'])
+        self._solid_monitor(block['number'], fetched)
         self.last_block_num = block['number']
 
-    def _solid_monitor(self, latest_block_num):
+    def _run_backfill(self, block_nums):
+        'backfill the skipped blocks, then deliver the blocks held meanwhile, until none are left'
+        try:
+            fetched = self._backfill(block_nums)
+            while True:
+                with self._backfill_done:
+                    held, self._held_blocks = self._held_blocks, []
+                    if not held:
+                        self._backfilling = False
+                        self._backfill_done.notify_all()
+                        return
+                for block in held:
+                    new_chain, skipped = self._follow(block)
+                    if skipped:
+                        # the backfill stopped at a missing block, try once more
+                        fetched = self._backfill(skipped)
+                    self._deliver_new(block, new_chain, fetched)
+                    fetched = None
+        except Exception:
+            # the next new block finds the blocks that are still missing, and backfills them
+            print('WARNING: failed to backfill blocks %d to %d:' % (
+                block_nums[0], block_nums[-1]), file=sys.stderr)
+            traceback.print_exc()
+            with self._backfill_done:
+                self._held_blocks = []
+                self._backfilling = False
+                self._backfill_done.notify_all()
+
+    def _deliver_blocks(self, blocks):
+        for new_block in blocks:
+            self.history.record(new_block)
+            for watcher in self.block_watchers:
+                watcher(new_block)
+
+    def _backfill(self, block_nums):
+        '''
+        Deliver skipped blocks to watchers in order, fetching BACKFILL_CHUNK of them at a time,
+        concurrently. Each chunk is delivered, and the blocks it made confident are confirmed,
+        before the next one is fetched, so only about two chunks are held in memory, and each
+        block is fetched once. New blocks are held until the whole range was delivered.
+
+        @return the blocks fetched in the last two chunks, as {number: (block, transactions)},
+            up to the first one that is missing
+        '''
+        recent = {}
+        for chunk in _chunks(block_nums, self.BACKFILL_CHUNK):
+            if len(chunk) == 1:
+                entries = [self._get_block_entry(chunk[0])]
+            else:
+                entries = list(self._backfill_pool.map(self._get_block_entry, chunk))
+            found = _until_missing(entries, chunk[0], block_nums[-1])
+            recent = _recent_entries(recent, found, chunk[0] - self.BACKFILL_CHUNK)
+            if found:
+                self._deliver_blocks(block for block, _ in found)
+                self._solid_monitor(found[-1][0]['number'], recent)
+                self.last_block_num = found[-1][0]['number']
+            if len(found) < len(chunk):
+                break
+        return recent
+
+    def _fetch_in_order(self, fetch, block_ids):
+        'lazily fetch blocks, BACKFILL_CHUNK at a time, yielding them in order'
+        for chunk in _chunks(block_ids, self.BACKFILL_CHUNK):
+            if len(chunk) == 1:
+                yield fetch(chunk[0])
+            else:
+                yield from self._backfill_pool.map(fetch, chunk)
+
+    def _reorganized(self, fork_num, replaced_hashes):
+        # watchers have queues of their own with dispatch_workers, so wait on them in between
+        self._drain(self._block_event_watchers())
+        for watcher in self.reorg_watchers:
+            watcher(fork_num, replaced_hashes)
+        self._drain(self.reorg_watchers)
+        self._rollback_solid(fork_num)
+
+    def _block_event_watchers(self):
+        return self.solid_watchers + self.block_watchers + self.reorg_watchers
+
+    def _drain(self, watchers):
+        'wait until the dispatched watchers have handled all of their queued events'
+        for watcher in watchers:
+            if isinstance(watcher, _DispatchedWatcher):
+                watcher.join()
+
+    def _rollback_solid(self, fork_num):
+        'after a reorganization, make sure confident watchers hear about the replacement blocks'
+        if self.solid_height and fork_num <= self.solid_height:
+            self.solid_height = fork_num - 1
+            self.solid_block_id = self.history.get(self.solid_height)
+            if self.store is not None:
+                self.store.rollback(fork_num)
+
+    def _solid_monitor(self, latest_block_num, fetched=None):
+        '''
+        @param fetched blocks already fetched with their transactions, as
+            {number: (block, transactions)}, to confirm without fetching them again
+        '''
         solid_block_num = latest_block_num - self.solid_depth
-        new_solid_block = eth.getBlock(solid_block_num)
         if self.solid_height and solid_block_num <= self.solid_height:
-            self._detect_reorg(new_solid_block)
-            return
-        solid_txs = []
-        for txid in new_solid_block['transactions']:
-            tx = eth.getTransaction(txid)
-            assert tx is not None, "Confident tx %s was None in block %d" % (txid, solid_block_num)
-            solid_txs.append(tx)
-        for watcher in self.solid_watchers:
-            watcher(new_solid_block, solid_txs)
-        self.solid_height = solid_block_num
-        self.solid_block_id = new_solid_block['hash']
+            reorg = self._detect_reorg(self._block_at(solid_block_num))
+            if not reorg:
+                return
+            self._reorganized(*reorg)
+        if self.solid_height:
+            first_solid_num = self.solid_height + 1
+        else:
+            first_solid_num = solid_block_num
+        new_solid_nums = range(first_solid_num, solid_block_num + 1)
+        for new_solid_block, solid_txs in self._fetch_in_order(
+                functools.partial(self._get_solid_entry, fetched or {}), new_solid_nums):
+            if not new_solid_block:
+                break
+            for watcher in self.solid_watchers:
+                watcher(new_solid_block, solid_txs)
+            if self.store is not None:
+                self.store.add(new_solid_block, solid_txs)
+            self.solid_height = new_solid_block['number']
+            self.solid_block_id = new_solid_block['hash']
+
+    def _block_at(self, block_num):
+        '''
+        The block at the number, without its transactions, to check for reorganizations: from
+        the cache, by the hash in the block history, which is updated with every new block and
+        the parents walked back to. Only blocks the history does not know are asked of the node,
+        and not of the cache, whose store would answer with the confident block being checked.
+        '''
+        block_hash = self.history.get(block_num)
+        if block_hash is not None:
+            block = self.cache.get_block(block_hash)
+            if block:
+                return block
+        return eth.getBlock(block_num)
+
+    def _get_solid_entry(self, fetched, block_num):
+        entry = fetched.get(block_num)
+        if entry is None or entry[1] is None:
+            return self.cache.get_block_with_txs(block_num)
+        return entry
 
     def _detect_reorg(self, new_solid_block):
+        '''
+        Check whether the most recent confident block was replaced, as a fallback for
+        reorganizations that the block history missed.
+
+        @return (fork number, replaced hashes) if the confident block changed, otherwise None
+        '''
         if new_solid_block['number'] == self.solid_height and \
                 new_solid_block['hash'] != self.solid_block_id:
             print(
@@ -116,15 +466,525 @@ class TransactionMonitor(object):
                 self.solid_block_id,
                 'to hash',
                 new_solid_block['hash'],
-                '. Ignoring...',
+                '. Rolling back...',
                 file=sys.stderr
                 )
+            replaced = self.history.forget_from(self.solid_height)
+            return self.solid_height, replaced or [self.solid_block_id]
+        return None
 
     def _recover_phantom_txs(self):
-        phantom_copy = list(self.phantom_txids)
-        for txid in phantom_copy:
-            self.phantom_txids.remove(txid)
-            tx = eth.getTransaction(txid)
+        'look for all phantom transactions in one batch, and notify watchers of the ones found'
+        txids = list(self.phantom_txids)
+        if txids:
+            for tx in self._recovered(self.cache.get_transactions(txids)):
+                self._notify_pending_tx(tx)
+        self.phantom_txids.age()
+
+    def _recovered(self, txs):
+        'forget phantom transactions that were found, and return those not yet confident'
+        unconfirmed = []
+        for tx in txs:
             if tx:
-                if tx.blockNumber is None or tx.blockNumber > self.solid_height:
-                    self._new_pending_tx(txid)
+                self.phantom_txids.recovered(tx['hash'])
+                if tx['blockNumber'] is None or tx['blockNumber'] > self.solid_height:
+                    unconfirmed.append(tx)
+        return unconfirmed
+
+
+class BlockHistory(object):
+    '''
+    The hashes of the most recently seen blocks, by number, to detect reorganizations
+    '''
+
+    def __init__(self, size=256):
+        self.size = size
+        self._hashes = {}
+        self._highest = None
+
+    def get(self, block_num):
+        return self._hashes.get(block_num)
+
+    def record(self, block):
+        block_num = block['number']
+        self._hashes[block_num] = block['hash']
+        if self._highest is None or block_num > self._highest:
+            self._highest = block_num
+        for stale_num in [num for num in self._hashes if num <= self._highest - self.size]:
+            del self._hashes[stale_num]
+
+    def is_missing_parent(self, block):
+        'whether the block builds on a different parent than the one recorded at its height'
+        parent_hash = block.get('parentHash')
+        recorded = self.get(block['number'] - 1)
+        return None not in (parent_hash, recorded) and parent_hash != recorded
+
+    def find_reorg(self, new_chain):
+        '''
+        Compare a sequence of consecutive blocks to the recorded history, and forget any
+        recorded blocks they replace.
+
+        @return (fork number, replaced hashes), or None if no recorded block was replaced
+        '''
+        for block in new_chain:
+            recorded = self.get(block['number'])
+            if recorded is not None and recorded != block['hash']:
+                return block['number'], self.forget_from(block['number'])
+        return None
+
+    def forget_from(self, block_num):
+        'forget all blocks at or above block_num, and return their hashes in order'
+        replaced_nums = sorted(num for num in self._hashes if num >= block_num)
+        replaced = [self._hashes.pop(num) for num in replaced_nums]
+        if self._hashes:
+            self._highest = max(self._hashes)
+        else:
+            self._highest = None
+        return replaced
+
+
+class PhantomTracker(object):
+    '''
+    The ids of pending transactions that the node announced, but could not return yet.
+
+    Each id is kept for up to `ttl` calls to age(), which the monitor makes once per new block.
+    If more than `max_size` are tracked, the oldest are dropped. Counts of ids 'added',
+    'recovered', 'expired' (by ttl) and 'evicted' (by max_size) are kept in `stats`.
+
+    Safe to use from the pending transaction and the block threads at once.
+    '''
+
+    def __init__(self, max_size=1000, ttl=25):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = Counter()
+        self._age = 0
+        # txid -> age at which it expires, oldest first
+        self._expiries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._expiries)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._expiries))
+
+    def __contains__(self, txid):
+        return txid in self._expiries
+
+    def add(self, txid):
+        with self._lock:
+            if txid in self._expiries:
+                return
+            self._expiries[txid] = self._age + self.ttl
+            self.stats['added'] += 1
+            while len(self._expiries) > self.max_size:
+                self._expiries.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def recovered(self, txid):
+        with self._lock:
+            if self._expiries.pop(txid, None) is not None:
+                self.stats['recovered'] += 1
+
+    def age(self):
+        'expire the ids that have been tracked for ttl calls'
+        with self._lock:
+            self._age += 1
+            while self._expiries:
+                txid, expiry = next(iter(self._expiries.items()))
+                if expiry > self._age:
+                    break
+                del self._expiries[txid]
+                self.stats['expired'] += 1
+
+
+class _DispatchedWatcher(object):
+    '''
+    A watcher callback, called from an executor with its events in order, one at a time.
+
+    Calling this queues an event, and blocks while queue_size events are already waiting.
+    Each event is handled in its own task, so watchers take turns on the executor's threads.
+    '''
+
+    def __init__(self, callback, executor, queue_size):
+        self.callback = callback
+        self.queue_size = queue_size
+        self.handled = 0
+        self.failed = 0
+        self.lag = 0
+        self.max_lag = 0
+        self._executor = executor
+        # (time queued, args) of each waiting event
+        self._queue = deque()
+        self._scheduled = False
+        self._changed = threading.Condition()
+
+    def __call__(self, *args):
+        with self._changed:
+            while len(self._queue) >= self.queue_size:
+                self._changed.wait()
+            self._queue.append((time.monotonic(), args))
+            if not self._scheduled:
+                self._scheduled = True
+                self._executor.submit(self._handle_next)
+
+    def join(self, timeout=None):
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._scheduled, timeout)
+
+    def stats(self):
+        return {
+            'queued': len(self._queue),
+            'lag': self.lag,
+            'max_lag': self.max_lag,
+            'handled': self.handled,
+            'failed': self.failed,
+        }
+
+    def _handle_next(self):
+        with self._changed:
+            queued_at, args = self._queue.popleft()
+            self._changed.notify_all()
+        self.lag = time.monotonic() - queued_at
+        self.max_lag = max(self.max_lag, self.lag)
+        try:
+            self.callback(*args)
+        except Exception:
+            self.failed += 1
+            print('WARNING: watcher %r failed:' % self.callback, file=sys.stderr)
+            traceback.print_exc()
+        self.handled += 1
+        with self._changed:
+            if self._queue:
+                self._executor.submit(self._handle_next)
+            else:
+                self._scheduled = False
+                self._changed.notify_all()
+
+
+def _until_missing(entries, first_num, last_num):
+    'the (block, transactions) entries up to the first missing block, with a warning if any is'
+    for index, (block, _) in enumerate(entries):
+        if not block:
+            print('WARNING: could not backfill blocks from %d to %d' % (
+                first_num + index, last_num), file=sys.stderr)
+            return entries[:index]
+    return entries
+
+
+def _recent_entries(recent, found, lowest_num):
+    'the entries in recent from lowest_num up, and the found ones, by block number'
+    entries = {number: entry for number, entry in recent.items() if number >= lowest_num}
+    entries.update((block['number'], (block, txs)) for block, txs in found)
+    return entries
+
+
+def _chunks(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class AsyncTransactionMonitor(TransactionMonitor):
+    '''
+    A TransactionMonitor for asyncio, with the same watch_* methods and callback arguments.
+
+    Filters are polled from the event loop, and every RPC runs in an executor, so independent
+    requests (like several new blocks) are made concurrently.
+    Callbacks may be plain functions or coroutine functions.
+
+    Each watcher consumes events in order from its own queue of up to queue_size events. A slow
+    watcher does not delay the others, until its queue fills up: then polling waits for it.
+
+    Polling starts when the first watcher is registered, so do that with the event loop running,
+    or run it afterwards. Stop polling with `await monitor.stop()`.
+    '''
+
+    def __init__(self, confident_depth=3, cache=None, poll_interval=1, queue_size=100,
+                 executor=None, store=None, block_fields=None, tx_fields=None):
+        '''
+        @param queue_size the most events to queue up for each watcher
+        @param executor where to run RPCs, defaults to the event loop's default executor
+        @param store, block_fields, tx_fields like for TransactionMonitor
+        '''
+        super().__init__(
+            confident_depth, cache, poll_interval=poll_interval, store=store,
+            block_fields=block_fields, tx_fields=tx_fields,
+        )
+        self.queue_size = queue_size
+        self._executor = executor
+        self._tasks = []
+        self._backfill_task = None
+
+    def watch_confident_blocks(self, callback):
+        self.solid_watchers.append(self._start_watcher(callback))
+        self._start_watching_blocks()
+
+    def watch_blocks(self, callback):
+        self.block_watchers.append(self._start_watcher(callback))
+        self._start_watching_blocks()
+
+    def watch_pending_transactions(self, callback):
+        self.pending_tx_watchers.append(self._start_watcher(callback))
+        if len(self.pending_tx_watchers) == 1:
+            self._start_task(self._poll('pending', self._new_pending_txs))
+
+    def watch_reorgs(self, callback):
+        self.reorg_watchers.append(self._start_watcher(callback))
+        self._start_watching_blocks()
+
+    watch_confident_blocks.__doc__ = TransactionMonitor.watch_confident_blocks.__doc__
+    watch_blocks.__doc__ = TransactionMonitor.watch_blocks.__doc__
+    watch_pending_transactions.__doc__ = TransactionMonitor.watch_pending_transactions.__doc__
+    watch_reorgs.__doc__ = TransactionMonitor.watch_reorgs.__doc__
+
+    async def stop(self):
+        'stop polling, and drop any events still queued for watchers'
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def join(self):
+        'wait until skipped blocks were backfilled, and every watcher handled its queued events'
+        while self._backfilling:
+            await asyncio.wait([self._backfill_task])
+        await asyncio.gather(*(watcher.queue.join() for watcher in self._all_watchers()))
+
+    def _start_watching_blocks(self):
+        if self._num_block_watchers() == 1:
+            self._start_task(self._poll('latest', self._new_blocks, self._catch_up))
+
+    def _start_watcher(self, callback):
+        watcher = _AsyncWatcher(callback, self.queue_size)
+        self._start_task(watcher.run())
+        return watcher
+
+    def _start_task(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.append(task)
+        return task
+
+    async def _rpc(self, func, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _poll(self, filter_params, handle_changes, on_recreate=None):
+        '''
+        Poll a filter forever, like HealingFilter: if polling fails, recreate the filter
+        and then call on_recreate() to catch up on anything missed.
+        '''
+        filter_id = (await self._rpc(eth.filter, filter_params)).filter_id
+        while True:
+            try:
+                changes = await self._rpc(eth.getFilterChanges, filter_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                print('WARNING: lost %r filter %s, recreating it:' % (filter_params, filter_id),
+                      file=sys.stderr)
+                traceback.print_exc()
+                filter_id = await self._recreate_filter(filter_params)
+                changes = None
+                if on_recreate:
+                    await self._handle_safely(on_recreate)
+            if changes:
+                await self._handle_safely(handle_changes, changes)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _recreate_filter(self, filter_params):
+        while True:
+            try:
+                return (await self._rpc(eth.filter, filter_params)).filter_id
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print('WARNING: cannot recreate %r filter: %r' % (filter_params, exc),
+                      file=sys.stderr)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _handle_safely(self, handler, *args):
+        try:
+            await handler(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            print('WARNING: failed to handle changes with %r:' % handler, file=sys.stderr)
+            traceback.print_exc()
+
+    async def _dispatch(self, watchers, *args):
+        for watcher in watchers:
+            await watcher.queue.put(args)
+
+    async def _new_pending_txs(self, txids):
+        txs = await asyncio.gather(*(self._rpc(self.cache.get_transaction, txid) for txid in txids))
+        for txid, tx in zip(txids, txs):
+            if tx:
+                await self._notify_pending_tx(tx)
+            else:
+                self.phantom_txids.add(txid)
+
+    async def _notify_pending_tx(self, tx):
+        await self._dispatch(self.pending_tx_watchers, tx)
+
+    async def _new_blocks(self, blockids):
+        fetched = await self._fetch_all(self._get_block, blockids)
+        for blockid, block in zip(blockids, fetched):
+            await self._new_block(blockid, block)
+
+    async def _new_block(self, blockid, block):
+        'like TransactionMonitor._new_block, with the backfill in a task of its own'
+        if not block:
+            print('WARNING: cannot find block ' + blockid, file=sys.stderr)
+            return
+        if self._backfilling:
+            self._held_blocks.append(block)
+            return
+        new_chain, skipped = await self._follow(block)
+        if skipped:
+            self._backfilling = True
+            self._held_blocks.append(block)
+            self._backfill_task = self._start_task(self._run_backfill(skipped))
+            return
+        await self._deliver_new(block, new_chain)
+
+    async def _follow(self, block):
+        new_chain = [block]
+        while self.history.is_missing_parent(new_chain[0]):
+            parent = await self._rpc(self._get_block, new_chain[0]['parentHash'])
+            if not parent:
+                break
+            new_chain.insert(0, parent)
+        reorg = self.history.find_reorg(new_chain)
+        if reorg:
+            await self._reorganized(*reorg)
+        first_new_num = new_chain[0]['number']
+        if self.last_block_num and first_new_num > self.last_block_num + 1:
+            return new_chain, range(self.last_block_num + 1, first_new_num)
+        return new_chain, None
+
+    async def _deliver_new(self, block, new_chain, fetched=None):
+        await self._deliver_blocks(new_chain)
+        await self._recover_phantom_txs()
+        await self._solid_monitor(block['number'], fetched)
+        self.last_block_num = block['number']
+
+    async def _run_backfill(self, block_nums):
+        try:
+            fetched = await self._backfill(block_nums)
+            while self._held_blocks:
+                held, self._held_blocks = self._held_blocks, []
+                for block in held:
+                    new_chain, skipped = await self._follow(block)
+                    if skipped:
+                        fetched = await self._backfill(skipped)
+                    await self._deliver_new(block, new_chain, fetched)
+                    fetched = None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            print('WARNING: failed to backfill blocks %d to %d:' % (
+                block_nums[0], block_nums[-1]), file=sys.stderr)
+            traceback.print_exc()
+            self._held_blocks = []
+        finally:
+            self._backfilling = False
+
+    async def _deliver_blocks(self, blocks):
+        for new_block in blocks:
+            self.history.record(new_block)
+            await self._dispatch(self.block_watchers, new_block)
+
+    async def _catch_up(self):
+        if self.last_block_num is None:
+            return
+        latest = await self._rpc(self._get_block, 'latest')
+        if latest and latest['number'] > self.last_block_num:
+            await self._new_block(latest['hash'], latest)
+
+    async def _backfill(self, block_nums):
+        'like TransactionMonitor._backfill'
+        recent = {}
+        for chunk in _chunks(block_nums, self.BACKFILL_CHUNK):
+            entries = await self._fetch_all(self._get_block_entry, chunk)
+            found = _until_missing(entries, chunk[0], block_nums[-1])
+            recent = _recent_entries(recent, found, chunk[0] - self.BACKFILL_CHUNK)
+            if found:
+                await self._deliver_blocks(block for block, _ in found)
+                await self._solid_monitor(found[-1][0]['number'], recent)
+                self.last_block_num = found[-1][0]['number']
+            if len(found) < len(chunk):
+                break
+        return recent
+
+    async def _fetch_all(self, fetch, block_ids):
+        return await asyncio.gather(*(self._rpc(fetch, block_id) for block_id in block_ids))
+
+    async def _reorganized(self, fork_num, replaced_hashes):
+        # like TransactionMonitor._reorganized, keep events in order across watchers' queues
+        await self._drain(self._block_event_watchers())
+        await self._dispatch(self.reorg_watchers, fork_num, replaced_hashes)
+        await self._drain(self.reorg_watchers)
+        self._rollback_solid(fork_num)
+
+    async def _drain(self, watchers):
+        await asyncio.gather(*(watcher.queue.join() for watcher in watchers))
+
+    async def _solid_monitor(self, latest_block_num, fetched=None):
+        solid_block_num = latest_block_num - self.solid_depth
+        if self.solid_height and solid_block_num <= self.solid_height:
+            reorg = self._detect_reorg(await self._rpc(self._block_at, solid_block_num))
+            if not reorg:
+                return
+            await self._reorganized(*reorg)
+        if self.solid_height:
+            first_solid_num = self.solid_height + 1
+        else:
+            first_solid_num = solid_block_num
+        new_solid_nums = range(first_solid_num, solid_block_num + 1)
+        for chunk in _chunks(new_solid_nums, self.BACKFILL_CHUNK):
+            for new_solid_block, solid_txs in await self._fetch_all(
+                    functools.partial(self._get_solid_entry, fetched or {}), chunk):
+                if not new_solid_block:
+                    return
+                await self._dispatch(self.solid_watchers, new_solid_block, solid_txs)
+                if self.store is not None:
+                    await self._rpc(self.store.add, new_solid_block, solid_txs)
+                self.solid_height = new_solid_block['number']
+                self.solid_block_id = new_solid_block['hash']
+
+    async def _recover_phantom_txs(self):
+        txids = list(self.phantom_txids)
+        if txids:
+            txs = await self._rpc(self.cache.get_transactions, txids)
+            for tx in self._recovered(txs):
+                await self._notify_pending_tx(tx)
+        self.phantom_txids.age()
+
+
+class _AsyncWatcher:
+    'a callback, and the queue of events waiting for it'
+
+    def __init__(self, callback, queue_size):
+        self.callback = callback
+        self.queue = asyncio.Queue(queue_size)
+
+    async def run(self):
+        while True:
+            args = await self.queue.get()
+            try:
+                result = self.callback(*args)
+                if asyncio.iscoroutine(result):
+                    await result
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                print('WARNING: watcher %r failed:' % self.callback, file=sys.stderr)
+                traceback.print_exc()
+            finally:
+                self.queue.task_done()
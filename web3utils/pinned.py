@@ -0,0 +1,120 @@
+import shelve
+import threading
+
+from web3.utils.empty import empty
+
+from web3utils.batch import decode_call_result
+from web3utils.caching import SizedLRUCache
+
+_MISSING = object()
+
+
+class CallCache:
+    '''
+    Results of contract reads at a specific block, which never change once the block is final.
+
+    Kept in memory up to maxbytes, least recently used first out. If a path is given, results are
+    also persisted in a shelve database there, and reused by later processes.
+    '''
+
+    def __init__(self, maxbytes=64 * 2 ** 20, path=None):
+        self._memory = SizedLRUCache(maxbytes=maxbytes)
+        self._shelf = shelve.open(path) if path else None
+        self._shelf_lock = threading.Lock()
+
+    def get(self, key, default=None):
+        result = self._memory.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+        if self._shelf is None:
+            return default
+        with self._shelf_lock:
+            result = self._shelf.get(_shelf_key(key), _MISSING)
+        if result is _MISSING:
+            return default
+        self._memory[key] = result
+        return result
+
+    def __setitem__(self, key, result):
+        self._memory[key] = result
+        if self._shelf is not None:
+            with self._shelf_lock:
+                self._shelf[_shelf_key(key)] = result
+
+    def __len__(self):
+        return len(self._memory)
+
+    def close(self):
+        if self._shelf is not None:
+            with self._shelf_lock:
+                self._shelf.close()
+                self._shelf = None
+
+
+# shared by all BlockPins that are not given their own cache
+CALL_CACHE = CallCache()
+
+
+class BlockPin:
+    '''
+    Read contracts at one block, caching each result by block hash and the whole call: contract
+    address, sender, calldata, and any value, gas or gasPrice.
+
+    The block number and hash are looked up once, when pinning. Calls are sent with the block
+    number, so only pin blocks deep enough to be final: if the pinned block is reorganized away,
+    later calls would read the replacement block, and cache its results under the old hash.
+
+    Share one BlockPin among several contracts to pin a whole session to the same block:
+
+        pin = BlockPin(web3, 4000000)
+        token = token.at_block(pin)
+        exchange = exchange.at_block(pin)
+    '''
+
+    def __init__(self, web3, block_identifier='latest', cache=None):
+        block = web3.eth.getBlock(block_identifier)
+        if not block:
+            raise ValueError("Cannot pin reads to block %r, it was not found" % block_identifier)
+        self.block_number = block['number']
+        self.block_hash = block['hash']
+        self.cache = CALL_CACHE if cache is None else cache
+        self._coinbase = None
+
+    def call(self, contract, function, args, transaction=None):
+        '''
+        Call the contract function, at the pinned block.
+
+        @param args the function arguments, already encoded with encode_contract_arg
+        '''
+        transaction = dict(transaction or {})
+        transaction.setdefault('to', contract.address)
+        if 'from' not in transaction:
+            transaction['from'] = self._default_sender(contract.web3.eth)
+        prepared = contract._prepare_transaction(
+            fn_name=function,
+            fn_args=args,
+            transaction=transaction,
+        )
+        key = (self.block_hash, ) + tuple(sorted(prepared.items()))
+        result = self.cache.get(key, _MISSING)
+        if result is _MISSING:
+            return_data = contract.web3.eth.call(prepared, self.block_number)
+            result = decode_call_result(contract, function, args, return_data)
+            self.cache[key] = result
+        return result
+
+    def _default_sender(self, eth):
+        'like `web3utils.batch.default_sender`, but look up the coinbase only once'
+        if eth.defaultAccount is not empty:
+            return eth.defaultAccount
+        if self._coinbase is None:
+            self._coinbase = eth.coinbase
+        return self._coinbase
+
+
+def _shelf_key(key):
+    'the block hash, and field=value for each part of the call, as shelve only takes str keys'
+    return ':'.join(
+        part if isinstance(part, str) else '%s=%s' % part
+        for part in key
+    )
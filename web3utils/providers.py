@@ -0,0 +1,333 @@
+'''
+Providers for long-running, concurrent use: a pooled HTTP provider, and a pool of several nodes.
+'''
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import itertools
+import threading
+import time
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from web3 import HTTPProvider
+from web3.providers.base import BaseProvider
+
+from web3utils.rpc import (
+    batch_request,
+    decode_batch,
+    encode_batch,
+    parse_response,
+    response_result,
+)
+
+# the most connections to keep open to a node, by default
+HTTP_POOL_SIZE = 10
+
+# seconds to wait for a node to answer an HTTP request, by default
+HTTP_TIMEOUT = 10
+
+FILTER_CREATION_METHODS = frozenset([
+    'eth_newFilter',
+    'eth_newBlockFilter',
+    'eth_newPendingTransactionFilter',
+])
+
+# filters only exist on the node that created them
+FILTER_METHODS = frozenset(['eth_getFilterChanges', 'eth_getFilterLogs', 'eth_uninstallFilter'])
+
+# sending these to a second node, after the first one failed, might do it twice
+UNSAFE_METHODS = frozenset([
+    'eth_sendTransaction',
+    'eth_sendRawTransaction',
+    'personal_sendTransaction',
+    'personal_signAndSendTransaction',
+])
+
+# besides eth_get*, these only read from the node, so it is safe to send them to two at once
+READ_METHODS = frozenset([
+    'eth_blockNumber',
+    'eth_call',
+    'eth_estimateGas',
+    'eth_gasPrice',
+    'eth_syncing',
+    'net_version',
+    'web3_clientVersion',
+])
+
+
+class PooledHTTPProvider(HTTPProvider):
+    '''
+    An HTTPProvider that keeps up to pool_size connections to its node open, for reuse by any
+    thread.
+
+    web3.py's HTTPProvider shares an unlocked session cache across providers, and opens an extra
+    connection whenever all the pooled ones are busy, then closes it again. Under many threads,
+    that makes a new TCP connection for most requests. Here, a thread waits for a pooled
+    connection to be free instead.
+    '''
+
+    def __init__(self, endpoint_uri, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT,
+                 request_kwargs=None):
+        '''
+        @param pool_size the most connections to keep open, which is also the most requests
+            in flight at once
+        @param timeout seconds to wait for the node to answer
+        @param request_kwargs more keyword arguments for `requests.Session.post()`
+        '''
+        super().__init__(endpoint_uri, request_kwargs)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def make_request(self, method, params):
+        return self._post(self.encode_rpc_request(method, params))
+
+    def make_batch_request(self, requests):
+        'send a list of (method, params) pairs in one HTTP request, see `rpc.batch_request`'
+        return decode_batch(self._post(encode_batch(requests)), len(requests))
+
+    def close(self):
+        self._session.close()
+
+    def _post(self, data):
+        kwargs = self.get_request_kwargs()
+        kwargs.setdefault('timeout', self.timeout)
+        response = self._session.post(self.endpoint_uri, data=data, **kwargs)
+        response.raise_for_status()
+        return response.content
+
+
+def is_read(method):
+    return method in READ_METHODS or (method.startswith('eth_get') and method not in FILTER_METHODS)
+
+
+class ProviderPool(BaseProvider):
+    '''
+    Send each request to the healthy node with the lowest latency, and retry on the next one
+    if it fails. Answers with a JSON-RPC error are returned as usual, not retried.
+
+    Nodes are health-checked with `eth_blockNumber` every health_interval seconds, in a background
+    thread that starts with the first request. A node is unhealthy after a failed request or
+    check, or if it is more than max_block_lag blocks behind the highest node. Unhealthy nodes are
+    only tried when all the healthy ones failed.
+
+    With hedge_after set, a read that takes longer than that many seconds is also sent to the
+    next-best node, and the first answer wins.
+
+    Filters are created on a single node, and later filter requests are routed back to it. If
+    that node goes away, the filter is lost, like it would be after a node restart.
+
+        web3.setProvider(ProviderPool([PooledHTTPProvider(uri1), PooledHTTPProvider(uri2)]))
+    '''
+
+    def __init__(self, providers, retries=2, hedge_after=None, health_interval=5,
+                 max_block_lag=5):
+        '''
+        @param providers the providers to balance over, used in this order until their
+            latency is known
+        @param retries how many other nodes to try, after a request to one fails
+        @param hedge_after seconds to wait on a read before also sending it to a second node,
+            or None to never do that
+        @param health_interval seconds between health checks
+        @param max_block_lag how many blocks a node may be behind before it is unhealthy,
+            or None to not check
+        '''
+        if not providers:
+            raise ValueError("ProviderPool needs at least one provider")
+        self.nodes = [_Node(provider) for provider in providers]
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.health_interval = health_interval
+        self.max_block_lag = max_block_lag
+        # pool filter id -> (node, filter id on that node)
+        self._filters = {}
+        self._filter_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # for hedged requests
+        self._executor = ThreadPoolExecutor(max_workers=8 * len(self.nodes))
+        self._health_thread = None
+        self._stopped = threading.Event()
+
+    def __str__(self):
+        return "Pool of %s" % ', '.join(str(node.provider) for node in self.nodes)
+
+    def make_request(self, method, params):
+        self._start_health_checks()
+        if method in FILTER_METHODS:
+            return self._filter_request(method, params)
+        response = self._with_failover([method], self._request, method, params)
+        if method in FILTER_CREATION_METHODS:
+            response = self._register_filter(*response)
+        else:
+            response = response[1]
+        return response
+
+    def make_batch_request(self, requests):
+        '''
+        Send a list of (method, params) pairs to a single node, see `web3utils.rpc.batch_request`
+
+        Filter requests are not routed to the node that created the filter. A batch with any
+        transaction in it is not retried on another node.
+        '''
+        self._start_health_checks()
+        methods = [method for method, _ in requests]
+        return self._with_failover(methods, self._batch, requests)[1]
+
+    def isConnected(self):
+        self.check_health()
+        return any(node.healthy for node in self.nodes)
+
+    def check_health(self):
+        '''
+        Check all nodes now.
+
+        Checks run one at a time, because web3.py's HTTPProvider shares an HTTP session cache
+        that is not thread-safe, and this check is likely to be the first request to several
+        nodes at once.
+        '''
+        heights = [self._check(node) for node in self.nodes]
+        known_heights = [height for height in heights if height is not None]
+        if self.max_block_lag is None or not known_heights:
+            return
+        highest = max(known_heights)
+        for node, height in zip(self.nodes, heights):
+            if height is not None and height < highest - self.max_block_lag:
+                node.healthy = False
+
+    def ranked_nodes(self):
+        '''
+        healthy nodes, fastest first, followed by unhealthy nodes, fastest first.
+        Nodes with unknown latency come after the others, in their original order.
+        '''
+        return sorted(self.nodes, key=lambda node: (
+            not node.healthy, node.latency is None, node.latency or 0))
+
+    def close(self):
+        'stop health checks'
+        self._stopped.set()
+        if self._health_thread:
+            self._health_thread.join()
+        self._executor.shutdown(wait=False)
+
+    def _with_failover(self, methods, send, *args):
+        '''
+        @param methods the JSON-RPC methods that send() sends, one unless it is a batch
+        @return (node, response) from the first node to answer
+        '''
+        if any(method in UNSAFE_METHODS for method in methods):
+            attempts = 1
+        else:
+            attempts = self.retries + 1
+        nodes = self.ranked_nodes()[:attempts]
+        hedge = self.hedge_after is not None and len(methods) == 1 and is_read(methods[0])
+        last_exception = None
+        while nodes:
+            if hedge and len(nodes) > 1:
+                group, nodes = nodes[:2], nodes[2:]
+            else:
+                group, nodes = nodes[:1], nodes[1:]
+            try:
+                return self._first_answer(group, send, *args)
+            except Exception as exc:
+                last_exception = exc
+        raise last_exception
+
+    def _first_answer(self, nodes, send, *args):
+        if len(nodes) == 1:
+            return nodes[0], send(nodes[0], *args)
+        primary = self._executor.submit(send, nodes[0], *args)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done and primary.exception() is None:
+            return nodes[0], primary.result()
+        backup = self._executor.submit(send, nodes[1], *args)
+        pending = {primary: nodes[0], backup: nodes[1]}
+        last_exception = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = pending.pop(future)
+                if future.exception() is None:
+                    return node, future.result()
+                last_exception = future.exception()
+        raise last_exception
+
+    def _request(self, node, method, params):
+        return node.timed(node.provider.make_request, method, params)
+
+    def _batch(self, node, requests):
+        return node.timed(batch_request, node.provider, requests, len(requests) or 1)
+
+    def _register_filter(self, node, response_raw):
+        response = parse_response(response_raw)
+        if 'error' in response:
+            return response
+        with self._lock:
+            pool_filter_id = hex(next(self._filter_ids))
+            self._filters[pool_filter_id] = (node, response['result'])
+        return dict(response, result=pool_filter_id)
+
+    def _filter_request(self, method, params):
+        pool_filter_id = params[0]
+        with self._lock:
+            if method == 'eth_uninstallFilter':
+                node, filter_id = self._filters.pop(pool_filter_id, (None, None))
+            else:
+                node, filter_id = self._filters.get(pool_filter_id, (None, None))
+        if node is None:
+            return {'jsonrpc': '2.0', 'error': {'code': -32000, 'message': 'filter not found'}}
+        return self._request(node, method, [filter_id] + list(params[1:]))
+
+    def _start_health_checks(self):
+        if self._health_thread is not None:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._check_forever, daemon=True)
+                self._health_thread.start()
+
+    def _check_forever(self):
+        while not self._stopped.wait(self.health_interval):
+            self.check_health()
+
+    def _check(self, node):
+        'update the health of the node, and return its block number, or None if it failed'
+        try:
+            response = node.timed(node.provider.make_request, 'eth_blockNumber', [])
+            height = int(response_result(parse_response(response)), 16)
+        except Exception:
+            node.healthy = False
+            return None
+        node.healthy = True
+        return height
+
+
+class _Node:
+    'a provider in a pool, with its health and a moving average of its latency'
+
+    # the weight of the newest latency measurement in the average
+    LATENCY_WEIGHT = 0.3
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.healthy = True
+        self.latency = None
+
+    def timed(self, func, *args):
+        'call func, measuring latency, and mark the node unhealthy if it raises an exception'
+        start = time.monotonic()
+        try:
+            result = func(*args)
+        except Exception:
+            self.healthy = False
+            raise
+        self._observe(time.monotonic() - start)
+        return result
+
+    def _observe(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.LATENCY_WEIGHT * (seconds - self.latency)
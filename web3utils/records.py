@@ -0,0 +1,70 @@
+'''
+Compact, read-only records of blocks and transactions, holding only some of their fields.
+
+A web3.py transaction is an AttributeDict around a dict of about 15 fields. A record made with
+`record_type()` stores only the chosen fields, in __slots__, which takes a fraction of the
+memory and is quicker to collect. It reads like the dict it came from, so watchers can use
+records and dicts alike:
+
+    Transfer = record_type('Transfer', ('hash', 'from', 'to', 'value'))
+    transfer = Transfer.from_dict(tx)
+    transfer['value'] == tx['value']
+'''
+
+from collections.abc import Mapping
+
+
+class Record(Mapping):
+    '''
+    Base class for record types: a read-only mapping of field names to values.
+
+    Fields that are valid identifiers can also be read as attributes, like `record.value`.
+    '''
+    __slots__ = ()
+    _field_set = frozenset()
+
+    def __init__(self, *values):
+        if len(values) != len(self.__slots__):
+            raise TypeError("%s takes %d values, got %d" % (
+                type(self).__name__, len(self.__slots__), len(values)))
+        for field, value in zip(self.__slots__, values):
+            object.__setattr__(self, field, value)
+
+    @classmethod
+    def from_dict(cls, source):
+        'a record of the fields of source, which are None where source lacks them'
+        record = cls.__new__(cls)
+        for field in cls.__slots__:
+            object.__setattr__(record, field, source.get(field))
+        return record
+
+    def __getitem__(self, field):
+        if field not in self._field_set:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __contains__(self, field):
+        return field in self._field_set
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __setattr__(self, attr, value):
+        raise TypeError("%s is read-only" % type(self).__name__)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % (field, getattr(self, field)) for field in self.__slots__))
+
+
+def record_type(name, fields):
+    '''
+    A Record subclass with the given fields, in order, without duplicates.
+
+    Unlike a namedtuple, the fields may be keywords, like 'from'.
+    '''
+    fields = tuple(dict.fromkeys(fields))
+    return type(name, (Record, ), {'__slots__': fields, '_field_set': frozenset(fields)})
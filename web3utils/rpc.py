@@ -0,0 +1,80 @@
+import json
+
+from web3 import HTTPProvider
+from web3.utils.compat import make_post_request
+
+# the most requests to send in a single JSON-RPC batch, by default
+BATCH_SIZE = 100
+
+
+def batch_request(provider, requests, batch_size=BATCH_SIZE):
+    '''
+    Send many requests to the provider, in as few round-trips as it supports.
+
+    @param requests a list of (method, params) pairs
+    @return a JSON-RPC response dict per request, in the same order as the requests.
+        Use `response_result` to extract the result, or raise the error.
+    '''
+    responses = []
+    for start in range(0, len(requests), batch_size):
+        responses.extend(_send_chunk(provider, requests[start:start + batch_size]))
+    return responses
+
+
+def response_result(response):
+    'like web3.py\'s RequestManager, raise a ValueError if the response is an error'
+    if 'error' in response:
+        raise ValueError(response['error'])
+    return response['result']
+
+
+def _send_chunk(provider, requests):
+    if hasattr(provider, 'make_batch_request'):
+        return provider.make_batch_request(requests)
+    elif isinstance(provider, HTTPProvider):
+        return _http_batch(provider, requests)
+    else:
+        # the provider cannot batch, fall back to one request at a time
+        return [
+            parse_response(provider.make_request(method, params)) for method, params in requests
+        ]
+
+
+def _http_batch(provider, requests):
+    payload = encode_batch(requests)
+    response_raw = make_post_request(
+        provider.endpoint_uri,
+        payload,
+        **provider.get_request_kwargs()
+    )
+    return decode_batch(response_raw, len(requests))
+
+
+def encode_batch(requests):
+    'encode (method, params) pairs as a JSON-RPC batch, with ids matching their position'
+    return json.dumps([
+        {'jsonrpc': '2.0', 'method': method, 'params': params or [], 'id': request_id}
+        for request_id, (method, params) in enumerate(requests)
+    ]).encode('utf-8')
+
+
+def decode_batch(response_raw, num_requests):
+    'the responses to a batch from encode_batch, reordered to match the requests'
+    responses = parse_response(response_raw)
+    if isinstance(responses, dict):
+        # the node rejected the whole batch
+        raise ValueError(responses.get('error', responses))
+    by_id = {response.get('id'): response for response in responses}
+    return [
+        by_id.get(request_id, {'error': 'no response to request id %d' % request_id})
+        for request_id in range(num_requests)
+    ]
+
+
+def parse_response(response_raw):
+    'a JSON-RPC response as returned by a provider\'s make_request, decoded if necessary'
+    if isinstance(response_raw, (bytes, bytearray)):
+        response_raw = response_raw.decode('utf-8')
+    if isinstance(response_raw, str):
+        return json.loads(response_raw)
+    return response_raw
@@ -0,0 +1,432 @@
+'''
+Send many transactions from node-managed accounts, without waiting on the node for each one.
+
+    with contract.send_batch({'from': me}) as batch:
+        futures = [batch.transfer(to, amount) for to, amount in payouts]
+    txids = [future.result() for future in futures]
+
+web3.py asks the node for a gas estimate before each transaction, and leaves the nonce to the
+node, so transactions from one account are sent one round-trip at a time. A TransactionSender
+counts nonces locally, reuses gas estimates for calls of the same shape, and sends queued
+transactions in JSON-RPC batches. Nonces that the node rejects as already used, like after
+another process sent from the same account, are looked up again, and the transactions retried.
+A transaction that the node already has is not sent twice, and one it dropped from its pool can
+be sent again with `resend_dropped()`.
+'''
+
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+import functools
+import threading
+import weakref
+
+from web3.formatters import input_transaction_formatter
+
+from web3utils.batch import default_sender
+from web3utils.caching import LRUCache
+from web3utils.encodings import encode_contract_arg
+from web3utils.rpc import BATCH_SIZE, batch_request, response_result
+
+# cached gas estimates are multiplied by this, because the same function with the same shape
+# of arguments can cost more with other values, like a transfer to a new address
+GAS_MARGIN = 1.25
+
+# how many gas estimates to remember, one per contract function and shape of arguments
+GAS_CACHE_SIZE = 1024
+
+# how many sent transactions to remember, to find the ones that the node dropped
+SENT_CACHE_SIZE = 4096
+
+# parts of the errors that nodes answer with, when a nonce was already used by another transaction
+NONCE_ERRORS = (
+    'nonce too low',
+    'replacement transaction underpriced',
+)
+
+# parts of the errors that nodes answer with, when they already have the same transaction
+KNOWN_ERRORS = (
+    'known transaction',
+    'already known',
+)
+
+
+class NonceManager:
+    '''
+    The next nonce of each account, looked up once and then counted locally.
+
+    Any thread may reserve nonces. After a transaction failed to send, `resync()` the account,
+    so the next transaction takes over the unused nonce, rather than waiting behind it forever.
+    '''
+
+    def __init__(self, web3):
+        self._web3 = weakref.ref(web3)
+        self.lookups = 0
+        # account -> next nonce
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, account, count=1):
+        '@return the first of count consecutive nonces, for the account to use'
+        account = account.lower()
+        with self._lock:
+            nonce = self._next.get(account)
+            if nonce is None:
+                nonce = self._web3().eth.getTransactionCount(account, 'pending')
+                self.lookups += 1
+            self._next[account] = nonce + count
+            return nonce
+
+    def resync(self, account):
+        'look up the next nonce of the account again, when one is next reserved'
+        with self._lock:
+            self._next.pop(account.lower(), None)
+
+
+class TransactionSender:
+    '''
+    Send transactions with locally counted nonces, in JSON-RPC batches.
+
+    Share one per web3 with `transaction_sender(web3)`, so that all code sending from an
+    account counts its nonces in the same place. Only a weak reference to web3 is kept, so that
+    sharing does not keep the web3 alive.
+
+    Counts of transactions 'sent' and 'failed', nonce 'retries', 'known' transactions that the
+    node already had, dropped transactions 'resent' or 'abandoned', and gas 'estimates' and
+    'cached_estimates' are kept in `stats`.
+    '''
+
+    def __init__(self, web3, gas_margin=GAS_MARGIN, batch_size=BATCH_SIZE, retries=2):
+        '''
+        @param gas_margin multiply cached gas estimates by this
+        @param batch_size the most transactions to send in one JSON-RPC batch
+        @param retries how many times to retry a transaction whose nonce was already used
+        '''
+        self._web3 = weakref.ref(web3)
+        self.nonces = NonceManager(web3)
+        self.gas_margin = gas_margin
+        self.batch_size = batch_size
+        self.retries = retries
+        self.stats = Counter()
+        self._gas_estimates = LRUCache(GAS_CACHE_SIZE)
+        # (account, nonce) -> (txid, transaction), oldest first
+        self._sent = OrderedDict()
+        self._sent_lock = threading.Lock()
+
+    @property
+    def web3(self):
+        return self._web3()
+
+    def send(self, transaction):
+        '''
+        Like `eth.sendTransaction(transaction)`, with a local nonce.
+
+        @return the transaction hash
+        '''
+        future = Future()
+        self.send_many([(transaction, future)])
+        return future.result()
+
+    def send_many(self, queued):
+        '''
+        Send transactions in batches, and resolve their futures to the transaction hashes.
+
+        A transaction without a "from" is sent from the default account, and one without
+        "gas" gets the node's default.
+
+        @param queued a list of (transaction, future) pairs
+        '''
+        eth = self.web3.eth
+        pending = []
+        for transaction, future in queued:
+            transaction = dict(transaction)
+            if 'from' not in transaction:
+                transaction['from'] = default_sender(eth)
+            pending.append((transaction, future))
+        for attempt in range(self.retries + 1):
+            try:
+                pending = self._send_attempt(pending, last=attempt == self.retries)
+            except Exception as exc:
+                # like a failed nonce lookup: the nonces may be reserved, but nothing was sent
+                for transaction, future in pending:
+                    self.nonces.resync(transaction['from'])
+                    if not future.done():
+                        self.stats['failed'] += 1
+                        future.set_exception(exc)
+                return
+            if not pending:
+                return
+
+    def resend_dropped(self):
+        '''
+        Send again the transactions that the node dropped from its pool before they were mined,
+        like when the pool was full or the node restarted, with the same nonces.
+
+        Transactions whose nonce was used by another one in the meantime are given up on.
+        Call it now and then, like when confirmations take longer than expected.
+
+        @return the transaction hashes that were sent again
+        '''
+        eth = self.web3.eth
+        with self._sent_lock:
+            sent = list(self._sent.items())
+        if not sent:
+            return []
+        lookups = batch_request(
+            eth.web3.currentProvider,
+            [('eth_getTransactionByHash', [txid]) for _, (txid, _) in sent],
+            self.batch_size,
+        )
+        lost = []
+        for (key, (txid, transaction)), response in zip(sent, lookups):
+            found = response_result(response)
+            if found is None:
+                lost.append((key, txid, transaction))
+            elif found['blockNumber'] is not None:
+                self._forget(key, txid)
+        if not lost:
+            return []
+
+        accounts = sorted(set(account for (account, _), _, _ in lost))
+        counts = batch_request(
+            eth.web3.currentProvider,
+            [('eth_getTransactionCount', [account, 'latest']) for account in accounts],
+            self.batch_size,
+        )
+        mined_nonces = {
+            account: int(response_result(response), 16)
+            for account, response in zip(accounts, counts)
+        }
+        resend = []
+        for key, txid, transaction in lost:
+            account, nonce = key
+            if nonce < mined_nonces[account]:
+                # another transaction with this nonce was mined
+                self.stats['abandoned'] += 1
+                self._forget(key, txid)
+            else:
+                resend.append((key, txid, transaction))
+        if not resend:
+            return []
+
+        responses = batch_request(
+            eth.web3.currentProvider,
+            [
+                ('eth_sendTransaction', [input_transaction_formatter(eth, transaction)])
+                for _, _, transaction in resend
+            ],
+            self.batch_size,
+        )
+        resent = []
+        for (key, txid, transaction), response in zip(resend, responses):
+            try:
+                new_txid = response_result(response)
+            except ValueError as exc:
+                if not _is_known_error(exc):
+                    self.stats['abandoned'] += 1
+                    self._forget(key, txid)
+            else:
+                self.stats['resent'] += 1
+                self._remember(transaction, new_txid)
+                resent.append(new_txid)
+        return resent
+
+    def transaction(self, contract, function, args, transaction=None):
+        '''
+        The transaction that calls the contract function with args, with a gas limit from a
+        cached estimate, unless the transaction already has one.
+        '''
+        args = [encode_contract_arg(arg, function) for arg in args]
+        prepared = contract._prepare_transaction(
+            fn_name=function, fn_args=args, transaction=dict(transaction or {}))
+        if 'from' not in prepared:
+            prepared['from'] = default_sender(contract.web3.eth)
+        if 'gas' not in prepared:
+            prepared['gas'] = self._estimate_gas(contract, function, args, prepared)
+        return prepared
+
+    def _send_attempt(self, pending, last):
+        '''
+        Reserve nonces, and send the transactions.
+
+        @return the (transaction, future) pairs to retry, whose nonces were already used
+        '''
+        eth = self.web3.eth
+        by_account = {}
+        for transaction, future in pending:
+            by_account.setdefault(transaction['from'].lower(), []).append(transaction)
+        for account, transactions in by_account.items():
+            first_nonce = self.nonces.reserve(account, len(transactions))
+            for offset, transaction in enumerate(transactions):
+                transaction['nonce'] = first_nonce + offset
+
+        requests = [
+            ('eth_sendTransaction', [input_transaction_formatter(eth, transaction)])
+            for transaction, _ in pending
+        ]
+        try:
+            responses = batch_request(eth.web3.currentProvider, requests, self.batch_size)
+        except Exception as exc:
+            # the node may or may not have received them, so look up the nonces again
+            for account in by_account:
+                self.nonces.resync(account)
+            for _, future in pending:
+                self.stats['failed'] += 1
+                future.set_exception(exc)
+            return []
+        retry = []
+        for (transaction, future), response in zip(pending, responses):
+            try:
+                txid = response_result(response)
+            except ValueError as exc:
+                if _is_known_error(exc):
+                    # the node already has this very transaction, like from an earlier attempt
+                    self._resolve_known(transaction, future, exc)
+                    continue
+                # this nonce is either used already, or unused and blocking later transactions
+                self.nonces.resync(transaction['from'])
+                if not last and _is_nonce_error(exc):
+                    self.stats['retries'] += 1
+                    del transaction['nonce']
+                    retry.append((transaction, future))
+                else:
+                    self.stats['failed'] += 1
+                    future.set_exception(exc)
+            else:
+                self.stats['sent'] += 1
+                self._remember(transaction, txid)
+                future.set_result(txid)
+        return retry
+
+    def _resolve_known(self, transaction, future, exc):
+        'resolve the future to the hash of the transaction the node already has, if it tells'
+        key = (transaction['from'].lower(), transaction['nonce'])
+        with self._sent_lock:
+            txid, _ = self._sent.get(key, (None, None))
+        if txid is None:
+            try:
+                txid = self._find_pending(*key)
+            except Exception as lookup_exc:
+                exc = lookup_exc
+        if txid is None:
+            self.stats['failed'] += 1
+            future.set_exception(exc)
+        else:
+            self.stats['known'] += 1
+            self._remember(transaction, txid)
+            future.set_result(txid)
+
+    def _find_pending(self, account, nonce):
+        'the hash of the transaction in the node\'s pool with the nonce, or None'
+        response, = batch_request(
+            self.web3.currentProvider, [('eth_pendingTransactions', [])], self.batch_size)
+        for pending in response_result(response):
+            if pending['from'].lower() == account and int(pending['nonce'], 16) == nonce:
+                return pending['hash']
+        return None
+
+    def _remember(self, transaction, txid):
+        key = (transaction['from'].lower(), transaction['nonce'])
+        with self._sent_lock:
+            self._sent.pop(key, None)
+            self._sent[key] = (txid, transaction)
+            while len(self._sent) > SENT_CACHE_SIZE:
+                self._sent.popitem(last=False)
+
+    def _forget(self, key, txid):
+        with self._sent_lock:
+            if self._sent.get(key, (None,))[0] == txid:
+                del self._sent[key]
+
+    def _estimate_gas(self, contract, function, args, transaction):
+        key = (contract.address, function, _argument_shape(args))
+        estimate = self._gas_estimates.get(key)
+        if estimate is None:
+            estimate = self.web3.eth.estimateGas(transaction)
+            self._gas_estimates[key] = estimate
+            self.stats['estimates'] += 1
+        else:
+            self.stats['cached_estimates'] += 1
+        return int(estimate * self.gas_margin)
+
+
+class SendBatch:
+    '''
+    Queue up contract transactions, to send in JSON-RPC batches when the context exits.
+
+    Each queued call returns a concurrent.futures.Future, which resolves to the transaction hash.
+    Get one from `ContractSugar.send_batch()`, rather than building it directly.
+    '''
+
+    def __init__(self, contract, sender, transaction=None):
+        self._contract = contract
+        self._sender = sender
+        self._transaction = dict(transaction or {})
+        self._queued = []
+
+    def __getattr__(self, function):
+        if function.startswith('__'):
+            raise AttributeError(function)
+        return functools.partial(self._queue, function)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            for _, future in self._queued:
+                future.cancel()
+            self._queued = []
+
+    def _queue(self, function, *args):
+        future = Future()
+        try:
+            transaction = self._sender.transaction(
+                self._contract, function, args, self._transaction)
+        except Exception as exc:
+            future.set_exception(exc)
+        else:
+            self._queued.append((transaction, future))
+        return future
+
+    def execute(self):
+        'send all queued transactions, and resolve their futures'
+        queued, self._queued = self._queued, []
+        self._sender.send_many(queued)
+
+
+_senders = weakref.WeakKeyDictionary()
+_senders_lock = threading.Lock()
+
+
+def transaction_sender(web3):
+    'the TransactionSender shared by all callers with the same web3'
+    with _senders_lock:
+        if web3 not in _senders:
+            _senders[web3] = TransactionSender(web3)
+        return _senders[web3]
+
+
+def _is_nonce_error(exc):
+    message = str(exc).lower()
+    return any(error in message for error in NONCE_ERRORS)
+
+
+def _is_known_error(exc):
+    message = str(exc).lower()
+    return any(error in message for error in KNOWN_ERRORS)
+
+
+def _argument_shape(args):
+    'what a gas estimate depends on, besides the values: their types, and variable lengths'
+    return tuple(_shape(arg) for arg in args)
+
+
+def _shape(arg):
+    if isinstance(arg, (str, bytes, bytearray)):
+        return type(arg).__name__, len(arg)
+    elif isinstance(arg, (list, tuple)):
+        return 'list', _argument_shape(arg)
+    else:
+        return type(arg).__name__
@@ -1,9 +1,23 @@
 
 import codecs
+import functools
+import os
+import threading
+import time
+import weakref
 
 from web3 import Web3, IPCProvider, HTTPProvider
 
 from web3utils.contracts import EthContractSugar
+from web3utils.hashing import keccak, keccak_many
+from web3utils.providers import PooledHTTPProvider, ProviderPool
+
+# skip auto-detection, and always connect to this URI (an http(s):// endpoint or an IPC path),
+# or to a pool of several, separated by commas
+PROVIDER_ENV = 'WEB3UTILS_PROVIDER'
+
+# remember the auto-detected provider URI in this file, and try it first next time
+PROVIDER_HINT_ENV = 'WEB3UTILS_PROVIDER_HINT'
 
 
 class DefaultedWeb3:
@@ -13,57 +27,246 @@ class DefaultedWeb3:
     Also, it adds a bit of sugar around contracts. If you want the original
     web3.py-style contracts, use `web3.eth.original_contract(abi=...)`
     instead of `web3.eth.contract(abi=...)`
+
+    Proxied attributes, like `web3.eth`, are copied onto this object the first time they are
+    read, so that later reads cost the same as on a plain Web3. The copies are dropped by
+    `setProvider()`.
     '''
 
-    _DEFAULT_PROVIDERS = [IPCProvider(), HTTPProvider('http://127.0.0.1:8545/')]
+    # factories, so that no provider is built until auto-detection actually runs
+    _DEFAULT_PROVIDERS = [
+        IPCProvider,
+        functools.partial(PooledHTTPProvider, 'http://127.0.0.1:8545/'),
+    ]
+
+    # seconds to wait for all the default providers to answer, during auto-detection
+    PROBE_TIMEOUT = 1.0
+
+    # web3.py's static helpers, which work before a provider is available
+    _PROVIDER_FREE_ATTRIBUTES = frozenset([
+        'fromAscii',
+        'fromDecimal',
+        'fromUtf8',
+        'fromWei',
+        'isAddress',
+        'isChecksumAddress',
+        'toAscii',
+        'toChecksumAddress',
+        'toDecimal',
+        'toHex',
+        'toUtf8',
+        'toWei',
+    ])
 
     def __init__(self):
         self._proxyto = Web3(None)
-        provider = self._first_connection(self._DEFAULT_PROVIDERS)
-        self.setProvider(provider)
+        self._detection_lock = threading.Lock()
+        self._detected = False
+        # names of the proxied attributes copied onto this object
+        self._bound_attributes = set()
+        # proxies of this object, like ProxyEth, that also copy attributes
+        self._dependents = weakref.WeakSet()
 
-    def _first_connection(self, providers):
-        for provider in providers:
-            if provider.isConnected():
-                return provider
+    def _detect_provider(self):
+        '''
+        Find a provider the first time one is needed, rather than at import.
+
+        Only runs once per instance; later calls reuse the result, even if nothing was found.
+        '''
+        with self._detection_lock:
+            if self._detected or self._proxyto.currentProvider:
+                return
+            explicit_uri = os.environ.get(PROVIDER_ENV)
+            if explicit_uri:
+                provider = provider_from_uri(explicit_uri)
+            else:
+                provider = self._hinted_connection() or self._first_connection(
+                    [factory() for factory in self._DEFAULT_PROVIDERS])
+                self._save_hint(provider)
+            if provider:
+                self._proxyto.setProvider(provider)
+            self._detected = True
+
+    def _first_connection(self, providers, timeout=None):
+        '''
+        Probe all providers concurrently, and return the earliest one in the list
+        that reports a connection before the timeout.
+        '''
+        if timeout is None:
+            timeout = self.PROBE_TIMEOUT
+        deadline = time.monotonic() + timeout
+        probes = [_ConnectionProbe(provider) for provider in providers]
+        for probe in probes:
+            if probe.is_connected(deadline - time.monotonic()):
+                return probe.provider
+
+    def _hinted_connection(self):
+        hint_path = os.environ.get(PROVIDER_HINT_ENV)
+        if not hint_path or not os.path.exists(hint_path):
+            return None
+        with open(hint_path) as hint_file:
+            uri = hint_file.read().strip()
+        if uri:
+            return self._first_connection([provider_from_uri(uri)])
+
+    def _save_hint(self, provider):
+        hint_path = os.environ.get(PROVIDER_HINT_ENV)
+        uri = provider_uri(provider)
+        if hint_path and uri:
+            with open(hint_path, 'w') as hint_file:
+                hint_file.write(uri)
 
     def __getattr__(self, attr):
         'all other attributes should be proxied through to the real web3'
-        if attr != 'setProvider':
+        if attr not in self._PROVIDER_FREE_ATTRIBUTES:
             self.__assert_proxy()
-        return getattr(self._proxyto, attr)
+        value = getattr(self._proxyto, attr)
+        if _is_bindable(self._proxyto, attr):
+            self.__dict__[attr] = value
+            self._bound_attributes.add(attr)
+        return value
+
+    def setProvider(self, provider):
+        self._proxyto.setProvider(provider)
+        self._unbind_attributes()
+
+    def setManager(self, manager):
+        self._proxyto.setManager(manager)
+        self._unbind_attributes()
+
+    def _unbind_attributes(self):
+        'drop the copies of proxied attributes, so that the next read goes to the real web3'
+        for attr in list(self._bound_attributes):
+            self.__dict__.pop(attr, None)
+        self._bound_attributes.clear()
+        for dependent in list(self._dependents):
+            dependent._unbind_attributes()
 
     def __assert_proxy(self):
+        if not self._proxyto.currentProvider:
+            self._detect_provider()
         if not self._proxyto.currentProvider:
             raise Web3ConfigException(
                     "Could not auto-detect provider, set with web3.setProvider() first")
 
     def sha3(self, value, **kwargs):
+        if isinstance(value, (bytes, bytearray)) and kwargs.get('encoding', 'bytes') == 'bytes':
+            # hashing bytes needs no node, or conversion to and from hex
+            return keccak(value)
         self.__assert_proxy()
-        if isinstance(value, (bytes, bytearray)) and 'encoding' not in kwargs:
-            kwargs['encoding'] = 'bytes'
         sha_hex = self._proxyto.sha3(value, **kwargs)
         if isinstance(sha_hex, str):
             return codecs.decode(sha_hex[2:], 'hex')
         else:
             return sha_hex
 
+    def sha3_many(self, values, memo=None):
+        '''
+        Hash each of the values, which must be bytes, without a node.
+
+        @param memo a dict-like object to remember hashes in, like `web3utils.caching.LRUCache`
+        @return a list of hashes, as bytes
+        '''
+        return keccak_many(values, memo)
+
 
 def sweeten_contracts(web3):
+    if isinstance(web3, DefaultedWeb3):
+        # sweeten the wrapped web3 directly, to avoid triggering provider detection
+        sweeten_contracts(web3._proxyto)
+        return web3
     if not isinstance(web3.eth.contract, EthContractSugar):
         web3.eth.original_contract = web3.eth.contract
         web3.eth.contract = EthContractSugar(web3.eth.original_contract)
     return web3
 
 
+def provider_from_uri(uri):
+    if ',' in uri:
+        return ProviderPool([provider_from_uri(part.strip()) for part in uri.split(',')])
+    elif uri.startswith(('http://', 'https://')):
+        return PooledHTTPProvider(uri)
+    else:
+        return IPCProvider(uri)
+
+
+def provider_uri(provider):
+    'inverse of provider_from_uri, returns None for providers that cannot be described by a URI'
+    if isinstance(provider, HTTPProvider):
+        return provider.endpoint_uri
+    elif isinstance(provider, IPCProvider):
+        return provider.ipc_path
+    elif isinstance(provider, ProviderPool):
+        uris = [provider_uri(node.provider) for node in provider.nodes]
+        return None if None in uris else ','.join(uris)
+    else:
+        return None
+
+
+class _ConnectionProbe:
+    '''
+    Check whether a provider is connected, in a background thread.
+
+    The thread is a daemon, so that an unresponsive provider cannot delay interpreter shutdown.
+    '''
+
+    def __init__(self, provider):
+        self.provider = provider
+        self._connected = False
+        self._done = threading.Event()
+        threading.Thread(target=self._probe, daemon=True).start()
+
+    def _probe(self):
+        try:
+            self._connected = bool(self.provider.isConnected())
+        except Exception:
+            self._connected = False
+        finally:
+            self._done.set()
+
+    def is_connected(self, timeout):
+        return self._done.wait(max(timeout, 0)) and self._connected
+
+
 class ProxyEth:
+    '''
+    Proxy to `web3.eth`, without touching web3 until the first attribute is read.
+
+    Methods of eth, like `getBlock`, are bound the first time they are read, and unbound when
+    a DefaultedWeb3 gets a new provider. Replace a method on eth before reading it through
+    this proxy, or the proxy will keep calling the original.
+    '''
+
     def __init__(self, web3):
         self.__proxyweb3 = web3
+        self.__bound_attributes = set()
+        if isinstance(web3, DefaultedWeb3):
+            web3._dependents.add(self)
 
     def __getattr__(self, attr):
         if not self.__proxyweb3 or not hasattr(self.__proxyweb3, 'eth'):
             raise Web3ConfigException("web3 was not correctly initialized")
-        return getattr(self.__proxyweb3.eth, attr)
+        eth = self.__proxyweb3.eth
+        value = getattr(eth, attr)
+        # attributes set on eth itself, like defaultAccount, may be changed at any time
+        if _is_bindable(eth, attr) and attr not in vars(eth):
+            self.__dict__[attr] = value
+            self.__bound_attributes.add(attr)
+        return value
+
+    def _unbind_attributes(self):
+        for attr in list(self.__bound_attributes):
+            self.__dict__.pop(attr, None)
+        self.__bound_attributes.clear()
+
+
+def _is_bindable(obj, attr):
+    '''
+    Whether obj.attr can be copied, so that it is not looked up again until the provider changes.
+
+    Properties, like `currentProvider` or `eth.blockNumber`, must be read every time.
+    '''
+    return not hasattr(getattr(type(obj), attr, None), '__set__')
 
 
 class Web3ConfigException(Exception):
@@ -0,0 +1,203 @@
+'''
+A minimal WebSocket client, enough to talk JSON-RPC to a node: text messages, over ws:// or
+wss://, without extensions.
+
+web3.py 3 has no WebSocket provider, and this is all that subscriptions need, without adding
+a dependency.
+
+    socket = WebSocket('ws://localhost:8546')
+    socket.send('{"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}')
+    print(socket.recv())
+'''
+
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+import threading
+from urllib.parse import urlsplit
+
+# seconds to wait for the connection and handshake, by default
+CONNECT_TIMEOUT = 10
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+_ACCEPT_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class WebSocketError(ConnectionError):
+    'the handshake failed, or the connection was closed'
+    pass
+
+
+class WebSocket:
+    '''
+    A client connection. One thread may receive, while any thread sends.
+
+    `recv()` blocks until a message arrives, or raises WebSocketError when the connection is
+    closed, including by `close()` from another thread.
+    '''
+
+    def __init__(self, uri, timeout=CONNECT_TIMEOUT):
+        '''
+        @param uri like ws://localhost:8546 or wss://node.example.com/ws
+        @param timeout seconds to wait for the connection and handshake
+        '''
+        parts = urlsplit(uri)
+        if parts.scheme not in ('ws', 'wss'):
+            raise ValueError("not a WebSocket URI: %r" % uri)
+        port = parts.port or (443 if parts.scheme == 'wss' else 80)
+        sock = socket.create_connection((parts.hostname, port), timeout)
+        try:
+            if parts.scheme == 'wss':
+                sock = ssl.create_default_context().wrap_socket(
+                    sock, server_hostname=parts.hostname)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            reader = sock.makefile('rb')
+            path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+            _handshake(sock, reader, parts.netloc, path)
+        except Exception:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        self.uri = uri
+        self._sock = sock
+        self._reader = reader
+        self._send_lock = threading.Lock()
+        self._closed = False
+
+    def send(self, text):
+        self._send_frame(OP_TEXT, text.encode('utf-8'))
+
+    def recv(self):
+        '@return the next text message'
+        fragments = []
+        while True:
+            try:
+                fin, opcode, payload = read_frame(self._reader)
+            except (OSError, ValueError) as exc:
+                raise WebSocketError('connection to %s lost: %r' % (self.uri, exc))
+            if opcode == OP_PING:
+                self._send_frame(OP_PONG, payload)
+            elif opcode == OP_CLOSE:
+                self.close()
+                raise WebSocketError('connection to %s closed by the server' % self.uri)
+            elif opcode in (OP_TEXT, OP_BINARY, OP_CONTINUATION):
+                fragments.append(payload)
+                if fin:
+                    return b''.join(fragments).decode('utf-8')
+
+    def close(self):
+        'close the connection, which wakes up a thread waiting in `recv()`'
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._send_frame(OP_CLOSE, b'')
+        except OSError:
+            pass
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def _send_frame(self, opcode, payload):
+        frame = encode_frame(opcode, payload, mask=os.urandom(4))
+        with self._send_lock:
+            try:
+                self._sock.sendall(frame)
+            except OSError as exc:
+                raise WebSocketError('connection to %s lost: %r' % (self.uri, exc))
+
+
+def accept_key(key):
+    'the Sec-WebSocket-Accept answer to a Sec-WebSocket-Key, both as str'
+    digest = hashlib.sha1(key.encode('ascii') + _ACCEPT_GUID).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def encode_frame(opcode, payload, mask=None):
+    '''
+    A final frame with the payload. Clients must mask their frames with 4 random bytes,
+    and servers must not.
+    '''
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, mask_bit | length)
+    elif length < 2 ** 16:
+        header = struct.pack('!BBH', 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, mask_bit | 127, length)
+    if mask:
+        return header + mask + _apply_mask(mask, payload)
+    return header + payload
+
+
+def read_frame(reader):
+    '''
+    Read one frame from a binary file-like object, and unmask it.
+
+    @return (whether it is the final fragment, opcode, payload)
+    '''
+    first, second = _read_exactly(reader, 2)
+    length = second & 0x7f
+    if length == 126:
+        length, = struct.unpack('!H', _read_exactly(reader, 2))
+    elif length == 127:
+        length, = struct.unpack('!Q', _read_exactly(reader, 8))
+    mask = _read_exactly(reader, 4) if second & 0x80 else None
+    payload = _read_exactly(reader, length)
+    if mask:
+        payload = _apply_mask(mask, payload)
+    return bool(first & 0x80), first & 0x0f, payload
+
+
+def _handshake(sock, reader, host, path):
+    key = base64.b64encode(os.urandom(16)).decode('ascii')
+    request = (
+        'GET %s HTTP/1.1\r\n'
+        'Host: %s\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        'Sec-WebSocket-Key: %s\r\n'
+        'Sec-WebSocket-Version: 13\r\n'
+        '\r\n'
+    ) % (path, host, key)
+    sock.sendall(request.encode('ascii'))
+    status = reader.readline().decode('latin-1')
+    headers = {}
+    while True:
+        line = reader.readline().decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if status.split(' ')[1:2] != ['101']:
+        raise WebSocketError('WebSocket handshake refused: %s' % status.strip())
+    if headers.get('sec-websocket-accept') != accept_key(key):
+        raise WebSocketError('WebSocket handshake answered with the wrong key')
+
+
+def _read_exactly(reader, size):
+    data = reader.read(size)
+    if len(data) < size:
+        raise WebSocketError('connection closed')
+    return data
+
+
+def _apply_mask(mask, payload):
+    if not payload:
+        return payload
+    repeated = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    masked = int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')
+    return masked.to_bytes(len(payload), 'big')